@@ -0,0 +1,134 @@
+"""
+benchmark_parsers
+~~~~~~~~~~~~~~~~~
+
+Script to compare parse time and memory of BeautifulSoup parsers on saved
+pages, such as SOLUS course pages or news articles.
+
+Positional command line arguments:
+    argv[1:]: list of saved HTML pages, named by page type
+        (e.g. solus_section.html)
+
+E.g:
+    python benchmark_parsers.py solus_section.html journal_article.html \
+        --strainer solus_section=div#win0divPSHIDDENFIELDS \
+        --strainer journal_article=div.field-name-body
+"""
+import os
+import re
+import time
+import argparse
+import tracemalloc
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+PARSERS = ['html.parser', 'lxml']
+
+parser = argparse.ArgumentParser(
+    description='Benchmark HTML parsers on saved pages.')
+
+parser.add_argument(
+    'pages',
+    metavar='pages',
+    type=str,
+    nargs='+',
+    help='Saved HTML pages, named by page type.',
+)
+
+parser.add_argument(
+    '--strainer',
+    action='append',
+    default=[],
+    help=('Also benchmark lxml with a SoupStrainer for a page type, as '
+          'TYPE=SELECTOR. Selectors are tag, tag.class or tag#id.'),
+)
+
+parser.add_argument(
+    '--repeat',
+    type=int,
+    default=10,
+    help='Number of parses to time per page and parser.',
+)
+
+
+def make_strainer(selector):
+    """Create a SoupStrainer out of a simple selector.
+
+    Args:
+        selector: String of 'tag', 'tag.class' or 'tag#id'.
+
+    Returns:
+        SoupStrainer matching the selector.
+    """
+    name, separator, value = re.match(
+        r'^([\w-]*)(?:([.#])(.+))?$', selector).groups()
+
+    if separator == '.':
+        classes = re.compile(r'(^|\s){}(\s|$)'.format(re.escape(value)))
+        return SoupStrainer(name or None, class_=classes)
+
+    if separator == '#':
+        return SoupStrainer(name or None, id=value)
+
+    return SoupStrainer(name)
+
+
+def benchmark(markup, parser_name, parse_only, repeat):
+    """Time parses of a page, and measure peak memory of one parse.
+
+    Args:
+        markup: String of HTML.
+        parser_name: Name of BeautifulSoup parser.
+        parse_only: SoupStrainer, or None to parse the whole page.
+        repeat: Number of parses to time.
+
+    Returns:
+        Tuple of milliseconds per parse, and peak memory in megabytes.
+    """
+    start_time = time.perf_counter()
+
+    for _ in range(repeat):
+        BeautifulSoup(markup, parser_name, parse_only=parse_only)
+
+    milliseconds = (time.perf_counter() - start_time) / repeat * 1000
+
+    tracemalloc.start()
+    soup = BeautifulSoup(markup, parser_name, parse_only=parse_only)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del soup
+
+    return milliseconds, peak / 2**20
+
+
+def main():
+    """Benchmark parsers from the command line."""
+    args = parser.parse_args()
+    strainers = dict(strainer.split('=', 1) for strainer in args.strainer)
+
+    print('{:<24}{:>10}  {:<40}{:>10}{:>10}'.format(
+        'Page type', 'Size (KB)', 'Parser', 'ms/parse', 'Peak (MB)'))
+
+    for page in args.pages:
+        page_type = os.path.splitext(os.path.basename(page))[0]
+
+        with open(page, 'r', encoding='utf-8', errors='replace') as file:
+            markup = file.read()
+
+        runs = [(name, name, None) for name in PARSERS]
+
+        if page_type in strainers:
+            selector = strainers[page_type]
+            runs.append(('lxml + {}'.format(selector), 'lxml',
+                         make_strainer(selector)))
+
+        for label, parser_name, parse_only in runs:
+            milliseconds, peak = benchmark(
+                markup, parser_name, parse_only, args.repeat)
+
+            print('{:<24}{:>10.0f}  {:<40}{:>10.1f}{:>10.1f}'.format(
+                page_type, len(markup) / 1024, label, milliseconds, peak))
+
+
+if __name__ == '__main__':
+    main()
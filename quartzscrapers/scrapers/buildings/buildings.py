@@ -9,8 +9,11 @@ import re
 from urllib.parse import urljoin
 from collections import OrderedDict
 
-from ..utils import Scraper
-from .buildings_helpers import get_building_coords
+from bs4 import SoupStrainer
+
+from ..utils import Scraper, AsyncScraper, HTTPCache
+from .buildings_helpers import GeocodeCache, geocode_addresses
+from .spatial_index import write_spatial_index
 
 
 class Buildings:
@@ -22,51 +25,123 @@ class Buildings:
     scraper_key = 'buildings'
     location = './dumps/{}'.format(scraper_key)
     host = 'http://www.queensu.ca'
-    scraper = Scraper()
+    scraper = Scraper(name=scraper_key, cache=HTTPCache(scraper_key))
+    async_scraper = AsyncScraper(scraper)
+    batch_size = 20
+
+    # Building pages are only parsed for their sidebar details.
+    sidebar = SoupStrainer(
+        'div', class_=re.compile(r'(^|\s)(building-details|title)(\s|$)'))
+    geocode_cache = GeocodeCache()
     logger = scraper.logger
 
     @staticmethod
-    def scrape(location='', *args, **kwargs):
+    def scrape(location='', offline=False, *args, **kwargs):
         """Scrape building information to JSON files.
 
         Args:
             location (optional): String location of output files.
+            offline (optional): Bool to only use cached geocoordinates,
+                without calling the Google Maps API.
         """
         if not location:
             location = Buildings.location
 
         Buildings.logger.info('Starting Buildings scrape')
 
+        # Parsed buildings, written once their addresses are geocoded.
+        buildings_data = []
+
         campuses = Buildings._get_campuses('campusmap/overall')
 
         for campus in campuses:
             campus_name = Buildings._get_campus_name(campus.text)
             campus_url = urljoin(Buildings.host, campus.find('a')['href'])
-            buildings = Buildings._get_buildings(campus_url)
-
-            for building in buildings:
-                try:
-                    building_href = building['href']
-                    building_param = building_href.split('=')[1]
-
-                    Buildings.logger.debug(
-                        'Building Parameter: %s', building_param)
 
-                    soup = Buildings.scraper.http_request(
-                        campus_url, params={'mapquery': building_param}
+            # Every building's polygon is on the campus map, so parse them
+            # all at once. Only sidebar details need a page per building.
+            polygons = Buildings._get_polygons(campus_url, campus_name)
+            building_hrefs = list(polygons)
+
+            try:
+                # Index polygons of every building on the campus, including
+                # buildings skipped below as unchanged.
+                write_spatial_index(
+                    {
+                        Buildings._get_param(href): polygon
+                        for href, polygon in polygons.items()
+                    },
+                    '{}_index/{}.bin'.format(
+                        location.rstrip('/'), campus_name),
+                )
+
+            except Exception:
+                Buildings.scraper.handle_error()
+
+            for index in range(0, len(building_hrefs), Buildings.batch_size):
+                batch = building_hrefs[index:index + Buildings.batch_size]
+
+                # Building pages rarely change. If the last scrape's output
+                # exists, skip parsing when the server reports the page
+                # unchanged.
+                building_pages = Buildings.async_scraper.request_each([
+                    dict(
+                        url=campus_url,
+                        params={'mapquery': Buildings._get_param(href)},
+                        skip_unchanged=Buildings.scraper.storage.exists(
+                            Buildings._get_param(href), location),
+                        parse_only=Buildings.sidebar,
                     )
-
-                    building_data = Buildings._parse_building_data(
-                        soup, campus_name, building_href)
-
-                    if building_data:
-                        Buildings.scraper.write_data(
-                            building_data, building_param, location)
-
-                except Exception:
-                    Buildings.scraper.handle_error()
-
-                Buildings.scraper.wait()
+                    for href in batch
+                ])
+
+                for building_href, soup in zip(batch, building_pages):
+                    try:
+                        Buildings.logger.debug(
+                            'Building Parameter: %s',
+                            Buildings._get_param(building_href),
+                        )
+
+                        # Re-raise a failed request to log it.
+                        if isinstance(soup, Exception):
+                            raise soup
+
+                        if soup is None:
+                            Buildings.logger.debug(
+                                'Building unchanged. Skipping')
+                            continue
+
+                        building_data = Buildings._parse_building_data(
+                            soup,
+                            campus_name,
+                            building_href,
+                            polygons[building_href],
+                        )
+
+                        if building_data:
+                            buildings_data.append(building_data)
+
+                    except Exception:
+                        Buildings.scraper.handle_error()
+
+        # Geocode addresses together, only looking up uncached ones.
+        coords = geocode_addresses(
+            [data['address'] for data in buildings_data],
+            Buildings.geocode_cache,
+            offline=offline,
+        )
+
+        for building_data in buildings_data:
+            try:
+                latitude, longitude = coords[building_data['address']]
+                building_data['latitude'] = latitude
+                building_data['longitude'] = longitude
+
+                Buildings.scraper.write_data(
+                    building_data, building_data['id'], location)
+
+            except Exception:
+                Buildings.scraper.handle_error()
 
         Buildings.logger.info('Completed Buildings scrape')
 
@@ -86,8 +161,8 @@ class Buildings:
         return campus.strip().lower().replace('the ', '').split(' campus')[0]
 
     @staticmethod
-    def _get_buildings(campus_url):
-        # Get list of relative building URLs as BeautifulSoup HTML tags.
+    def _get_polygons(campus_url, campus):
+        # Get polygons of every building on a campus map, by building href.
 
         # Pull campus name from relative url, such as /campusmap/west,
         # which splits by '/' and grab the last value.
@@ -98,12 +173,43 @@ class Buildings:
         campus_url = urljoin(Buildings.host, campus_url)
         soup = Buildings.scraper.http_request(campus_url)
         campus_map = soup.find('map')
-        buildings = campus_map.find_all('area')
+        polygons = {}
+
+        for building in campus_map.find_all('area'):
+            try:
+                polygons[building['href']] = Buildings._get_polygon(
+                    building['coords'], campus)
+
+            except Exception:
+                Buildings.scraper.handle_error()
 
-        return buildings
+        return polygons
 
     @staticmethod
-    def _parse_building_data(soup, campus, building_href):
+    def _get_polygon(coords, campus):
+        # Convert polygon coords into list of integer pairs.
+        polygon = []
+
+        # Normalize Isabel building coordinate format.
+        if campus == 'isabel':
+            coords = re.sub(
+                r'([0-9]+),([0-9]+)', r' \1,\2', coords).strip()
+
+        coords = coords.replace('\r\n', ' ').replace('\n', ' ').split(', ')
+
+        for coords_str in coords:
+            x_coord, y_coord = coords_str.split(',')
+            polygon.append([int(x_coord), int(y_coord)])
+
+        return polygon
+
+    @staticmethod
+    def _get_param(building_href):
+        # Get building parameter, such as 'coastal' out of '?mapquery=coastal'.
+        return building_href.split('=')[1]
+
+    @staticmethod
+    def _parse_building_data(soup, campus, building_href, polygon):
         # Parse data from building tags.
 
         def parse_label(label, is_address=False):
@@ -119,49 +225,27 @@ class Buildings:
             accessible = details.find('img', alt=re.compile('Accessibility'))
             return bool(accessible)
 
-        def get_polygon(coords, campus):
-            """convert polygon coords into tuple of integer pairs."""
-            polygon = []
-
-            # Normalize Isabel building coordinate format.
-            if campus == 'isabel':
-                coords = re.sub(
-                    r'([0-9]+),([0-9]+)', r' \1,\2', coords).strip()
-
-            coords = coords.replace('\r\n', ' ').replace('\n', ' ').split(', ')
-
-            for coords_str in coords:
-                x_coord, y_coord = coords_str.split(',')
-                polygon.append([int(x_coord), int(y_coord)])
-
-            return polygon
-
-        # Parse campus map tag.
-        campus_map = soup.find('map')
-        building = campus_map.find('area', href=building_href)
-
         # Parse building sidebar info.
         details = soup.find('div', class_='building-details')
         address_label = details.find('span', text=re.compile('Address'))
         code_label = details.find('span', text=re.compile('Building Code'))
 
         # Actual data.
-        param = building_href.split('=')[1]
+        param = Buildings._get_param(building_href)
         name = soup.find('div', class_='title').text.strip()
         code = parse_label(code_label)
         address = parse_label(address_label, is_address=True)
         is_accessible = has_accessibility(details)
-        latitude, longitude = get_building_coords(address)
-        polygon = get_polygon(building['coords'], campus)
 
+        # Geocoordinates are filled in once every building is parsed.
         data = {
             'id': param,
             'code': code,
             'accessibility': is_accessible,
             'name': name,
             'address': address,
-            'latitude': latitude,
-            'longitude': longitude,
+            'latitude': None,
+            'longitude': None,
             'campus': campus,
             'polygon': polygon,
         }
@@ -5,6 +5,12 @@ quartzscrapers.scrapers.buildings.buildings_helpers
 This module contains auxiliary functions for the buildings module.
 """
 
+import os
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 import googlemaps
 
 from ..utils.config import GOOGLE_MAPS_KEY
@@ -15,20 +21,164 @@ GMAPS = None
 if GOOGLE_MAPS_KEY:
     GMAPS = googlemaps.Client(key=GOOGLE_MAPS_KEY)
 
+logger = logging.getLogger(__name__)
+
+
+class GeocodeCache:
+    """Persistent cache of geocoordinates, keyed by address.
+
+    Building addresses almost never change, so coordinates are kept in a
+    JSON file across runs. An entry is invalidated once it's older than
+    `max_age` seconds, or when a building's address changes, since the
+    changed address misses the cache.
+    """
+
+    def __init__(self, path='./cache/geocodes.json',
+                 max_age=180 * 24 * 60 * 60):
+        self.path = path
+        self.max_age = max_age
+
+        try:
+            with open(path, 'r') as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, address):
+        """Get the cached coordinates of an address.
+
+        Args:
+            address: String of an address.
+
+        Returns:
+            Tuple of geocoordinates as floats, or None if they aren't cached
+            or have expired.
+        """
+        entry = self.entries.get(self.make_key(address))
+
+        if not entry or time.time() - entry['fetched_at'] > self.max_age:
+            return None
+
+        return entry['lat'], entry['lng']
+
+    def set(self, address, coords):
+        """Cache the coordinates of an address.
+
+        Args:
+            address: String of an address.
+            coords: Tuple of geocoordinates as floats.
+        """
+        self.entries[self.make_key(address)] = {
+            'lat': coords[0],
+            'lng': coords[1],
+            'fetched_at': time.time(),
+        }
+
+    def save(self):
+        """Write the cache to disk."""
+        directory = os.path.dirname(self.path)
+
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(self.path + '.tmp', 'w') as file:
+            file.write(json.dumps(self.entries, indent=2))
+
+        os.replace(self.path + '.tmp', self.path)
+
+    @staticmethod
+    def make_key(address):
+        """Create cache key out of an address.
+
+        Args:
+            address: String of an address.
+
+        Returns:
+            String address, ignoring case and whitespace differences.
+        """
+        return ' '.join(address.lower().split())
 
-def get_building_coords(address):
+
+def geocode_addresses(addresses, cache, client=None, offline=False,
+                      max_workers=4):
+    """Get geocoordinates of several addresses, looking up cache misses.
+
+    Addresses missing from the cache are geocoded concurrently, and the
+    cache is saved afterwards. Addresses that can't be geocoded are given
+    coordinates of (0, 0), and are not cached.
+
+    Args:
+        addresses: List of address strings.
+        cache: GeocodeCache to check first.
+        client (optional): Google Maps client. Defaults to GMAPS.
+        offline (optional): Bool to only use cached coordinates.
+        max_workers (optional): Number of concurrent lookups.
+
+    Returns:
+        Dictionary of address to tuple of geocoordinates as floats.
+    """
+    client = client or GMAPS
+    coords = {}
+
+    # Cache key -> address to look up, once per key.
+    missing = {}
+    resolved = {}
+
+    for address in addresses:
+        coords[address] = cache.get(address)
+
+        if coords[address] is None:
+            missing.setdefault(cache.make_key(address), address)
+
+    if missing and (offline or not client):
+        logger.warning('%s address(es) not geocoded', len(missing))
+        missing = {}
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda address: _geocode(address, client), missing.values())
+
+            for key, result in zip(missing, results):
+                resolved[key] = result
+
+                if result:
+                    cache.set(key, result)
+
+        cache.save()
+
+    return {
+        address: coords[address] or resolved.get(cache.make_key(address))
+        or (0, 0)
+        for address in coords
+    }
+
+
+def get_building_coords(address, client=None):
     """Use Google Maps API to triangulate geocoordinates of an address.
 
     Args:
         address: String of an address.
+        client (optional): Google Maps client. Defaults to GMAPS.
 
     Returns:
         Tuple of geocoordinates as floats.
     """
-    if not GMAPS:
+    client = client or GMAPS
+
+    if not client:
         return 0, 0
 
     prefix = ', Kingston, ON'
-    geocoords = GMAPS.geocode(address + prefix)[0]['geometry']['location']
+    geocoords = client.geocode(address + prefix)[0]['geometry']['location']
 
     return geocoords['lat'], geocoords['lng']
+
+
+def _geocode(address, client):
+    # Geocode an address, logging failures instead of raising them.
+    try:
+        return get_building_coords(address, client)
+    except Exception:
+        logger.error('Geocoding failed: %s', address, exc_info=True)
+        return None
@@ -0,0 +1,360 @@
+"""
+quartzscrapers.scrapers.buildings.spatial_index
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the spatial index of building polygons on a campus
+map, for point-in-building and nearest-building queries.
+"""
+
+import os
+import sys
+import math
+import mmap
+import struct
+from array import array
+
+MAGIC = b'QBSI'
+VERSION = 1
+
+# Magic, version, padding, number of buildings, number of vertices, grid
+# cell size, grid origin (x, y) and grid columns and rows.
+HEADER = struct.Struct('<4sHHIIIiiII')
+
+
+def write_spatial_index(polygons, path):
+    """Write building polygons of a campus map, indexed by a grid, to a file.
+
+    The file is a header followed by flat arrays of little-endian 32-bit
+    integers: the bounding box and vertex offset of each polygon, every
+    vertex, and a uniform grid whose cells list the polygons with bounding
+    boxes overlapping them. Building IDs follow as a UTF-8 blob.
+
+    Args:
+        polygons: Dictionary of building ID to list of [x, y] pixel
+            coordinates, as in the 'polygon' of building data.
+        path: String location of index file.
+    """
+    building_ids = list(polygons)
+    bboxes = array('i')
+    vertices = array('i')
+    vertex_offsets = array('I', [0])
+
+    for building_id in building_ids:
+        polygon = polygons[building_id]
+        x_coords = [x_coord for x_coord, _ in polygon]
+        y_coords = [y_coord for _, y_coord in polygon]
+
+        bboxes.extend(
+            (min(x_coords), min(y_coords), max(x_coords), max(y_coords)))
+
+        for x_coord, y_coord in polygon:
+            vertices.extend((x_coord, y_coord))
+
+        vertex_offsets.append(len(vertices) // 2)
+
+    # Size grid cells to hold about one building each.
+    min_x = min(bboxes[0::4], default=0)
+    min_y = min(bboxes[1::4], default=0)
+    max_x = max(bboxes[2::4], default=0)
+    max_y = max(bboxes[3::4], default=0)
+    side = math.ceil(math.sqrt(len(building_ids))) or 1
+    extent = max(max_x - min_x, max_y - min_y) + 1
+    cell_size = max(1, math.ceil(extent / side))
+    cols = (max_x - min_x) // cell_size + 1
+    rows = (max_y - min_y) // cell_size + 1
+
+    cells = [[] for _ in range(cols * rows)]
+
+    for index in range(len(building_ids)):
+        x_min, y_min, x_max, y_max = bboxes[index * 4:index * 4 + 4]
+
+        for row in range((y_min - min_y) // cell_size,
+                         (y_max - min_y) // cell_size + 1):
+            for col in range((x_min - min_x) // cell_size,
+                             (x_max - min_x) // cell_size + 1):
+                cells[row * cols + col].append(index)
+
+    cell_entries = array('I')
+    cell_offsets = array('I', [0])
+
+    for cell in cells:
+        cell_entries.extend(cell)
+        cell_offsets.append(len(cell_entries))
+
+    id_blob = bytearray()
+    id_offsets = array('I', [0])
+
+    for building_id in building_ids:
+        id_blob += building_id.encode('utf-8')
+        id_offsets.append(len(id_blob))
+
+    sections = [
+        bboxes,
+        vertex_offsets,
+        vertices,
+        cell_offsets,
+        cell_entries,
+        id_offsets,
+    ]
+
+    if sys.byteorder == 'big':
+        for section in sections:
+            section.byteswap()
+
+    directory = os.path.dirname(path)
+
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with open(path + '.tmp', 'wb') as file:
+        file.write(HEADER.pack(
+            MAGIC,
+            VERSION,
+            0,
+            len(building_ids),
+            len(vertices) // 2,
+            cell_size,
+            min_x,
+            min_y,
+            cols,
+            rows,
+        ))
+
+        for section in sections:
+            file.write(section.tobytes())
+
+        file.write(id_blob)
+
+    os.replace(path + '.tmp', path)
+
+
+class SpatialIndex:
+    """Memory-mapped spatial index written by `write_spatial_index`.
+
+    Queries only test the polygons listed in the grid cells around a point,
+    instead of every polygon on the campus map. Coordinates are pixel
+    coordinates of the campus map.
+
+    E.g:
+        with SpatialIndex('./dumps/buildings_index/main.bin') as index:
+            index.find(320, 450)     # 'stirling'
+            index.nearest(10, 10)    # ('coastal', 12.5)
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, _, count, num_vertices, self.cell_size, self.min_x,
+         self.min_y, self.cols, self.rows) = HEADER.unpack_from(self._mmap)
+
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError('Not a spatial index: {}'.format(path))
+
+        self._views = []
+        offset = HEADER.size
+
+        self._bboxes, offset = self._read_array('i', offset, count * 4)
+        self._vertex_offsets, offset = self._read_array('I', offset, count + 1)
+        self._vertices, offset = self._read_array(
+            'i', offset, num_vertices * 2)
+        self._cell_offsets, offset = self._read_array(
+            'I', offset, self.cols * self.rows + 1)
+        self._cell_entries, offset = self._read_array(
+            'I', offset, self._cell_offsets[-1])
+        id_offsets, offset = self._read_array('I', offset, count + 1)
+
+        self.building_ids = [
+            self._mmap[offset + start:offset + end].decode('utf-8')
+            for start, end in zip(id_offsets, id_offsets[1:])
+        ]
+
+    def find(self, x_coord, y_coord):
+        """Find the building containing a point.
+
+        Args:
+            x_coord: Number of x pixel coordinate.
+            y_coord: Number of y pixel coordinate.
+
+        Returns:
+            String ID of building, or None if no building contains the point.
+        """
+        col = (math.floor(x_coord) - self.min_x) // self.cell_size
+        row = (math.floor(y_coord) - self.min_y) // self.cell_size
+
+        if not (0 <= col < self.cols and 0 <= row < self.rows):
+            return None
+
+        for index in self._get_cell(row * self.cols + col):
+            if (self._in_bbox(index, x_coord, y_coord)
+                    and self._contains(index, x_coord, y_coord)):
+                return self.building_ids[index]
+
+        return None
+
+    def nearest(self, x_coord, y_coord):
+        """Find the building nearest to a point.
+
+        Rings of grid cells are searched outwards from the point, until no
+        unsearched cell can hold a nearer building.
+
+        Args:
+            x_coord: Number of x pixel coordinate.
+            y_coord: Number of y pixel coordinate.
+
+        Returns:
+            Tuple of string ID of building and its distance in pixels, which
+            is 0 if the building contains the point. None if the index is
+            empty.
+        """
+        if not self.building_ids:
+            return None
+
+        # Start from the cell nearest to the point, even outside the grid.
+        col = (math.floor(x_coord) - self.min_x) // self.cell_size
+        row = (math.floor(y_coord) - self.min_y) // self.cell_size
+        col = min(max(col, 0), self.cols - 1)
+        row = min(max(row, 0), self.rows - 1)
+
+        best_index = None
+        best_distance = math.inf
+        seen = set()
+
+        for ring in range(max(self.cols, self.rows)):
+            for cell in self._get_ring(row, col, ring):
+                for index in self._get_cell(cell):
+                    if index in seen:
+                        continue
+
+                    seen.add(index)
+
+                    # Polygons are never nearer than their bounding boxes.
+                    if self._bbox_distance(
+                            index, x_coord, y_coord) >= best_distance:
+                        continue
+
+                    distance = self._distance(index, x_coord, y_coord)
+
+                    if distance < best_distance:
+                        best_index, best_distance = index, distance
+
+            # Buildings outside the searched block are at least as far as
+            # the block's edge.
+            block_edge = min(
+                x_coord - (self.min_x + (col - ring) * self.cell_size),
+                self.min_x + (col + ring + 1) * self.cell_size - x_coord,
+                y_coord - (self.min_y + (row - ring) * self.cell_size),
+                self.min_y + (row + ring + 1) * self.cell_size - y_coord,
+            )
+
+            if best_distance <= block_edge:
+                break
+
+        return self.building_ids[best_index], best_distance
+
+    def close(self):
+        """Unmap the index file."""
+        for view in self._views:
+            view.release()
+
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _read_array(self, typecode, offset, length):
+        # Get an array section of the file, without copying it if possible.
+        end = offset + length * 4
+
+        if sys.byteorder == 'little':
+            view = memoryview(self._mmap)[offset:end].cast(typecode)
+            self._views.append(view)
+            return view, end
+
+        values = array(typecode, self._mmap[offset:end])
+        values.byteswap()
+        return values, end
+
+    def _get_cell(self, cell):
+        # Get building indices listed in a grid cell.
+        start, end = self._cell_offsets[cell], self._cell_offsets[cell + 1]
+        return self._cell_entries[start:end]
+
+    def _get_ring(self, row, col, ring):
+        # Get grid cells at a Chebyshev distance of `ring` from a cell.
+        for ring_row in range(row - ring, row + ring + 1):
+            if not 0 <= ring_row < self.rows:
+                continue
+
+            on_edge = ring_row in (row - ring, row + ring)
+            step = 1 if on_edge else max(2 * ring, 1)
+
+            for ring_col in range(col - ring, col + ring + 1, step):
+                if 0 <= ring_col < self.cols:
+                    yield ring_row * self.cols + ring_col
+
+    def _in_bbox(self, index, x_coord, y_coord):
+        x_min, y_min, x_max, y_max = self._bboxes[index * 4:index * 4 + 4]
+        return x_min <= x_coord <= x_max and y_min <= y_coord <= y_max
+
+    def _bbox_distance(self, index, x_coord, y_coord):
+        x_min, y_min, x_max, y_max = self._bboxes[index * 4:index * 4 + 4]
+        d_x = max(x_min - x_coord, 0, x_coord - x_max)
+        d_y = max(y_min - y_coord, 0, y_coord - y_max)
+        return math.hypot(d_x, d_y)
+
+    def _get_vertices(self, index):
+        start = self._vertex_offsets[index] * 2
+        end = self._vertex_offsets[index + 1] * 2
+        return self._vertices[start:end]
+
+    def _contains(self, index, x_coord, y_coord):
+        # Ray casting test of a point in a polygon.
+        vertices = self._get_vertices(index)
+        num_vertices = len(vertices) // 2
+        inside = False
+
+        for i in range(num_vertices):
+            x_1, y_1 = vertices[i * 2], vertices[i * 2 + 1]
+            j = (i - 1) % num_vertices
+            x_2, y_2 = vertices[j * 2], vertices[j * 2 + 1]
+
+            if (y_1 > y_coord) != (y_2 > y_coord):
+                x_cross = x_1 + (y_coord - y_1) * (x_2 - x_1) / (y_2 - y_1)
+
+                if x_coord < x_cross:
+                    inside = not inside
+
+        return inside
+
+    def _distance(self, index, x_coord, y_coord):
+        # Distance from a point to a polygon, 0 if the point is inside it.
+        if self._contains(index, x_coord, y_coord):
+            return 0
+
+        vertices = self._get_vertices(index)
+        num_vertices = len(vertices) // 2
+        distance = math.inf
+
+        for i in range(num_vertices):
+            x_1, y_1 = vertices[i * 2], vertices[i * 2 + 1]
+            j = (i + 1) % num_vertices
+            x_2, y_2 = vertices[j * 2], vertices[j * 2 + 1]
+
+            # Project the point onto the segment, clamped to its ends.
+            d_x, d_y = x_2 - x_1, y_2 - y_1
+            length = d_x * d_x + d_y * d_y
+            ratio = 0
+
+            if length:
+                ratio = (x_coord - x_1) * d_x + (y_coord - y_1) * d_y
+                ratio = min(max(ratio / length, 0), 1)
+
+            distance = min(distance, math.hypot(
+                x_coord - (x_1 + ratio * d_x), y_coord - (y_1 + ratio * d_y)))
+
+        return distance
@@ -7,35 +7,58 @@ threads, and scrapers for course data.
 """
 
 import re
+import logging
+import itertools
 from queue import Queue
-from threading import Thread
-from collections import OrderedDict
+from threading import Thread, Lock
 
 # Adds chromedriver_binary to path.
 import chromedriver_binary  # noqa
-import pendulum
+from bs4 import SoupStrainer
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
-from ..utils import Scraper
+from ..utils import (
+    Scraper,
+    RateLimiter,
+    CheckpointJournal,
+    get_parser_pool,
+    get_storage,
+)
 from ..utils.config import QUEENS_USERNAME, QUEENS_PASSWORD
 from .courses_helpers import (
     setup_logging,
-    parse_datetime,
-    make_course_id,
+    is_login_page,
+    is_login_markup,
+    load_cookies,
+    save_cookies,
     save_department_data,
     save_course_data,
-    save_section_data,
+    SectionAggregator,
 )
+from .courses_parsers import parse_course_data, parse_course_section_data
 
 
 class Courses:
     """A scraper for Queen's courses on SOLUS.
 
-    The Courses scraper creates 26 threads, one for each letter, to scrape
-    several departments and their courses. It instantiates 26 Course workers,
-    each of which creates a course session that handles a SOLUS login to grab
-    its credentials via the cookies returned from a login.
+    The Courses scraper runs a pool of Course workers, each of which owns a
+    course session. Work is scheduled in two phases over a shared queue:
+    first every letter is listed to find its departments, then departments
+    are handed out one at a time, largest first, to whichever session is
+    idle. Total time is bounded by the largest department rather than the
+    largest letter.
+
+    Sessions get their credentials from a shared SolusAuth broker, which
+    logs into SOLUS once (or a few times, see `num_logins`) and hands out
+    the resulting authentication cookies. Each session still gets its own
+    PeopleSoft session, which holds its navigation state on the server.
+
+    Section pages, the bulk of SOLUS pages, are parsed by the shared parser
+    pool, so sessions can carry on navigating SOLUS meanwhile.
+
+    Finished letters, departments and courses are recorded in a checkpoint
+    journal, so a resumed scrape skips them.
     """
 
     scraper_key = 'courses'
@@ -43,11 +66,22 @@ class Courses:
     LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
 
     @staticmethod
-    def scrape(location='', *args, **kwargs):
+    def scrape(
+        location='',
+        num_logins=1,
+        num_sessions=len(LETTERS),
+        resume=False,
+        *args,
+        **kwargs,
+    ):
         """Manage worker scrapers to parse information custom to SOLUS.
 
         Args:
             location (optional): String location of output files.
+            num_logins (optional): Number of SOLUS logins shared by workers.
+            num_sessions (optional): Number of concurrent course sessions.
+            resume (optional): Bool to skip units finished by an interrupted
+                scrape.
         """
         if not location:
             location = Courses.location
@@ -56,60 +90,373 @@ class Courses:
 
         logger.info('Starting Courses scrape')
         queue = Queue()
-
-        for _ in Courses.LETTERS:
-            course_worker = CourseWorker(queue, location)
+        auth = SolusAuth(num_logins)
+        sections = SectionAggregator(
+            Scraper(name=Courses.scraper_key), location)
+        checkpoints = CheckpointJournal(
+            Courses.scraper_key, resume, storage=get_storage())
+        departments = []
+
+        for _ in range(num_sessions):
+            course_worker = CourseWorker(
+                queue, location, auth, sections, departments, checkpoints)
             course_worker.daemon = True
             course_worker.start()
 
+        # Phase 1: list departments of every letter, unless listed by an
+        # interrupted scrape.
         for letter in Courses.LETTERS:
-            queue.put(letter)
+            listing = checkpoints.get('letter:{}'.format(letter))
+
+            if listing is None:
+                queue.put(('letter', letter))
+            else:
+                departments.extend(tuple(dept) for dept in listing)
 
         queue.join()
+        logger.info('Found %s departments', len(departments))
+
+        # Phase 2: scrape departments, largest first, so the longest ones
+        # don't start last.
+        departments.sort(reverse=True)
+
+        for _, letter, code in departments:
+            if not checkpoints.is_done('department:{}'.format(code)):
+                queue.put(('department', (letter, code)))
+
+        queue.join()
+        checkpoints.complete()
         logger.info('Completed Courses scrape')
 
 
 class CourseWorker(Thread):
-    """Worker thread for courses scraper."""
+    """Worker thread for courses scraper.
+
+    Takes units of work from a shared queue for as long as the scrape runs,
+    reusing one course session across units. Units are journaled once
+    finished.
+    """
 
-    def __init__(self, queue, location):
+    def __init__(self, queue, location, auth, sections, departments,
+                 checkpoints):
         Thread.__init__(self)
         self.queue = queue
         self.location = location
+        self.auth = auth
+        self.sections = sections
+        self.departments = departments
+        self.checkpoints = checkpoints
+        self.course_scraper = None
 
     def run(self):
         """Instantiate CourseSession class to execute scraping."""
         while True:
-            letter = self.queue.get()
-            course_scraper = CourseSession(self.location)
-            course_scraper.scrape(letter)
+            kind, unit = self.queue.get()
+
+            try:
+                if not self.course_scraper:
+                    self.course_scraper = CourseSession(
+                        self.location,
+                        self.auth,
+                        self.sections,
+                        self.checkpoints,
+                    )
+
+                if kind == 'letter':
+                    listing = self.course_scraper.list_departments(unit)
+                    self.departments.extend(listing)
+                    self.checkpoints.done('letter:{}'.format(unit), listing)
+                else:
+                    letter, code = unit
+
+                    # Departments not scraped in full are redone on resume.
+                    if self.course_scraper.scrape_department(letter, code):
+                        self.checkpoints.done('department:{}'.format(code))
+
+            except Exception:
+                logging.getLogger(__name__).error(
+                    'Course worker error', exc_info=True)
+
+            # Always mark done, so a failed unit can't stall the scrape.
             self.queue.task_done()
 
 
+class SolusAuth:
+    """Authentication broker sharing SOLUS logins between course sessions.
+
+    Each login emulates a browser via Selenium, which is slow and memory
+    hungry. The broker performs `num_logins` logins lazily, assigns sessions
+    to them round-robin, and re-authenticates a login only when a session
+    using it reports it expired.
+
+    Only the authentication cookies of a login are shared. PeopleSoft keeps
+    the navigation state of a session on the server, keyed by its session
+    cookie, so sessions sharing that cookie would overwrite each other's
+    state. Each course session gets its own from SOLUS instead.
+
+    Cookies of each login are saved to an owner-only file in `location` and
+    reused by later runs until they expire or SOLUS rejects them.
+    """
+
+    location = './cache/solus'
+
+    # Name of the PeopleSoft session cookie, such as
+    # 'saself-ps-80-PORTAL-PSJSESSIONID'.
+    session_cookie = re.compile(r'JSESSIONID$', re.IGNORECASE)
+
+    def __init__(self, num_logins=1, location=location):
+        self.logger = logging.getLogger(__name__)
+        self.location = location
+        self.num_logins = num_logins
+        self.logins = [None] * num_logins
+        self.locks = [Lock() for _ in range(num_logins)]
+        self.counter = itertools.count()
+
+    def assign(self):
+        """Assign a session to a login slot.
+
+        Returns:
+            Integer index of the login slot.
+        """
+        return next(self.counter) % self.num_logins
+
+    def get_cookies(self, slot):
+        """Get the cookies of a login slot, logging in on first use.
+
+        Args:
+            slot: Integer index of the login slot.
+
+        Returns:
+            Dictionary of session cookies.
+        """
+        with self.locks[slot]:
+            if self.logins[slot] is None:
+                saved_cookies = load_cookies(self._get_cookie_path(slot))
+
+                if saved_cookies:
+                    self.logger.info('Reusing saved SOLUS login %s', slot)
+                    self.logins[slot] = self._get_auth_cookies(saved_cookies)
+                else:
+                    self.logins[slot] = self._login(slot)
+
+            return self.logins[slot]
+
+    def refresh(self, slot, stale_cookies):
+        """Re-authenticate a login slot whose cookies have expired.
+
+        If another session already renewed the slot, its new cookies are
+        returned without logging in again.
+
+        Args:
+            slot: Integer index of the login slot.
+            stale_cookies: Dictionary of the expired cookies.
+
+        Returns:
+            Dictionary of session cookies.
+        """
+        with self.locks[slot]:
+            if self.logins[slot] is stale_cookies:
+                self.logins[slot] = self._login(slot)
+
+            return self.logins[slot]
+
+    def _get_cookie_path(self, slot):
+        return '{}/cookies_{}.json'.format(self.location, slot)
+
+    def _get_auth_cookies(self, cookies):
+        # Drop the PeopleSoft session cookie from a login's cookies.
+        return {
+            name: value for name, value in cookies.items()
+            if not self.session_cookie.search(name)
+        }
+
+    def _login(self, slot):
+        # Emulate a SOLUS login via a Selenium webdriver. Mainly used for user
+        # authentication. Returns authentication cookies, which are used by
+        # every session assigned to this login, and saved for later runs.
+
+        def run_selenium_routine(func):
+            """Execute Selenium task and retry upon failure."""
+            retries = 0
+
+            while retries < 3:
+                try:
+                    return func()
+                except Exception as ex:
+                    self.logger.error(
+                        'Selenium error #%s: %s', retries + 1, ex,
+                        exc_info=True)
+
+                    retries += 1
+                    continue
+
+        self.logger.info('Running webdriver for authentication...')
+
+        chrome_options = Options()
+
+        # Prevent images from loading.
+        prefs = {'profile.managed_default_content_settings.images': 2}
+
+        chrome_options.add_argument('--headless')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_experimental_option('prefs', prefs)
+
+        driver = webdriver.Chrome(chrome_options=chrome_options)
+
+        # Timeout to for an element to be found.
+        driver.implicitly_wait(30)
+        driver.set_page_load_timeout(30)
+        driver.get('https://my.queensu.ca')
+
+        # Sometimes, Selenium errors out when searching for certain fields.
+        # Retry this routine until it succeeds.
+        run_selenium_routine(
+            lambda: driver.find_element_by_id('username').send_keys(
+                QUEENS_USERNAME
+            )
+        )
+
+        run_selenium_routine(
+            lambda: driver.find_element_by_id('password').send_keys(
+                QUEENS_PASSWORD
+            )
+        )
+
+        run_selenium_routine(
+            lambda: driver.find_element_by_class_name('form-button').click()
+        )
+
+        run_selenium_routine(
+            lambda: driver.find_element_by_class_name('solus-tab').click()
+        )
+
+        iframe = run_selenium_routine(
+            lambda: driver.find_element_by_id('ptifrmtgtframe')
+        )
+
+        driver.switch_to_frame(iframe)
+
+        run_selenium_routine(
+            lambda: driver.find_element_by_link_text('Search').click()
+        )
+
+        session_cookies = {}
+        expiries = []
+
+        for cookie in driver.get_cookies():
+            if self.session_cookie.search(cookie['name']):
+                continue
+
+            session_cookies[cookie['name']] = cookie['value']
+
+            if cookie.get('expiry'):
+                expiries.append(cookie['expiry'])
+
+        # Quit rather than close, so the browser process doesn't linger.
+        driver.quit()
+
+        self.logger.info('Webdriver authentication complete')
+
+        save_cookies(
+            session_cookies,
+            min(expiries) if expiries else None,
+            self._get_cookie_path(slot),
+        )
+
+        return session_cookies
+
+
+class SessionExpired(Exception):
+    """Raised when a course session had to log in again midway through a
+    navigation, losing the navigation state held by its PeopleSoft session.
+    """
+
+
 class CourseSession:
-    """A sub-scraper for Queen's courses."""
+    """A sub-scraper for Queen's courses.
+
+    Each session navigates SOLUS in its own PeopleSoft session, whose
+    cookie is kept in the session's cookie jar alongside the shared login's
+    authentication cookies. If the login expires midway, the session logs
+    in again and starts the letter or department over from the catalog.
+    """
 
     host = ('https://saself.ps.queensu.ca/psc/saself/EMPLOYEE/SA/c/'
             'SA_LEARNER_SERVICES.SSS_BROWSE_CATLG_P.GBL')
 
-    def __init__(self, location):
-        self.scraper = Scraper()
+    # SOLUS is only scraped by course sessions, which run concurrently and
+    # never slept between requests. Give them their own, looser budget
+    # rather than the shared per-host default.
+    rate_limiter = RateLimiter(rate=10, burst=26)
+
+    # Pages only requested to navigate SOLUS are checked for a login form,
+    # so only their inputs are parsed.
+    inputs_only = SoupStrainer('input')
+
+    # Number of times a letter or department is navigated from the catalog
+    # before giving up on a login that keeps expiring.
+    max_navigations = 3
+
+    def __init__(self, location, auth, sections, checkpoints):
+        self.scraper = Scraper(
+            name=Courses.scraper_key,
+            rate_limiter=CourseSession.rate_limiter,
+        )
         self.location = location
         self.logger = self.scraper.logger
-        self.cookies = self._login()
+        self.auth = auth
+        self.sections = sections
+        self.checkpoints = checkpoints
+        self.login_slot = auth.assign()
+        self.cookies = None
+        self.parser_pool = get_parser_pool()
 
-    def scrape(self, letter):
-        """Scrape information custom to SOLUS.
+        self._set_cookies(auth.get_cookies(self.login_slot))
+
+    def list_departments(self, letter):
+        """List and save the departments under a certain letter.
 
         Args:
             letter: A string of a letter related to course catalog.
+
+        Returns:
+            List of tuples of the number of courses, letter and department
+            code, for every department under the letter.
         """
-        soup = self._request_page()
-        departments = self._get_departments(soup, letter)
+        return self._navigate(self._list_departments, letter)
+
+    def scrape_department(self, letter, code):
+        """Scrape information custom to SOLUS for one department.
+
+        Args:
+            letter: A string of a letter related to course catalog.
+            code: A string of the department code, such as 'CISC'.
+
+        Returns:
+            True if the department was found and every course in it was
+            scraped, including courses finished by an earlier scrape.
+        """
+        return self._navigate(self._scrape_department, letter, code)
+
+    def _navigate(self, navigation, *args):
+        # Run a navigation from the catalog, starting it over if the login
+        # expired midway. Courses finished before are skipped, as they are
+        # journaled.
+        for _ in range(CourseSession.max_navigations - 1):
+            try:
+                return navigation(*args)
+            except SessionExpired:
+                self.logger.info('Navigating SOLUS again from the catalog')
+
+        return navigation(*args)
+
+    def _list_departments(self, letter):
+        departments = self._open_letter(letter)
+        listing = []
 
         self.logger.debug('Letter %s has %s depts.', letter, len(departments))
 
-        # For each department under a certain letter search.
         for department in departments:
             try:
                 dept_data = self._parse_department_data(department)
@@ -117,6 +464,26 @@ class CourseSession:
 
                 courses = department.find_all(
                     'tr', id=re.compile('trCOURSE_LIST'))
+                listing.append((len(courses), letter, dept_data['code']))
+
+            except Exception:
+                self.scraper.handle_error()
+
+        return listing
+
+    def _scrape_department(self, letter, code):
+        departments = self._open_letter(letter)
+
+        for department in departments:
+            try:
+                if self._parse_department_data(department)['code'] != code:
+                    continue
+
+                courses = department.find_all(
+                    'tr', id=re.compile('trCOURSE_LIST'))
+
+                # Whether every course so far was scraped in full.
+                complete = True
 
                 # For each course under a certain department.
                 for course in courses:
@@ -136,6 +503,13 @@ class CourseSession:
                             self.logger.debug('Skipping unspecified course')
                             continue
 
+                        course_unit = 'course:{}:{}'.format(
+                            code, course_name.strip())
+
+                        if self.checkpoints.is_done(course_unit):
+                            self.logger.debug('Skipping finished course')
+                            continue
+
                         # Note: Selecting course only takes one parameter,
                         # which is the ICAction.
                         ic_action = {'ICAction': course_number}
@@ -156,7 +530,8 @@ class CourseSession:
 
                             self.logger.debug('Course title: %s', title)
 
-                            self._navigate_and_parse_course(soup)
+                            course_complete = (
+                                self._navigate_and_parse_course(soup))
                         else:
                             return_state = 'DERIVED_SSS_SEL_RETURN_PB$181$'
                             title = soup.find(
@@ -166,6 +541,7 @@ class CourseSession:
                             self.logger.debug('Multiple offerings found')
 
                             academic_levels = self._get_academic_levels(soup)
+                            course_complete = True
 
                             for academic_level in academic_levels:
                                 try:
@@ -178,32 +554,70 @@ class CourseSession:
                                     ic_action = {'ICAction': cr_number}
 
                                     soup = self._request_page(ic_action)
-                                    self._navigate_and_parse_course(soup)
+
+                                    if not self._navigate_and_parse_course(
+                                            soup):
+                                        course_complete = False
+
+                                except SessionExpired:
+                                    raise
 
                                 except Exception:
+                                    course_complete = False
                                     self.scraper.handle_error()
 
                             self.logger.debug('Done careers.')
 
+                        # Only journal courses scraped in full, so a resumed
+                        # scrape redoes the others.
+                        if course_complete:
+                            self.checkpoints.done(course_unit)
+                        else:
+                            complete = False
+
+                    except SessionExpired:
+                        raise
+
                     except Exception:
+                        complete = False
                         self.scraper.handle_error()
 
                     # Go back to course listing.
                     self.logger.debug('Returning to course list')
                     ic_action = {'ICAction': return_state}
-                    self._request_page(ic_action)
+                    self._request_page(
+                        ic_action, parse_only=self.inputs_only)
 
                 self.logger.debug('Done department')
+                return complete
+
+            except SessionExpired:
+                raise
 
             except Exception:
                 self.scraper.handle_error()
 
-        self.logger.debug('Done letter %s', letter)
+        self.logger.error('Department %s not found under %s', code, letter)
+        return False
+
+    def _open_letter(self, letter):
+        # Start from the course catalog and expand the letter's departments.
+        soup = self._request_page()
+        return self._get_departments(soup, letter)
 
     def _navigate_and_parse_course(self, soup):
+        # Returns True if the course and every section of it were parsed.
+        complete = True
+
+        # Filenames of sections buffered for this course.
+        section_files = set()
+
+        # Section pages being parsed by the parser pool.
+        section_futures = []
+
         try:
             # Course parse.
-            course_data = self._parse_course_data(soup)
+            course_data = parse_course_data(soup)
             save_course_data(course_data, self.scraper, self.location)
 
             # Section(s) parse.
@@ -256,134 +670,102 @@ class CourseSession:
                                 self.logger.debug(
                                     'Section name: %s', section_name)
 
-                                # Go to sections page.
+                                # Go to sections page, and parse it in the
+                                # parser pool while navigating on.
                                 payload.update({'ICAction': section})
-                                section_soup = self._request_page(payload)
-                                section_base_data, section_data = (
-                                    self._parse_course_section_data(
-                                        section_soup,
+                                section_page = self._request_page(
+                                    payload, parse=False)
+                                section_futures.append(
+                                    self.parser_pool.submit(
+                                        parse_course_section_data,
+                                        section_page,
                                         course_data,
                                         section_name,
                                     )
                                 )
 
-                                save_section_data(
-                                    section_base_data,
-                                    section_data,
-                                    self.scraper,
-                                    self.location
-                                )
+                            except SessionExpired:
+                                raise
 
                             except Exception:
+                                complete = False
                                 self.scraper.handle_error()
 
                             # Go back to sections.
                             ic_action = {
                                 'ICAction': 'CLASS_SRCH_WRK2_SSR_PB_CLOSE'
                             }
-                            self._request_page(ic_action)
+                            self._request_page(
+                                ic_action, parse_only=self.inputs_only)
 
                         self.logger.debug('Done term')
 
+                    except SessionExpired:
+                        raise
+
                     except Exception:
+                        complete = False
                         self.scraper.handle_error()
 
                 self.logger.debug('Done course')
 
+        except SessionExpired:
+            raise
+
         except Exception:
+            complete = False
             self.scraper.handle_error()
 
-        ic_action = {'ICAction': 'DERIVED_SAA_CRS_RETURN_PB$163$'}
-        self._request_page(ic_action)
-
-    def _login(self):
-        # Emulate a SOLUS login via a Selenium webdriver. Mainly used for user
-        # authentication. Returns session cookies, which are retrieved and used
-        # for the remainder of this scraping session.
-
-        def run_selenium_routine(func):
-            """Execute Selenium task and retry upon failure."""
-            retries = 0
-
-            while retries < 3:
-                try:
-                    return func()
-                except Exception as ex:
-                    self.logger.error(
-                        'Selenium error #%s: %s', retries + 1, ex,
-                        exc_info=True)
-
-                    retries += 1
-                    continue
-
-        self.logger.info('Running webdriver for authentication...')
-
-        chrome_options = Options()
-
-        # Prevent images from loading.
-        prefs = {'profile.managed_default_content_settings.images': 2}
-
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_experimental_option('prefs', prefs)
-
-        driver = webdriver.Chrome(chrome_options=chrome_options)
-
-        # Timeout to for an element to be found.
-        driver.implicitly_wait(30)
-        driver.set_page_load_timeout(30)
-        driver.get('https://my.queensu.ca')
+        for section_future in section_futures:
+            try:
+                section_files.add(self.sections.add(*section_future.result()))
 
-        # Sometimes, Selenium errors out when searching for certain fields.
-        # Retry this routine until it succeeds.
-        run_selenium_routine(
-            lambda: driver.find_element_by_id('username').send_keys(
-                QUEENS_USERNAME
-            )
-        )
+            except Exception:
+                complete = False
+                self.scraper.handle_error()
 
-        run_selenium_routine(
-            lambda: driver.find_element_by_id('password').send_keys(
-                QUEENS_PASSWORD
-            )
-        )
+        # Write every section of the course in one go.
+        self.sections.flush(section_files)
 
-        run_selenium_routine(
-            lambda: driver.find_element_by_class_name('form-button').click()
-        )
+        ic_action = {'ICAction': 'DERIVED_SAA_CRS_RETURN_PB$163$'}
+        self._request_page(ic_action, parse_only=self.inputs_only)
 
-        run_selenium_routine(
-            lambda: driver.find_element_by_class_name('solus-tab').click()
-        )
+        return complete
 
-        iframe = run_selenium_routine(
-            lambda: driver.find_element_by_id('ptifrmtgtframe')
-        )
+    def _request_page(self, params=None, parse_only=None, parse=True):
+        def is_login(page):
+            """Check a parsed or unparsed page for a login form."""
+            if parse:
+                return is_login_page(page)
 
-        driver.switch_to_frame(iframe)
+            return is_login_markup(page.content)
 
-        run_selenium_routine(
-            lambda: driver.find_element_by_link_text('Search').click()
+        page = self.scraper.http_request(
+            url=self.host,
+            params=params,
+            parse=parse,
+            parse_only=parse_only,
         )
 
-        session_cookies = {}
-
-        for cookie in driver.get_cookies():
-            session_cookies[cookie['name']] = cookie['value']
-
-        driver.close()
+        # Only this session's login is renewed. Sessions sharing it pick up
+        # the new cookies when they hit the login page themselves.
+        if is_login(page):
+            self.logger.info('SOLUS login expired. Re-authenticating...')
+            self._set_cookies(
+                self.auth.refresh(self.login_slot, self.cookies))
 
-        self.logger.info('Webdriver authentication complete')
+            # The new PeopleSoft session has none of the navigation state the
+            # request relied on, so it can't just be replayed.
+            raise SessionExpired()
 
-        return session_cookies
+        return page
 
-    def _request_page(self, params=None):
-        return self.scraper.http_request(
-            url=self.host,
-            params=params,
-            cookies=self.cookies
-        )
+    def _set_cookies(self, cookies):
+        # Start a new PeopleSoft session with a login's authentication
+        # cookies. SOLUS sets the session cookie in the emptied cookie jar.
+        self.cookies = cookies
+        self.scraper.session.cookies.clear()
+        self.scraper.session.cookies.update(cookies)
 
     def _get_hidden_params(self, soup):
         # Parses HTML for hidden values that represent SOLUS parameters. SOLUS
@@ -467,335 +849,3 @@ class CourseSession:
         }
 
         return data
-
-    def _parse_course_data(self, soup):
-        # All HTML IDs used via regular expressions.
-        regex_title = re.compile('DERIVED_CRSECAT_DESCR200')
-        regex_campus = re.compile('CAMPUS_TBL_DESCR')
-        regex_desc = re.compile('SSR_CRSE_OFF_VW_DESCRLONG')
-        regex_units = re.compile('DERIVED_CRSECAT_UNITS_RANGE')
-        regex_basis = re.compile('SSR_CRSE_OFF_VW_GRADING_BASIS')
-        regex_ac_lvl = re.compile('SSR_CRSE_OFF_VW_ACAD_CAREER')
-        regex_ac_grp = re.compile('ACAD_GROUP_TBL_DESCR')
-        regex_ac_org = re.compile('ACAD_ORG_TBL_DESCR')
-        regex_crse_cmps = re.compile('ACE_SSR_DUMMY_RECVW')
-        regex_enroll_tbl = re.compile('ACE_DERIVED_CRSECAT_SSR_GROUP2')
-        regex_enroll_div = re.compile('win0div')
-        regex_ceab = re.compile('ACE_DERIVED_CLSRCH')
-
-        def filter_course_name(soup):
-            """Preprocess and reformat course name."""
-            course_title = soup.find('span', id=regex_title).text.strip()
-            name_idx = course_title.find('-')
-
-            dept_raw, course_code_raw = course_title[:name_idx - 1].split(' ')
-            course_name = course_title[name_idx + 1:].strip()
-
-            dept = dept_raw.encode('ascii', 'ignore').decode().strip()
-            course_code = course_code_raw.encode(
-                'ascii', 'ignore').decode().strip()
-
-            return dept, course_code, course_name
-
-        def filter_description(soup):
-            """Filter description for the course description text only."""
-
-            # TODO: Filter different text sections from description, such as
-            # 'NOTE', 'LEARNING HOURS', etc.
-            descr_raw = soup.find('span', id=regex_desc)
-
-            if not descr_raw:
-                return ''
-
-            # If <br/> tags exist, there will be additional information other
-            # than the description. Filter for description only.
-            if descr_raw.find_all('br'):
-                return descr_raw.find_all('br')[0].previous_sibling
-
-            return descr_raw.text.encode('ascii', 'ignore').decode().strip()
-
-        def create_dict(rows, tag, tag_id=None, start=0, enroll=False):
-            """Create dictionary out of BeautifulSoup objects.
-
-            Args:
-                rows: List of BeautifulSoup element tags.
-                tag: String of certain element tag to find with BeautifulSoup.
-                tag_id: String of an element tag's ID to search for.
-                start: Numerical index of where to preprocess string name.
-                enroll: Boolean to determine if for the enrollment section.
-
-            Returns:
-                Dictionary of data.
-            """
-            enrollment_info_map = {
-                'Enrollment Requirement': 'requirements',
-                'Add Consent': 'add_consent',
-                'Drop Consent': 'drop_consent',
-            }
-
-            data = {}
-
-            for row in rows:
-                name_raw, desc_raw = row.find_all(tag, id=tag_id)[start:]
-                name = name_raw.text.strip()
-                desc = desc_raw.text.encode('ascii', 'ignore').decode().strip()
-
-                if enroll:
-                    name = enrollment_info_map[name]
-                else:
-                    name = name.lower().replace(' / ', '_')
-
-                data.update({name: desc})
-
-            return data
-
-        def create_ceab_dict(soup):
-            """Create dictionary out of CEAB BeautifulSoup HTML object."""
-            ceab_map = {
-                'Basic Sci': 'basic_sci',
-                'Comp St': 'comp_st',
-                'End Des': 'end_des',
-                'Eng Sci': 'eng_sci',
-                'Math': 'math',
-            }
-
-            ceab_data = {}
-            ceab_units = (
-                soup.find('table', id=regex_ceab)  # CEAB table.
-                .find_all('tr')[1]  # Data is only in 2nd row.
-                .find_all('td')[1:]  # First cell is metadata.
-            )
-
-            # Iteration by twos. Format: Name, Units.
-            for i in range(0, len(ceab_units), 2):
-                name = ceab_units[i].text.strip().strip(':')
-                units = ceab_units[i + 1].text.strip().strip(':')
-
-                ceab_data.update(
-                    {ceab_map[name]: float(units) if units else 0}
-                )
-
-            return ceab_data
-
-        department, course_code, course_name = filter_course_name(soup)
-
-        # =========================== Course Detail ===========================
-        academic_level = soup.find('span', id=regex_ac_lvl).text.strip()
-
-        # Note: Anomaly scenario of LAW 696 having a range of units, such as
-        # "2.00 - 8.00". This is handled by splitting and taking the larger
-        # number.
-        units = float(
-            soup.find('span', id=regex_units).text.strip().split(' - ')[-1])
-        grading_basis = soup.find('span', id=regex_basis).text.strip()
-        academic_group = soup.find('span', id=regex_ac_grp).text.strip()
-        academic_org = soup.find('span', id=regex_ac_org).text.strip()
-
-        # Some sections have no campus listed.
-        campus_raw = soup.find('span', id=regex_campus)
-        campus = campus_raw.text.strip() if campus_raw else 'None'
-
-        # Course_components is a dict of data.
-        course_components_rows = soup.find(
-            'table', id=regex_crse_cmps).find_all('tr')[1:]
-        course_components = create_dict(course_components_rows, 'td', start=1)
-
-        # NOTE: The following fields potentially could be missing data.
-
-        # ======================= Enrollment Information ======================
-        enrollment_table = soup.find('table', id=regex_enroll_tbl)
-        enrollment_info_rows = enrollment_table.find_all(
-            'tr')[1:] if enrollment_table else []
-
-        # Will not exist for 2nd half of full-year courses, like MATH 121B.
-        enroll_info = create_dict(
-            enrollment_info_rows, 'div', tag_id=regex_enroll_div, enroll=True)
-
-        # ============================ Description ============================
-        description = filter_description(soup)
-
-        # ============================ CEAB Units =============================
-        ceab_data = create_ceab_dict(soup)
-
-        data = {
-            'id': '{}-{}'.format(department, course_code),
-            'department': department,
-            'course_code': course_code,
-            'course_name': course_name,
-            'campus': campus,
-            'description': description,
-            'grading_basis': grading_basis,
-            'course_components': course_components,
-            'requirements': enroll_info.get('requirements', ''),
-            'add_consent': enroll_info.get('add_consent', ''),
-            'drop_consent': enroll_info.get('drop_consent', ''),
-            'academic_level': academic_level,
-            'academic_group': academic_group,
-            'academic_org': academic_org,
-            'units': units,
-            'CEAB': ceab_data,
-        }
-
-        # Retain key-value order of dictionary.
-        return OrderedDict(data)
-
-    def _parse_course_section_data(self, soup, basic_data, section_name):
-        day_map = {
-            'Mo': 'Monday',
-            'Tu': 'Tuesday',
-            'We': 'Wednesday',
-            'Th': 'Thursday',
-            'Fr': 'Friday',
-            'Sa': 'Saturday',
-            'Su': 'Sunday',
-        }
-
-        # =========================== Class Details ===========================
-        _, year_term, section_type = soup.find(
-            'span',
-            id='DERIVED_CLSRCH_SSS_PAGE_KEYDESCR').text.strip().split(' | ')
-
-        # Trim spaces in 'Lecture / Discussion'.
-        section_type = section_type.replace(' ', '')
-        year, term = year_term.split(' ')
-        section_number = soup.find(
-            'span',
-            id='DERIVED_CLSRCH_DESCR200').text.strip().split(' - ')[1][:3]
-        class_number = soup.find(
-            'span', id='SSR_CLS_DTL_WRK_CLASS_NBR').text.strip()
-
-        # ======================== Meeting Information ========================
-        course_dates = []
-
-        # See how many rows of class times there are.
-        date_rows = soup.find_all(
-            'tr', id=re.compile(r'trSSR_CLSRCH_MTG\$[0-9]+_row'))
-
-        # Note: Some rows have dates such as "MoTu 9:30AM - 10:30AM".
-        for date_row in date_rows:
-            days = []
-
-            # NOTE: Some (incorrect) sections will have a missing day, such as
-            # listings like "12:00AM - 12:00AM" instead of "Mo 8:30AM - 9:30AM"
-            # Filter out hyphen to ensure the ordering of start/end indices
-            # are consistent.
-            date_times = date_row.find(
-                'span', id=re.compile(r'MTG_SCHED\$')
-            ).text.strip().replace(' - ', ' ').split(' ')
-
-            if 'TBA' in date_times:
-                start_time = end_time = 'TBA'
-            else:
-                # No day is listed. Mark as null.
-                day_str = date_times[0] if len(date_times) > 2 else 'n/a'
-                start_time = parse_datetime(date_times[-2])[1][:5]
-                end_time = parse_datetime(date_times[-1])[1][:5]
-
-                for day_short, day_long in day_map.items():
-                    if day_short in day_str:
-                        days.append(day_long)
-
-                # If no day_str exists, mark day as n/a to be flagged later.
-                if not days:
-                    days.append(day_str)
-
-            location = soup.find(
-                'span', id=re.compile(r'MTG_LOC\$')).text.strip()
-            instructors_raw = soup.find(
-                'span', id=re.compile(r'MTG_INSTR\$')
-            ).text.strip().split(', \r')
-
-            # Turn "Last,First" into "Last, First".
-            instructors = [ins.replace(',', ', ') for ins in instructors_raw]
-
-            # Start/end dates for a partcular SECTION.
-            meeting_dates = soup.find(
-                'span', id=re.compile(r'MTG_DATE\$')
-            ).text.strip().split(' - ')
-
-            if 'TBA' in meeting_dates:
-                start_date = end_date = 'TBA'
-            else:
-                start_date, end_date = [
-                    parse_datetime(date)[0] for date in
-                    soup.find('span', id=re.compile(r'MTG_DATE\$'))
-                    .text.strip().split(' - ')
-                ]
-
-            course_date = {
-                'day': 'TBA' if 'TBA' in date_times else None,
-                'start_time': start_time,
-                'end_time': end_time,
-                'start_date': start_date,
-                'end_date': end_date,
-                'location': location,
-                'instructors': instructors,
-            }
-
-            if course_date['day'] == 'TBA':
-                course_dates.append(OrderedDict(course_date))
-            else:
-                for day in days:
-                    # Flag non-existent day as empty string.
-                    course_date['day'] = '' if day == 'n/a' else day
-                    course_dates.append(OrderedDict(course_date))
-
-        # ========================= Class Availability ========================
-        enrollment_capacity = int(soup.find(
-            'div', id='win0divSSR_CLS_DTL_WRK_ENRL_CAP').text.strip())
-        enrollment_total = int(soup.find(
-            'div', id='win0divSSR_CLS_DTL_WRK_ENRL_TOT').text.strip())
-        waitlist_capacity = int(soup.find(
-            'div', id='win0divSSR_CLS_DTL_WRK_WAIT_CAP').text.strip())
-        waitlist_total = int(soup.find(
-            'div', id='win0divSSR_CLS_DTL_WRK_WAIT_TOT').text.strip())
-
-        # ========================== Combined Section =========================
-        combined_with = []
-
-        combined_rows = soup.find_all(
-            'tr', id=re.compile(r'trSCTN_CMBND\$[0-9]+_row')) or []
-
-        for combined_row in combined_rows:
-            combined_section_number = (combined_row.find(
-                'span', id=re.compile(r'CLASS_NAME\$')
-            ).text.split('(')[1][:-1])
-
-            if combined_section_number != class_number:
-                combined_with.append(combined_section_number)
-
-        # Used for creating unique ID.
-        code = basic_data.get('course_code', '')
-        dept = basic_data.get('department', '')
-        a_lvl = basic_data.get('academic_level', '')
-        campus = basic_data.get('campus', '')
-
-        cid = make_course_id(year, term, a_lvl, campus, dept, code, '-', False)
-
-        course_data = {
-            'id': cid,
-            'year': year,
-            'term': term,
-            'department': dept,
-            'course_code': code,
-            'course_name': basic_data.get('course_name', ''),
-            'units': basic_data.get('units', ''),
-            'campus': campus,
-            'academic_level': a_lvl,
-        }
-
-        section_data = {
-            'section_name': section_name,
-            'section_type': section_type,
-            'section_number': section_number,
-            'class_number': class_number,
-            'dates': course_dates,
-            'combined_with': combined_with,
-            'enrollment_capacity': enrollment_capacity,
-            'enrollment_total': enrollment_total,
-            'waitlist_capacity': waitlist_capacity,
-            'waitlist_total': waitlist_total,
-            'last_updated': pendulum.now().isoformat(),
-        }
-
-        return OrderedDict(course_data), OrderedDict(section_data)
@@ -5,11 +5,23 @@ quartzscrapers.scrapers.courses.courses_helpers
 This module contains auxiliary functions for the courses module.
 """
 
+import os
+import re
+import json
+import time
 import logging.config
+from threading import Lock
 
 import yaml
 import pendulum
 
+# Password input of a login page, by type or by ID.
+LOGIN_INPUT = re.compile(
+    rb'<input\b[^>]*\b(type\s*=\s*["\']?password\b'
+    rb'|id\s*=\s*["\']?(password|pwd)["\'\s/>])',
+    re.IGNORECASE,
+)
+
 
 def setup_logging():
     """Initialize logging."""
@@ -27,6 +39,91 @@ def setup_logging():
     return logging.getLogger(__name__)
 
 
+def is_login_page(soup):
+    """Check if SOLUS responded with a login page instead of content.
+
+    SOLUS sends unauthenticated requests, such as ones with expired cookies,
+    to a sign-in page. Those are the only pages with a password field.
+
+    Args:
+        soup: BeautifulSoup object of a SOLUS response.
+
+    Returns:
+        Bool of whether the page asks for credentials.
+    """
+    regex = re.compile('^(password|pwd)$')
+
+    # Input types are case-insensitive, as in `is_login_markup`.
+    password_type = re.compile('^password$', re.IGNORECASE)
+
+    return bool(
+        soup.find('input', type=password_type)
+        or soup.find('input', id=regex)
+    )
+
+
+def is_login_markup(content):
+    """Check if SOLUS responded with a login page, before parsing it.
+
+    Same check as `is_login_page`, for pages handed to a parser pool
+    unparsed.
+
+    Args:
+        content: Bytes of a SOLUS response.
+
+    Returns:
+        Bool of whether the page asks for credentials.
+    """
+    return bool(LOGIN_INPUT.search(content))
+
+
+def load_cookies(filepath):
+    """Load SOLUS session cookies saved by a previous login.
+
+    Args:
+        filepath: String location of the cookie file.
+
+    Returns:
+        Dictionary of session cookies, or None if missing or expired.
+    """
+    try:
+        with open(filepath, 'r') as file:
+            saved = json.loads(file.read())
+    except (OSError, ValueError):
+        return None
+
+    # Session cookies have no expiry and are kept until SOLUS rejects them.
+    if saved['expires'] and saved['expires'] <= time.time():
+        return None
+
+    return saved['cookies']
+
+
+def save_cookies(cookies, expires, filepath):
+    """Save SOLUS session cookies to a file only readable by its owner.
+
+    Args:
+        cookies: Dictionary of session cookies.
+        expires: Epoch time of the earliest cookie expiry, or None.
+        filepath: String location of the cookie file.
+    """
+    directory = os.path.dirname(filepath)
+
+    if not os.path.exists(directory):
+        os.makedirs(directory, mode=0o700)
+
+    saved = {'expires': expires, 'cookies': cookies}
+
+    # Create with owner-only permissions before any credentials are written.
+    descriptor = os.open(
+        filepath + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+
+    with os.fdopen(descriptor, 'w') as file:
+        file.write(json.dumps(saved))
+
+    os.replace(filepath + '.tmp', filepath)
+
+
 def parse_datetime(datetime):
     """Parse datetimes in ISO format"""
     return pendulum.parse(datetime, strict=False).isoformat().split('T')
@@ -111,27 +208,76 @@ def save_course_data(course_data, scraper, location):
     scraper.logger.debug('Course data saved')
 
 
-def save_section_data(course_data, section_data, scraper, location):
-    """Preprocess and save course section data to JSON.
+class SectionAggregator:
+    """Gather course sections in memory and write each course's file once.
 
-    Args:
-        course_data: Dictionary of course data.
-        section_data: Dictionary of course section data.
-        scraper: Base scraper object.
-        location: String location output files.
+    Sections are grouped by course file, which is unique per year, term,
+    academic level, campus, department and course code. The aggregator is
+    shared by every course session, so all access is locked.
     """
 
-    key = 'course_sections'
-    filepath = '{}/sections'.format(location)
-    filename = make_course_id(
-        course_data['year'],
-        course_data['term'],
-        course_data['academic_level'],
-        course_data['campus'],
-        course_data['department'],
-        course_data['course_code'],
-        '_',
-    )
+    def __init__(self, scraper, location):
+        self.scraper = scraper
+        self.location = '{}/sections'.format(location)
+        self.lock = Lock()
+        self.courses = {}
+        self.written = set()
+
+    def add(self, course_data, section_data):
+        """Buffer a course section.
+
+        Args:
+            course_data: Dictionary of course data.
+            section_data: Dictionary of course section data.
+
+        Returns:
+            String filename the section will be written to.
+        """
+        filename = make_course_id(
+            course_data['year'],
+            course_data['term'],
+            course_data['academic_level'],
+            course_data['campus'],
+            course_data['department'],
+            course_data['course_code'],
+            '_',
+        )
+
+        with self.lock:
+            if filename not in self.courses:
+                self.courses[filename] = course_data
+                course_data['course_sections'] = []
+
+            self.courses[filename]['course_sections'].append(section_data)
+
+        return filename
+
+    def flush(self, filenames):
+        """Write buffered sections of finished courses to JSON.
+
+        Args:
+            filenames: Iterable of filenames returned by `add`.
+        """
+        with self.lock:
+            for filename in filenames:
+                data = self.courses.pop(filename, None)
+
+                if not data:
+                    continue
+
+                # Course files are written once per run. Should a course be
+                # revisited, merge with what this run already wrote.
+                if filename in self.written:
+                    sections = self.scraper.storage.read(
+                        filename, self.location)['course_sections']
+
+                    data['course_sections'] = (
+                        sections + data['course_sections'])
+
+                self.scraper.write_data(data, filename, self.location)
+                self.written.add(filename)
 
-    scraper.update_data(course_data, section_data, key, filename, filepath)
-    scraper.logger.debug('Section data saved')
+                self.scraper.logger.debug(
+                    'Section data saved (%s sections)',
+                    len(data['course_sections']),
+                )
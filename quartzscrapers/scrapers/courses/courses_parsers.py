@@ -0,0 +1,425 @@
+"""
+quartzscrapers.scrapers.courses.courses_parsers
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the parsers of SOLUS course and section pages.
+"""
+
+import re
+from collections import OrderedDict
+
+import pendulum
+
+from .courses_helpers import parse_datetime, make_course_id
+
+
+class IdIndex:
+    """Index of the elements of a page that have an ID.
+
+    SOLUS pages are searched by element ID dozens of times each. The index
+    is built in one walk of the page, after which a search only scans the
+    elements with an ID instead of every node. Searches return the same
+    elements, in the same order, as searching the page itself.
+    """
+
+    def __init__(self, soup):
+        self.elements = soup.find_all(id=True)
+        self.elements_by_id = {}
+
+        for element in self.elements:
+            self.elements_by_id.setdefault(element['id'], []).append(element)
+
+    def find(self, name, element_id):
+        """Find the first element of a tag name with a matching ID.
+
+        Args:
+            name: String of element tag name.
+            element_id: String of an exact ID, or compiled regular expression
+                to search IDs with.
+
+        Returns:
+            BeautifulSoup element tag, or None if there's no match.
+        """
+        return next(self._iter_matches(name, element_id), None)
+
+    def find_all(self, name, element_id):
+        """Find every element of a tag name with a matching ID.
+
+        Args:
+            name: String of element tag name.
+            element_id: String of an exact ID, or compiled regular expression
+                to search IDs with.
+
+        Returns:
+            List of BeautifulSoup element tags, in page order.
+        """
+        return list(self._iter_matches(name, element_id))
+
+    def _iter_matches(self, name, element_id):
+        # Only elements with exactly the ID are candidates for a string.
+        if isinstance(element_id, str):
+            elements = self.elements_by_id.get(element_id, [])
+        else:
+            elements = (
+                element for element in self.elements
+                if element_id.search(element['id'])
+            )
+
+        return (element for element in elements if element.name == name)
+
+
+def parse_course_data(soup):
+    """Parse course data out of a SOLUS course page.
+
+    Args:
+        soup: BeautifulSoup object of course page.
+
+    Returns:
+        Ordered dictionary of course data.
+    """
+    page = IdIndex(soup)
+
+    # All HTML IDs used via regular expressions.
+    regex_title = re.compile('DERIVED_CRSECAT_DESCR200')
+    regex_campus = re.compile('CAMPUS_TBL_DESCR')
+    regex_desc = re.compile('SSR_CRSE_OFF_VW_DESCRLONG')
+    regex_units = re.compile('DERIVED_CRSECAT_UNITS_RANGE')
+    regex_basis = re.compile('SSR_CRSE_OFF_VW_GRADING_BASIS')
+    regex_ac_lvl = re.compile('SSR_CRSE_OFF_VW_ACAD_CAREER')
+    regex_ac_grp = re.compile('ACAD_GROUP_TBL_DESCR')
+    regex_ac_org = re.compile('ACAD_ORG_TBL_DESCR')
+    regex_crse_cmps = re.compile('ACE_SSR_DUMMY_RECVW')
+    regex_enroll_tbl = re.compile('ACE_DERIVED_CRSECAT_SSR_GROUP2')
+    regex_enroll_div = re.compile('win0div')
+    regex_ceab = re.compile('ACE_DERIVED_CLSRCH')
+
+    def filter_course_name(page):
+        """Preprocess and reformat course name."""
+        course_title = page.find('span', regex_title).text.strip()
+        name_idx = course_title.find('-')
+
+        dept_raw, course_code_raw = course_title[:name_idx - 1].split(' ')
+        course_name = course_title[name_idx + 1:].strip()
+
+        dept = dept_raw.encode('ascii', 'ignore').decode().strip()
+        course_code = course_code_raw.encode(
+            'ascii', 'ignore').decode().strip()
+
+        return dept, course_code, course_name
+
+    def filter_description(page):
+        """Filter description for the course description text only."""
+
+        # TODO: Filter different text sections from description, such as
+        # 'NOTE', 'LEARNING HOURS', etc.
+        descr_raw = page.find('span', regex_desc)
+
+        if not descr_raw:
+            return ''
+
+        # If <br/> tags exist, there will be additional information other
+        # than the description. Filter for description only.
+        if descr_raw.find_all('br'):
+            return descr_raw.find_all('br')[0].previous_sibling
+
+        return descr_raw.text.encode('ascii', 'ignore').decode().strip()
+
+    def create_dict(rows, tag, tag_id=None, start=0, enroll=False):
+        """Create dictionary out of BeautifulSoup objects.
+
+        Args:
+            rows: List of BeautifulSoup element tags.
+            tag: String of certain element tag to find with BeautifulSoup.
+            tag_id: String of an element tag's ID to search for.
+            start: Numerical index of where to preprocess string name.
+            enroll: Boolean to determine if for the enrollment section.
+
+        Returns:
+            Dictionary of data.
+        """
+        enrollment_info_map = {
+            'Enrollment Requirement': 'requirements',
+            'Add Consent': 'add_consent',
+            'Drop Consent': 'drop_consent',
+        }
+
+        data = {}
+
+        for row in rows:
+            name_raw, desc_raw = row.find_all(tag, id=tag_id)[start:]
+            name = name_raw.text.strip()
+            desc = desc_raw.text.encode('ascii', 'ignore').decode().strip()
+
+            if enroll:
+                name = enrollment_info_map[name]
+            else:
+                name = name.lower().replace(' / ', '_')
+
+            data.update({name: desc})
+
+        return data
+
+    def create_ceab_dict(page):
+        """Create dictionary out of CEAB BeautifulSoup HTML object."""
+        ceab_map = {
+            'Basic Sci': 'basic_sci',
+            'Comp St': 'comp_st',
+            'End Des': 'end_des',
+            'Eng Sci': 'eng_sci',
+            'Math': 'math',
+        }
+
+        ceab_data = {}
+        ceab_units = (
+            page.find('table', regex_ceab)  # CEAB table.
+            .find_all('tr')[1]  # Data is only in 2nd row.
+            .find_all('td')[1:]  # First cell is metadata.
+        )
+
+        # Iteration by twos. Format: Name, Units.
+        for i in range(0, len(ceab_units), 2):
+            name = ceab_units[i].text.strip().strip(':')
+            units = ceab_units[i + 1].text.strip().strip(':')
+
+            ceab_data.update(
+                {ceab_map[name]: float(units) if units else 0}
+            )
+
+        return ceab_data
+
+    department, course_code, course_name = filter_course_name(page)
+
+    # =========================== Course Detail ===========================
+    academic_level = page.find('span', regex_ac_lvl).text.strip()
+
+    # Note: Anomaly scenario of LAW 696 having a range of units, such as
+    # "2.00 - 8.00". This is handled by splitting and taking the larger
+    # number.
+    units = float(
+        page.find('span', regex_units).text.strip().split(' - ')[-1])
+    grading_basis = page.find('span', regex_basis).text.strip()
+    academic_group = page.find('span', regex_ac_grp).text.strip()
+    academic_org = page.find('span', regex_ac_org).text.strip()
+
+    # Some sections have no campus listed.
+    campus_raw = page.find('span', regex_campus)
+    campus = campus_raw.text.strip() if campus_raw else 'None'
+
+    # Course_components is a dict of data.
+    course_components_rows = page.find(
+        'table', regex_crse_cmps).find_all('tr')[1:]
+    course_components = create_dict(course_components_rows, 'td', start=1)
+
+    # NOTE: The following fields potentially could be missing data.
+
+    # ======================= Enrollment Information ======================
+    enrollment_table = page.find('table', regex_enroll_tbl)
+    enrollment_info_rows = enrollment_table.find_all(
+        'tr')[1:] if enrollment_table else []
+
+    # Will not exist for 2nd half of full-year courses, like MATH 121B.
+    enroll_info = create_dict(
+        enrollment_info_rows, 'div', tag_id=regex_enroll_div, enroll=True)
+
+    # ============================ Description ============================
+    description = filter_description(page)
+
+    # ============================ CEAB Units =============================
+    ceab_data = create_ceab_dict(page)
+
+    data = {
+        'id': '{}-{}'.format(department, course_code),
+        'department': department,
+        'course_code': course_code,
+        'course_name': course_name,
+        'campus': campus,
+        'description': description,
+        'grading_basis': grading_basis,
+        'course_components': course_components,
+        'requirements': enroll_info.get('requirements', ''),
+        'add_consent': enroll_info.get('add_consent', ''),
+        'drop_consent': enroll_info.get('drop_consent', ''),
+        'academic_level': academic_level,
+        'academic_group': academic_group,
+        'academic_org': academic_org,
+        'units': units,
+        'CEAB': ceab_data,
+    }
+
+    # Retain key-value order of dictionary.
+    return OrderedDict(data)
+
+
+def parse_course_section_data(soup, basic_data, section_name):
+    """Parse course and section data out of a SOLUS section page.
+
+    Args:
+        soup: BeautifulSoup object of section page.
+        basic_data: Dictionary of course data of the section's course.
+        section_name: String name of section, such as 'LEC-001'.
+
+    Returns:
+        Tuple of ordered dictionaries of course data and section data.
+    """
+    page = IdIndex(soup)
+
+    day_map = {
+        'Mo': 'Monday',
+        'Tu': 'Tuesday',
+        'We': 'Wednesday',
+        'Th': 'Thursday',
+        'Fr': 'Friday',
+        'Sa': 'Saturday',
+        'Su': 'Sunday',
+    }
+
+    # =========================== Class Details ===========================
+    _, year_term, section_type = page.find(
+        'span',
+        'DERIVED_CLSRCH_SSS_PAGE_KEYDESCR').text.strip().split(' | ')
+
+    # Trim spaces in 'Lecture / Discussion'.
+    section_type = section_type.replace(' ', '')
+    year, term = year_term.split(' ')
+    section_number = page.find(
+        'span',
+        'DERIVED_CLSRCH_DESCR200').text.strip().split(' - ')[1][:3]
+    class_number = page.find(
+        'span', 'SSR_CLS_DTL_WRK_CLASS_NBR').text.strip()
+
+    # ======================== Meeting Information ========================
+    course_dates = []
+
+    # See how many rows of class times there are.
+    date_rows = page.find_all(
+        'tr', re.compile(r'trSSR_CLSRCH_MTG\$[0-9]+_row'))
+
+    # NOTE: Location, instructors and meeting dates are read from the first
+    # meeting row of the page, and shared by every meeting.
+    if date_rows:
+        location = page.find(
+            'span', re.compile(r'MTG_LOC\$')).text.strip()
+        instructors_raw = page.find(
+            'span', re.compile(r'MTG_INSTR\$')
+        ).text.strip().split(', \r')
+
+        # Turn "Last,First" into "Last, First".
+        instructors = [ins.replace(',', ', ') for ins in instructors_raw]
+
+        # Start/end dates for a partcular SECTION.
+        meeting_dates = page.find(
+            'span', re.compile(r'MTG_DATE\$')
+        ).text.strip().split(' - ')
+
+        if 'TBA' in meeting_dates:
+            start_date = end_date = 'TBA'
+        else:
+            start_date, end_date = [
+                parse_datetime(date)[0] for date in meeting_dates
+            ]
+
+    # Note: Some rows have dates such as "MoTu 9:30AM - 10:30AM".
+    for date_row in date_rows:
+        days = []
+
+        # NOTE: Some (incorrect) sections will have a missing day, such as
+        # listings like "12:00AM - 12:00AM" instead of "Mo 8:30AM - 9:30AM"
+        # Filter out hyphen to ensure the ordering of start/end indices
+        # are consistent.
+        date_times = date_row.find(
+            'span', id=re.compile(r'MTG_SCHED\$')
+        ).text.strip().replace(' - ', ' ').split(' ')
+
+        if 'TBA' in date_times:
+            start_time = end_time = 'TBA'
+        else:
+            # No day is listed. Mark as null.
+            day_str = date_times[0] if len(date_times) > 2 else 'n/a'
+            start_time = parse_datetime(date_times[-2])[1][:5]
+            end_time = parse_datetime(date_times[-1])[1][:5]
+
+            for day_short, day_long in day_map.items():
+                if day_short in day_str:
+                    days.append(day_long)
+
+            # If no day_str exists, mark day as n/a to be flagged later.
+            if not days:
+                days.append(day_str)
+
+        course_date = {
+            'day': 'TBA' if 'TBA' in date_times else None,
+            'start_time': start_time,
+            'end_time': end_time,
+            'start_date': start_date,
+            'end_date': end_date,
+            'location': location,
+            'instructors': instructors,
+        }
+
+        if course_date['day'] == 'TBA':
+            course_dates.append(OrderedDict(course_date))
+        else:
+            for day in days:
+                # Flag non-existent day as empty string.
+                course_date['day'] = '' if day == 'n/a' else day
+                course_dates.append(OrderedDict(course_date))
+
+    # ========================= Class Availability ========================
+    enrollment_capacity = int(page.find(
+        'div', 'win0divSSR_CLS_DTL_WRK_ENRL_CAP').text.strip())
+    enrollment_total = int(page.find(
+        'div', 'win0divSSR_CLS_DTL_WRK_ENRL_TOT').text.strip())
+    waitlist_capacity = int(page.find(
+        'div', 'win0divSSR_CLS_DTL_WRK_WAIT_CAP').text.strip())
+    waitlist_total = int(page.find(
+        'div', 'win0divSSR_CLS_DTL_WRK_WAIT_TOT').text.strip())
+
+    # ========================== Combined Section =========================
+    combined_with = []
+
+    combined_rows = page.find_all(
+        'tr', re.compile(r'trSCTN_CMBND\$[0-9]+_row')) or []
+
+    for combined_row in combined_rows:
+        combined_section_number = (combined_row.find(
+            'span', id=re.compile(r'CLASS_NAME\$')
+        ).text.split('(')[1][:-1])
+
+        if combined_section_number != class_number:
+            combined_with.append(combined_section_number)
+
+    # Used for creating unique ID.
+    code = basic_data.get('course_code', '')
+    dept = basic_data.get('department', '')
+    a_lvl = basic_data.get('academic_level', '')
+    campus = basic_data.get('campus', '')
+
+    cid = make_course_id(year, term, a_lvl, campus, dept, code, '-', False)
+
+    course_data = {
+        'id': cid,
+        'year': year,
+        'term': term,
+        'department': dept,
+        'course_code': code,
+        'course_name': basic_data.get('course_name', ''),
+        'units': basic_data.get('units', ''),
+        'campus': campus,
+        'academic_level': a_lvl,
+    }
+
+    section_data = {
+        'section_name': section_name,
+        'section_type': section_type,
+        'section_number': section_number,
+        'class_number': class_number,
+        'dates': course_dates,
+        'combined_with': combined_with,
+        'enrollment_capacity': enrollment_capacity,
+        'enrollment_total': enrollment_total,
+        'waitlist_capacity': waitlist_capacity,
+        'waitlist_total': waitlist_total,
+        'last_updated': pendulum.now().isoformat(),
+    }
+
+    return OrderedDict(course_data), OrderedDict(section_data)
@@ -17,10 +17,16 @@ class AlumniReview(Gazette):
     slug = 'alumnireview'
 
     @staticmethod
-    def scrape(deep=False, location='./dumps/news', *args, **kwargs):
+    def scrape(deep=False, location='./dumps/news', resume=False, *args,
+               **kwargs):
         """Scrape information custom to Queen's Alumni Review.
 
         This is a subcategory under Queen's Gazette.
         """
         super(AlumniReview, AlumniReview).scrape(
-            deep, location, 'gazette/alumnireview/stories', AlumniReview.slug)
+            deep,
+            location,
+            'gazette/alumnireview/stories',
+            AlumniReview.slug,
+            resume,
+        )
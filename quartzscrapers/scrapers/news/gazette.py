@@ -11,8 +11,17 @@ from urllib.parse import urljoin
 
 import pendulum
 
-from ..utils import Scraper
-from .news_helpers import save_article, get_article_page
+from ..utils import Scraper, AsyncScraper, HTTPCache, CheckpointJournal
+from .news_helpers import (
+    HighWaterMark,
+    filter_seen_articles,
+    filter_finished_articles,
+    get_article_unit,
+    restore_finished_articles,
+    save_mark,
+    save_article,
+    get_article_data,
+)
 
 
 class Gazette:
@@ -24,7 +33,11 @@ class Gazette:
 
     host = 'http://www.queensu.ca'
     slug = 'gazette'
-    scraper = Scraper()
+    scraper = Scraper(
+        name='news/{}'.format(slug),
+        cache=HTTPCache('news/{}'.format(slug)),
+    )
+    async_scraper = AsyncScraper(scraper)
     logger = scraper.logger
 
     @staticmethod
@@ -33,6 +46,7 @@ class Gazette:
         location='./dumps/news',
         relative_url='gazette/stories/all',
         slug=slug,
+        resume=False,
         *args,
         **kwargs,
     ):
@@ -43,46 +57,92 @@ class Gazette:
             location (optional): String location of output files.
             relative_url: Relative URL for accessing the web paeg.
             slug: Name of the scraper.
+            resume (optional): Bool to skip pages and articles finished by
+                an interrupted scrape.
         """
         Gazette.logger.info('Starting Gazette scrape')
 
+        mark = HighWaterMark(slug, location)
+        checkpoints = CheckpointJournal(
+            'news_{}'.format(slug), resume, Gazette.scraper.storage)
+        restore_finished_articles(checkpoints, mark)
+        failed = False
+
         num_pages = Gazette._get_num_pages(relative_url, deep)
         Gazette.logger.debug('Total Pages: %s', num_pages)
 
         for page_index in range(num_pages):
+            page_unit = 'page:{}'.format(page_index)
+
+            if checkpoints.is_done(page_unit):
+                continue
+
             Gazette.logger.debug('Page %s', page_index + 1)
+            reached_mark = False
+
+            # Whether every article on the page was stored.
+            complete = True
 
             try:
                 article_rel_urls, article_issue_dates = (
                     Gazette._get_article_rel_urls(relative_url, page_index)
                 )
+                issue_dates = dict(zip(article_rel_urls, article_issue_dates))
+
+                # Skip articles saved by an interrupted scrape.
+                article_rel_urls = filter_finished_articles(
+                    checkpoints, Gazette.host, article_rel_urls)
+
+                # Skip articles stored by a previous scrape.
+                article_rel_urls, reached_mark = filter_seen_articles(
+                    mark, Gazette.host, article_rel_urls, Gazette.logger, deep)
+
+                # Request every article on a page concurrently, and parse
+                # them in the parser pool.
+                articles = get_article_data(
+                    Gazette.async_scraper,
+                    Gazette.host,
+                    Gazette.logger,
+                    article_rel_urls,
+                    Gazette._parse_article_data,
+                    [(issue_dates[url], slug) for url in article_rel_urls],
+                )
 
-                urls_dates = zip(article_rel_urls, article_issue_dates)
-
-                for article_rel_url, issue_date in urls_dates:
+                for article_data, article_url in articles:
                     try:
-                        article_page, article_url = get_article_page(
-                            Gazette.scraper,
-                            Gazette.host,
-                            Gazette.logger,
-                            article_rel_url
-                        )
-
-                        article_data = Gazette._parse_article_data(
-                            article_page, article_url, issue_date, slug)
+                        # Re-raise a failed request or parse to log it.
+                        if isinstance(article_data, Exception):
+                            raise article_data
 
                         if article_data:
                             save_article(
                                 Gazette.scraper, article_data, location)
+                            mark.add(article_url)
 
-                        Gazette.scraper.wait()
+                        checkpoints.done(
+                            get_article_unit(article_url),
+                            bool(article_data),
+                        )
 
                     except Exception:
+                        complete = False
+                        mark.add_failed(article_url)
                         Gazette.scraper.handle_error()
 
+                # Pages with failed articles are redone on resume.
+                if complete:
+                    checkpoints.done(page_unit)
+
             except Exception:
+                failed = True
                 Gazette.scraper.handle_error()
 
+            # Remaining pages are older than the stored articles.
+            if reached_mark:
+                break
+
+        save_mark(mark, failed, Gazette.logger)
+        checkpoints.complete()
         Gazette.logger.info('Completed Gazette scrape')
 
     @staticmethod
@@ -131,22 +191,17 @@ class Gazette:
 
         # For alumnireview, there's no published dates due this outlet being
         # an issue-based resource. Parse issue-date year at least for a
-        # date of YYYY-XX-XX.
+        # date of YYYY-XX-XX. Kept as text, to pass on to the parser pool.
         article_issue_dates = [
             article.find('div', class_='story-issue') for article in articles
         ]
+        article_issue_dates = [
+            issue_date.text if issue_date else None
+            for issue_date in article_issue_dates
+        ]
 
         return article_rel_urls, article_issue_dates
 
-    @staticmethod
-    def _get_article_page(article_rel_url):
-        article_url = urljoin(Gazette.host, article_rel_url)
-        article_page = Gazette.scraper.http_request(article_url)
-
-        Gazette.logger.debug('Article: %s', article_url)
-
-        return article_page, article_url
-
     @staticmethod
     def _parse_article_data(article_page, article_url, issue_date, slug):
         title = article_page.find('h1', 'title').text.strip()
@@ -159,7 +214,7 @@ class Gazette:
             published_iso = pendulum.parse(published, strict=False).isoformat()
         else:
             # No date for AlumniReview. Use issue year.
-            issue_year = re.search(r'\d{4}', issue_date.text).group(0)
+            issue_year = re.search(r'\d{4}', issue_date).group(0)
             published_iso = pendulum.parse(issue_year).isoformat()
 
         # NOTE: Queen's gazette doesn't list authors, they either show an
@@ -11,8 +11,18 @@ from urllib.parse import urljoin
 
 import pendulum
 
-from ..utils import Scraper
-from .news_helpers import get_urls_on_depth, get_article_page, save_article
+from ..utils import Scraper, AsyncScraper, HTTPCache, CheckpointJournal
+from .news_helpers import (
+    HighWaterMark,
+    filter_seen_articles,
+    filter_finished_articles,
+    get_article_unit,
+    restore_finished_articles,
+    save_mark,
+    get_urls_on_depth,
+    get_article_data,
+    save_article,
+)
 
 
 class Journal:
@@ -23,19 +33,32 @@ class Journal:
 
     host = 'http://www.queensjournal.ca'
     slug = 'queensjournal'
-    scraper = Scraper()
+    scraper = Scraper(
+        name='news/{}'.format(slug),
+        cache=HTTPCache('news/{}'.format(slug)),
+    )
+    async_scraper = AsyncScraper(scraper)
     logger = scraper.logger
 
     @staticmethod
-    def scrape(deep=False, location='./dumps/news', *args, **kwargs):
+    def scrape(deep=False, location='./dumps/news', resume=False, *args,
+               **kwargs):
         """Scrape information custom to The Queen's Journal.
 
         Args:
             deep: Bool for a scrape of just the curent year, or every archive.
             location (optional): String location of output files.
+            resume (optional): Bool to skip archive pages and articles
+                finished by an interrupted scrape.
         """
         Journal.logger.info('Starting Journal scrape')
 
+        mark = HighWaterMark(Journal.slug, location)
+        checkpoints = CheckpointJournal(
+            'news_{}'.format(Journal.slug), resume, Journal.scraper.storage)
+        restore_finished_articles(checkpoints, mark)
+        failed = False
+
         # QJ divides articles by archive year.
         year_rel_urls = get_urls_on_depth(
             Journal._get_archive_years(), Journal.logger, deep)
@@ -53,28 +76,51 @@ class Journal:
 
                 # Crawl each page for each year.
                 for page_index in range(num_pages):
+                    page_unit = 'page:{}:{}'.format(year_rel_url, page_index)
+
+                    if checkpoints.is_done(page_unit):
+                        continue
+
                     Journal.logger.debug('Page %s', page_index + 1)
+                    reached_mark = False
+
+                    # Whether every article on the page was stored.
+                    complete = True
 
                     try:
                         article_rel_urls = Journal._get_article_rel_urls(
                             year_rel_url, page_index
                         )
 
-                        # Scrape each article on a page.
-                        for article_rel_url in article_rel_urls:
-                            try:
-                                article_page, article_url = get_article_page(
-                                    Journal.scraper,
-                                    Journal.host,
-                                    Journal.logger,
-                                    article_rel_url,
-                                )
+                        # Skip articles saved by an interrupted scrape.
+                        article_rel_urls = filter_finished_articles(
+                            checkpoints, Journal.host, article_rel_urls)
+
+                        # Skip articles stored by a previous scrape.
+                        article_rel_urls, reached_mark = filter_seen_articles(
+                            mark,
+                            Journal.host,
+                            article_rel_urls,
+                            Journal.logger,
+                            deep,
+                        )
 
-                                article_data = (
-                                    Journal._parse_article_data(
-                                        article_page, article_url
-                                    )
-                                )
+                        # Request every article on a page concurrently, and
+                        # parse them in the parser pool.
+                        articles = get_article_data(
+                            Journal.async_scraper,
+                            Journal.host,
+                            Journal.logger,
+                            article_rel_urls,
+                            Journal._parse_article_data,
+                        )
+
+                        # Save each article on a page.
+                        for article_data, article_url in articles:
+                            try:
+                                # Re-raise a failed request or parse to log it.
+                                if isinstance(article_data, Exception):
+                                    raise article_data
 
                                 if article_data:
                                     save_article(
@@ -82,17 +128,36 @@ class Journal:
                                         article_data,
                                         location
                                     )
+                                    mark.add(article_url)
+
+                                checkpoints.done(
+                                    get_article_unit(article_url),
+                                    bool(article_data),
+                                )
 
-                                Journal.scraper.wait()
                             except Exception:
+                                complete = False
+                                mark.add_failed(article_url)
                                 Journal.scraper.handle_error()
 
+                        # Pages with failed articles are redone on resume.
+                        if complete:
+                            checkpoints.done(page_unit)
+
                     except Exception:
+                        failed = True
                         Journal.scraper.handle_error()
 
+                    # Remaining pages are older than the stored articles.
+                    if reached_mark:
+                        break
+
             except Exception:
+                failed = True
                 Journal.scraper.handle_error()
 
+        save_mark(mark, failed, Journal.logger)
+        checkpoints.complete()
         Journal.logger.info('Completed Journal scrape')
 
     @staticmethod
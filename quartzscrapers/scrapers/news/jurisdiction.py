@@ -7,8 +7,18 @@ This module contains the JurisDiction class scraper for parsing news data.
 
 from collections import OrderedDict
 
-from ..utils import Scraper
-from .news_helpers import get_urls_on_depth, get_article_page, save_article
+from ..utils import Scraper, AsyncScraper, HTTPCache, CheckpointJournal
+from .news_helpers import (
+    HighWaterMark,
+    filter_seen_articles,
+    filter_finished_articles,
+    get_article_unit,
+    restore_finished_articles,
+    save_mark,
+    get_urls_on_depth,
+    get_article_data,
+    save_article,
+)
 
 
 class JurisDiction:
@@ -19,19 +29,35 @@ class JurisDiction:
 
     host = 'http://www.juris-diction.ca'
     slug = 'jurisdiction'
-    scraper = Scraper()
+    scraper = Scraper(
+        name='news/{}'.format(slug),
+        cache=HTTPCache('news/{}'.format(slug)),
+    )
+    async_scraper = AsyncScraper(scraper)
     logger = scraper.logger
 
     @staticmethod
-    def scrape(deep=False, location='./dumps/news', *args, **kwargs):
+    def scrape(deep=False, location='./dumps/news', resume=False, *args,
+               **kwargs):
         """Scrape information custom to Juris Diction.
 
         Args:
             deep: Bool for a scrape of just the curent year, or every archive.
             location (optional): String location of output files.
+            resume (optional): Bool to skip archive months and articles
+                finished by an interrupted scrape.
         """
         JurisDiction.logger.info('Starting JurisDiction scrape')
 
+        mark = HighWaterMark(JurisDiction.slug, location)
+        checkpoints = CheckpointJournal(
+            'news_{}'.format(JurisDiction.slug),
+            resume,
+            JurisDiction.scraper.storage,
+        )
+        restore_finished_articles(checkpoints, mark)
+        failed = False
+
         try:
             archive_month_urls = get_urls_on_depth(
                 JurisDiction._get_archive_month_urls(),
@@ -40,19 +66,28 @@ class JurisDiction:
             )
 
             for archive_month_url in archive_month_urls:
+                # Archive months are paginated by following 'next' links, so
+                # only whole months are skipped.
+                archive_unit = 'archive:{}'.format(archive_month_url)
+
+                if checkpoints.is_done(archive_unit):
+                    continue
+
                 try:
                     JurisDiction.logger.debug('ARCHIVE: %s', archive_month_url)
 
-                    archive_page_urls = JurisDiction._get_archive_page_urls(
+                    archive_pages = JurisDiction._get_archive_pages(
                         archive_month_url)
 
                     page_num = 1
 
-                    for archive_page_url in archive_page_urls:
-                        try:
-                            archive_page = JurisDiction.scraper.http_request(
-                                archive_page_url)
+                    # Whether every page and article of the month was stored.
+                    complete = True
+
+                    for archive_page in archive_pages:
+                        reached_mark = False
 
+                        try:
                             JurisDiction.logger.debug('Page %s', page_num)
 
                             article_rel_urls = (
@@ -60,21 +95,40 @@ class JurisDiction:
                                     archive_page)
                             )
 
-                            for article_rel_url in article_rel_urls:
-                                try:
-                                    article_page, article_url = (
-                                        get_article_page(
-                                            JurisDiction.scraper,
-                                            JurisDiction.host,
-                                            JurisDiction.logger,
-                                            article_rel_url,
-                                        )
-                                    )
+                            # Skip articles saved by an interrupted scrape.
+                            article_rel_urls = filter_finished_articles(
+                                checkpoints,
+                                JurisDiction.host,
+                                article_rel_urls,
+                            )
 
-                                    article_data = (
-                                        JurisDiction._parse_article_data(
-                                            article_page, article_url)
-                                    )
+                            # Skip articles stored by a previous scrape.
+                            article_rel_urls, reached_mark = (
+                                filter_seen_articles(
+                                    mark,
+                                    JurisDiction.host,
+                                    article_rel_urls,
+                                    JurisDiction.logger,
+                                    deep,
+                                )
+                            )
+
+                            # Request every article on a page concurrently,
+                            # and parse them in the parser pool.
+                            articles = get_article_data(
+                                JurisDiction.async_scraper,
+                                JurisDiction.host,
+                                JurisDiction.logger,
+                                article_rel_urls,
+                                JurisDiction._parse_article_data,
+                            )
+
+                            for article_data, article_url in articles:
+                                try:
+                                    # Re-raise a failed request or parse to
+                                    # log it.
+                                    if isinstance(article_data, Exception):
+                                        raise article_data
 
                                     if article_data:
                                         save_article(
@@ -82,23 +136,44 @@ class JurisDiction:
                                             article_data,
                                             location,
                                         )
+                                        mark.add(article_url)
 
-                                    JurisDiction.scraper.wait()
+                                    checkpoints.done(
+                                        get_article_unit(article_url),
+                                        bool(article_data),
+                                    )
 
                                 except Exception:
+                                    complete = False
+                                    mark.add_failed(article_url)
                                     JurisDiction.scraper.handle_error()
 
                             page_num += 1
 
                         except Exception:
+                            failed = True
+                            complete = False
                             JurisDiction.scraper.handle_error()
 
+                        # Remaining pages are older than the stored articles.
+                        if reached_mark:
+                            break
+
+                    # Months with failed pages or articles are redone on
+                    # resume.
+                    if complete:
+                        checkpoints.done(archive_unit)
+
                 except Exception:
+                    failed = True
                     JurisDiction.scraper.handle_error()
 
         except Exception:
+            failed = True
             JurisDiction.scraper.handle_error()
 
+        save_mark(mark, failed, JurisDiction.logger)
+        checkpoints.complete()
         JurisDiction.logger.info('Completed JurisDiction scrape')
 
     @staticmethod
@@ -113,22 +188,20 @@ class JurisDiction:
         return archive_month_urls
 
     @staticmethod
-    def _get_archive_page_urls(archive_month_url):
-        # Requests an archive month's URL and crawls the archive for any
-        # additional paginated 'next' URLs, if they exist.
-
-        archive_page_urls = [archive_month_url]
+    def _get_archive_pages(archive_month_url):
+        # Requests an archive month's URL and lazily crawls the archive for
+        # any additional paginated 'next' pages, if they exist. Pages are
+        # only requested once the caller asks for them.
 
         archive_page = JurisDiction.scraper.http_request(archive_month_url)
+        yield archive_page
 
         # Paginate until we no longer see a 'next' button.
         while archive_page.find('a', 'next'):
             archive_page_url = archive_page.find('a', 'next')['href']
-            archive_page_urls.append(archive_page_url)
-
             archive_page = JurisDiction.scraper.http_request(archive_page_url)
 
-        return archive_page_urls
+            yield archive_page
 
     @staticmethod
     def _get_rel_article_urls(archive_page):
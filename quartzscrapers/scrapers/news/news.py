@@ -42,12 +42,16 @@ class News:
     ]
 
     @staticmethod
-    def scrape(deep=False, location=location, *args, **kwargs):
+    def scrape(deep=False, location=location, resume=False, *args,
+               **kwargs):
         """Update database records for news scraper"""
 
+        if not location:
+            location = News.location
+
         News.logger.info('Starting News scrape')
 
         for news_source in News.news_sources:
-            news_source.scrape(deep=deep, location=location)
+            news_source.scrape(deep=deep, location=location, resume=resume)
 
         News.logger.info('Completed News scrape')
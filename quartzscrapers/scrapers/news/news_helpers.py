@@ -5,9 +5,223 @@ quartzscrapers.scrapers.news.news_helpers
 This module contains auxiliary functions for all of the news modules.
 """
 
+import os
 import re
+import json
 from urllib.parse import urljoin
 
+from ..utils import get_parser_pool
+
+
+class HighWaterMark:
+    """Persisted record of the articles a news source has already stored.
+
+    The record holds the set of article URLs already scraped, the articles
+    that failed to scrape with their number of attempts, and whether the
+    last crawl reached every listing page it meant to. It lives next to the
+    news dumps, e.g. './dumps/news_state/queensjournal.json' for
+    './dumps/news'.
+
+    Shallow crawls stop at the first listing page with a stored article, once
+    every failed article has been listed again and retried. A failed article
+    is given up on after `max_attempts` crawls. If a listing page failed, the
+    next crawl doesn't stop early, so it reaches the articles on that page.
+    """
+
+    max_attempts = 3
+
+    def __init__(self, slug, location):
+        self.filepath = '{}_state/{}.json'.format(location.rstrip('/'), slug)
+        self.seen_urls = set()
+        self.failed_urls = {}
+        self.complete = True
+
+        if os.path.isfile(self.filepath):
+            with open(self.filepath, 'r') as file:
+                state = json.loads(file.read())
+
+            self.seen_urls = set(state['seen_urls'])
+            self.failed_urls = state.get('failed_urls', {})
+            self.complete = state.get('complete', True)
+
+        # Failed articles this crawl has yet to list again.
+        self.retry_urls = set(self.failed_urls)
+
+    def is_seen(self, article_url):
+        """Check if an article was stored by a previous scrape.
+
+        Args:
+            article_url: Absolute URL of article in question.
+        """
+        return article_url in self.seen_urls
+
+    def visit(self, article_urls):
+        """Record articles listed by this crawl.
+
+        Args:
+            article_urls: List of absolute URLs of articles on a page.
+
+        Returns:
+            True if the crawl can stop after this page, i.e. the page lists a
+            stored article, the last crawl was complete, and every failed
+            article was listed again.
+        """
+        self.retry_urls.difference_update(article_urls)
+
+        return (
+            any(self.is_seen(url) for url in article_urls)
+            and self.complete
+            and not self.retry_urls
+        )
+
+    def add(self, article_url):
+        """Record a stored article.
+
+        Args:
+            article_url: Absolute URL the article was requested from.
+        """
+        self.seen_urls.add(article_url)
+        self.failed_urls.pop(article_url, None)
+        self.retry_urls.discard(article_url)
+
+    def add_failed(self, article_url):
+        """Record an article that failed to scrape, to retry next crawl.
+
+        Args:
+            article_url: Absolute URL the article was requested from.
+        """
+        attempts = self.failed_urls.get(article_url, 0) + 1
+
+        if attempts < self.max_attempts:
+            self.failed_urls[article_url] = attempts
+        else:
+            self.failed_urls.pop(article_url, None)
+
+    def save(self, complete=True):
+        """Write the record to disk, replacing the previous one atomically.
+
+        Args:
+            complete (optional): Bool that is false if a listing page failed
+                to scrape.
+        """
+        directory = os.path.dirname(self.filepath)
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # A complete crawl that never listed a failed article again has
+        # nothing left to retry it from, e.g. an article that was removed.
+        if complete:
+            for article_url in self.retry_urls:
+                self.failed_urls.pop(article_url, None)
+
+        state = {
+            'seen_urls': sorted(self.seen_urls),
+            'failed_urls': dict(sorted(self.failed_urls.items())),
+            'complete': complete,
+        }
+
+        with open(self.filepath + '.tmp', 'w') as file:
+            file.write(json.dumps(state, indent=2))
+
+        os.replace(self.filepath + '.tmp', self.filepath)
+
+
+def filter_seen_articles(mark, host_url, article_rel_urls, logger, deep=False):
+    """Drop articles stored by a previous scrape, unless deep scraping.
+
+    Listing pages are ordered newest first. Once a page lists a previously
+    stored article, every page after it is older and needn't be crawled,
+    unless it lists an article that failed to scrape before.
+
+    Args:
+        mark: HighWaterMark of the news source.
+        host_url: Host URL in question.
+        article_rel_urls: List of relative URLs of articles on a page.
+        logger: Logging module.
+        deep: Bool for a scrape of just the curent year, or every archive.
+
+    Returns:
+        Tuple of the list of relative URLs left to scrape, and a bool that is
+        true if the crawl can stop after this page.
+    """
+    reached_mark = mark.visit(
+        [urljoin(host_url, url) for url in article_rel_urls])
+
+    if deep:
+        return article_rel_urls, False
+
+    new_rel_urls = [
+        url for url in article_rel_urls
+        if not mark.is_seen(urljoin(host_url, url))
+    ]
+
+    num_seen = len(article_rel_urls) - len(new_rel_urls)
+
+    if num_seen:
+        logger.info('Skipping %s previously scraped article(s)', num_seen)
+
+    return new_rel_urls, reached_mark
+
+
+def filter_finished_articles(journal, host_url, article_rel_urls):
+    """Drop articles saved by an interrupted scrape that is being resumed.
+
+    Args:
+        journal: CheckpointJournal of the news source.
+        host_url: Host URL in question.
+        article_rel_urls: List of relative URLs of articles on a page.
+
+    Returns:
+        List of the relative URLs left to scrape.
+    """
+    return [
+        url for url in article_rel_urls
+        if not journal.is_done(get_article_unit(urljoin(host_url, url)))
+    ]
+
+
+def restore_finished_articles(journal, mark):
+    """Record articles saved by an interrupted scrape in the mark.
+
+    Articles are journaled with a bool of whether they were saved, so a
+    resumed crawl that finishes adds them to the mark too.
+
+    Args:
+        journal: CheckpointJournal of the news source.
+        mark: HighWaterMark of the news source.
+    """
+    for unit, saved in journal.finished('article:'):
+        if saved:
+            mark.add(unit[len('article:'):])
+
+
+def save_mark(mark, failed, logger):
+    """Save the mark of a finished crawl.
+
+    Args:
+        mark: HighWaterMark of the news source.
+        failed: Bool that is true if a listing page failed to scrape.
+        logger: Logging module.
+    """
+    if failed:
+        logger.info('Errors during crawl, next crawl will not stop early')
+
+    if mark.failed_urls:
+        logger.info(
+            '%s failed article(s) to retry next crawl', len(mark.failed_urls))
+
+    mark.save(complete=not failed)
+
+
+def get_article_unit(article_url):
+    """Get the checkpoint journal unit of an article.
+
+    Args:
+        article_url: Absolute URL of article in question.
+    """
+    return 'article:{}'.format(article_url)
+
 
 def get_urls_on_depth(urls, logger, deep=False):
     """Get available URLS respective to its depth parameter.
@@ -30,24 +244,78 @@ def get_urls_on_depth(urls, logger, deep=False):
     return [urls[0]]
 
 
-def get_article_page(scraper, host_url, logger, article_rel_url):
-    """Get BeautifulSoup object of an article page.
+def get_article_pages(async_scraper, host_url, logger, article_rel_urls,
+                      **kwargs):
+    """Get BeautifulSoup objects of several article pages concurrently.
 
     Args:
-        scraper: Base scraper object.
+        async_scraper: Asynchronous scraper object.
+        host_url: Host URL in question.
+        logger: Logging module.
+        article_rel_urls: List of relative URLs of articles in question.
+        **kwargs: Keyword arguments passed on to `Scraper.http_request`.
+
+    Returns:
+        List of tuples of BeautifulSoup object of article page (or the
+        exception raised while requesting it), and the article URL.
+    """
+    article_urls = [urljoin(host_url, url) for url in article_rel_urls]
+    article_pages = async_scraper.request_many(article_urls, **kwargs)
+
+    for article_url in article_urls:
+        logger.debug('Article: {url}'.format(url=article_url))
+
+    return list(zip(article_pages, article_urls))
+
+
+def get_article_data(async_scraper, host_url, logger, article_rel_urls,
+                     parse_article, article_args=None):
+    """Get data of several articles, parsed by the shared parser pool.
+
+    Article pages are requested concurrently, and each is handed to the
+    parser pool unparsed.
+
+    Args:
+        async_scraper: Asynchronous scraper object.
         host_url: Host URL in question.
         logger: Logging module.
-        article_rel_url: Relative URL of article in question.
+        article_rel_urls: List of relative URLs of articles in question.
+        parse_article: Static method taking the BeautifulSoup object of an
+            article page and its URL, and returning its data.
+        article_args (optional): List of tuples of additional arguments of
+            `parse_article`, one per article.
 
     Returns:
-        Tuple of BeautifulSoup object of article page, and the article URL.
+        List of tuples of dictionary of article data (or the exception
+        raised while requesting or parsing it), and the article URL.
     """
-    article_url = urljoin(host_url, article_rel_url)
-    article_page = scraper.http_request(article_url)
+    parser_pool = get_parser_pool()
+    article_pages = get_article_pages(
+        async_scraper, host_url, logger, article_rel_urls, parse=False)
+    article_args = article_args or [()] * len(article_pages)
+    article_futures = []
+
+    for (article_page, article_url), args in zip(article_pages, article_args):
+        if isinstance(article_page, Exception):
+            article_futures.append((article_page, article_url))
+            continue
+
+        article_future = parser_pool.submit(
+            parse_article, article_page, article_url, *args)
+        article_futures.append((article_future, article_url))
+
+    article_data = []
 
-    logger.debug('Article: {url}'.format(url=article_url))
+    for article_future, article_url in article_futures:
+        if isinstance(article_future, Exception):
+            article_data.append((article_future, article_url))
+        else:
+            article_data.append((
+                article_future.exception() or article_future.result(),
+                article_url,
+            ))
 
-    return article_page, article_url
+    return article_data
 
 
 def save_article(scraper, article_data, location):
@@ -10,8 +10,18 @@ from urllib.parse import urljoin
 
 import pendulum
 
-from ..utils import Scraper
-from .news_helpers import get_urls_on_depth, get_article_page, save_article
+from ..utils import Scraper, AsyncScraper, HTTPCache, CheckpointJournal
+from .news_helpers import (
+    HighWaterMark,
+    filter_seen_articles,
+    filter_finished_articles,
+    get_article_unit,
+    restore_finished_articles,
+    save_mark,
+    get_urls_on_depth,
+    get_article_data,
+    save_article,
+)
 
 
 class SmithMagazine:
@@ -22,19 +32,35 @@ class SmithMagazine:
 
     host = 'https://smith.queensu.ca'
     slug = 'smithmagazine'
-    scraper = Scraper()
+    scraper = Scraper(
+        name='news/{}'.format(slug),
+        cache=HTTPCache('news/{}'.format(slug)),
+    )
+    async_scraper = AsyncScraper(scraper)
     logger = scraper.logger
 
     @staticmethod
-    def scrape(deep=False, location='./dumps/news', *args, **kwargs):
+    def scrape(deep=False, location='./dumps/news', resume=False, *args,
+               **kwargs):
         """Scrape information custom to Smith Magazine.
 
         Args:
             deep: Bool for a scrape of just the curent year, or every archive.
             location (optional): String location of output files.
+            resume (optional): Bool to skip issues and articles finished by
+                an interrupted scrape.
         """
         SmithMagazine.logger.info('Starting SmithMagazine scrape')
 
+        mark = HighWaterMark(SmithMagazine.slug, location)
+        checkpoints = CheckpointJournal(
+            'news_{}'.format(SmithMagazine.slug),
+            resume,
+            SmithMagazine.scraper.storage,
+        )
+        restore_finished_articles(checkpoints, mark)
+        failed = False
+
         try:
             magazine_issue_rel_urls = get_urls_on_depth(
                 SmithMagazine._get_magazine_issues(),
@@ -43,9 +69,17 @@ class SmithMagazine:
             )
 
             for magazine_issue_rel_url in magazine_issue_rel_urls:
+                issue_unit = 'issue:{}'.format(magazine_issue_rel_url)
+
+                if checkpoints.is_done(issue_unit):
+                    continue
+
                 SmithMagazine.logger.debug(
                     'ARCHIVE: %s', magazine_issue_rel_url)
 
+                # Whether every article of the issue was stored.
+                complete = True
+
                 try:
                     article_sections = SmithMagazine._get_article_sections(
                         magazine_issue_rel_url)
@@ -60,19 +94,35 @@ class SmithMagazine:
                         article_rel_urls = SmithMagazine._get_article_rel_urls(
                             article_section)
 
-                        for article_rel_url in article_rel_urls:
+                        # Skip articles stored by a previous scrape. Sections
+                        # aren't ordered by date, so there's no early stop.
+                        article_rel_urls, _ = filter_seen_articles(
+                            mark,
+                            SmithMagazine.host,
+                            article_rel_urls,
+                            SmithMagazine.logger,
+                            deep,
+                        )
+
+                        # Skip articles saved by an interrupted scrape.
+                        article_rel_urls = filter_finished_articles(
+                            checkpoints, SmithMagazine.host, article_rel_urls)
+
+                        # Request every article in a section concurrently,
+                        # and parse them in the parser pool.
+                        articles = get_article_data(
+                            SmithMagazine.async_scraper,
+                            SmithMagazine.host,
+                            SmithMagazine.logger,
+                            article_rel_urls,
+                            SmithMagazine._parse_article_data,
+                        )
+
+                        for article_data, article_url in articles:
                             try:
-                                article_page, article_url = get_article_page(
-                                    SmithMagazine.scraper,
-                                    SmithMagazine.host,
-                                    SmithMagazine.logger,
-                                    article_rel_url
-                                )
-
-                                article_data = (
-                                    SmithMagazine._parse_article_data(
-                                        article_page, article_url)
-                                )
+                                # Re-raise a failed request or parse to log it.
+                                if isinstance(article_data, Exception):
+                                    raise article_data
 
                                 if article_data:
                                     save_article(
@@ -80,18 +130,32 @@ class SmithMagazine:
                                         article_data,
                                         location
                                     )
+                                    mark.add(article_url)
 
-                                SmithMagazine.scraper.wait()
+                                checkpoints.done(
+                                    get_article_unit(article_url),
+                                    bool(article_data),
+                                )
 
                             except Exception:
+                                complete = False
+                                mark.add_failed(article_url)
                                 SmithMagazine.scraper.handle_error()
 
+                    # Issues with failed articles are redone on resume.
+                    if complete:
+                        checkpoints.done(issue_unit)
+
                 except Exception:
+                    failed = True
                     SmithMagazine.scraper.handle_error()
 
         except Exception:
+            failed = True
             SmithMagazine.scraper.handle_error()
 
+        save_mark(mark, failed, SmithMagazine.logger)
+        checkpoints.complete()
         SmithMagazine.logger.info('Completed SmithMagazine scrape')
 
     @staticmethod
@@ -17,7 +17,7 @@ class TestScraper:
     scraper_key = 'test_scraper'
     location = './dumps/{}'.format(scraper_key)
     host = 'https://news.ycombinator.com'
-    scraper = Scraper()
+    scraper = Scraper(name=scraper_key)
     logger = scraper.logger
 
     @staticmethod
@@ -6,16 +6,25 @@ This module contains the Textbooks class scraper for parsing textbook data.
 """
 
 import re
+import functools
+import traceback
 from urllib.parse import urljoin
 from collections import OrderedDict
 
 from bs4.element import Tag
 
-from ..utils import Scraper
+from ..utils import (
+    Scraper,
+    AsyncScraper,
+    CheckpointJournal,
+    get_parser_pool,
+)
 from .textbooks_helpers import (
-    get_google_books_info,
+    CourseFrontier,
+    GoogleBooksCache,
+    GoogleBooksResolver,
+    TextbookIndex,
     normalize_string,
-    save_textbook_data
     )
 
 
@@ -24,20 +33,30 @@ class Textbooks:
 
     Queen's textbooks are located at the Queen's Campus boookstore.
     Current website: <https://www.campusbookstore.com>.
+
+    Course pages of a department are requested concurrently, and parsed by
+    the shared parser pool.
+
+    Finished departments and courses are recorded in a checkpoint journal,
+    along with the data of each course, so a resumed scrape skips them.
     """
 
     scraper_key = 'textbooks'
     location = './dumps/{}'.format(scraper_key)
     host = 'https://www.campusbookstore.com'
-    scraper = Scraper()
+    scraper = Scraper(name=scraper_key)
+    async_scraper = AsyncScraper(scraper)
+    books_cache = GoogleBooksCache()
     logger = scraper.logger
 
     @staticmethod
-    def scrape(location='', *args, **kwargs):
+    def scrape(location='', resume=False, *args, **kwargs):
         """Scrape textbook information to JSON files.
 
         Args:
             location (optional): String location output files.
+            resume (optional): Bool to skip units finished by an interrupted
+                scrape.
         """
         if not location:
             location = Textbooks.location
@@ -47,84 +66,197 @@ class Textbooks:
         # Course department codes, such as CISC, ANAT, PHAR, etc..
         departments = Textbooks._get_departments('textbooks/search-engine')
 
-        for department in departments:
-            try:
-                Textbooks.logger.debug('Course Department: %s', department)
+        # Google Books lookups run in the background, overlapping with the
+        # scrape of each department's course pages.
+        books = GoogleBooksResolver(Textbooks.scraper, Textbooks.books_cache)
+
+        # Image URLs by image reference URL. Shared textbooks share images.
+        image_urls = {}
+        frontier = CourseFrontier()
+        index = TextbookIndex(Textbooks.scraper, location)
+        checkpoints = CheckpointJournal(Textbooks.scraper_key, resume)
+
+        # Index courses finished by an interrupted scrape, rather than
+        # requesting them again.
+        for unit, data in checkpoints.finished('course:'):
+            frontier.add(unit[len('course:'):])
+            index.add(*data)
+
+        try:
+            for department in departments:
+                try:
+                    department_unit = 'department:{}'.format(department)
+
+                    if checkpoints.is_done(department_unit):
+                        continue
+
+                    Textbooks.logger.debug('Course Department: %s', department)
+
+                    course_rel_urls = Textbooks._get_course_rel_urls(
+                        'textbooks/search-engine/results', department
+                    )
+
+                    # Skip courses found by an earlier department search.
+                    course_urls = [
+                        urljoin(Textbooks.host, url) for url in course_rel_urls
+                    ]
+                    course_urls = [
+                        url for url in course_urls if frontier.add(url)
+                    ]
+
+                    course_futures = Textbooks._parse_course_pages(
+                        course_urls)
+                    courses = []
+
+                    for course_future, course_url in zip(
+                            course_futures, course_urls):
+                        try:
+                            course_data, textbook_data = (
+                                Textbooks._scrape_course(
+                                    course_future, course_url, books,
+                                    image_urls)
+                            )
+                            courses.append(
+                                (course_url, course_data, textbook_data))
+
+                        except Exception:
+                            Textbooks.scraper.handle_error()
+
+                    # Join Google Books results of the department's
+                    # textbooks, then index them.
+                    for course_url, course_data, textbook_data in courses:
+                        try:
+                            for textbook_info in textbook_data:
+                                Textbooks._add_google_books_info(
+                                    textbook_info,
+                                    books.result(textbook_info['isbn_13']),
+                                )
 
-                course_rel_urls = Textbooks._get_course_rel_urls(
-                    'textbooks/search-engine/results', department
-                )
+                            index.add(course_data, textbook_data)
+                            checkpoints.done(
+                                'course:{}'.format(course_url),
+                                [course_data, textbook_data],
+                            )
 
-                for course_rel_url in course_rel_urls:
-                    textbook_data = []
+                            Textbooks.logger.debug('Textbook data indexed')
 
-                    try:
-                        course_page, course_url = Textbooks._get_course_page(
-                            course_rel_url)
+                        except Exception:
+                            Textbooks.scraper.handle_error()
 
-                        course_data = Textbooks._parse_course_data(
-                            course_page, course_url)
+                    checkpoints.done(department_unit)
 
-                        if not course_data:
-                            Textbooks.logger.debug('No course data available')
-                        else:
-                            data = course_data[0]
-                            term = ''
+                except Exception:
+                    Textbooks.scraper.handle_error()
 
-                            if len(course_data) == 1:
-                                term = data['term']
-                            else:
-                                term = 'Multiple terms'
+        finally:
+            books.close()
 
-                            str_course = '{dep}{code} ({term} {year})'.format(
-                                dep=data['department'],
-                                code=data['course_code'],
-                                term=term,
-                                year=data['year']
-                            )
+            # Write textbook records, each merged across all its courses.
+            index.flush()
 
-                            Textbooks.logger.debug(str_course)
+        checkpoints.complete()
 
-                        Textbooks.logger.debug('Course Link: %s', course_url)
+        Textbooks.logger.info(
+            'Crawled %s course(s), filtered %s duplicate(s)',
+            len(frontier.seen),
+            frontier.duplicates,
+        )
+        Textbooks.logger.info('Completed Textbooks scrape')
 
-                        textbooks = course_page.find_all(
-                            'div', 'textbookHolder'
-                        )
+    @staticmethod
+    def _parse_course_pages(course_urls):
+        # Request course pages concurrently, submitting each page to the
+        # parser pool as soon as it arrives, so parsing overlaps with the
+        # remaining requests. Returns a future (or request exception) per
+        # course URL.
+        parser_pool = get_parser_pool()
+
+        return Textbooks.async_scraper.request_each([
+            {
+                'url': course_url,
+                'parse': False,
+                'callback': functools.partial(
+                    Textbooks._submit_course_page, parser_pool, course_url),
+            }
+            for course_url in course_urls
+        ])
 
-                        Textbooks.logger.debug(
-                            '%s textbook(s) found', len(textbooks))
+    @staticmethod
+    def _submit_course_page(parser_pool, course_url, course_page):
+        # Submit a fetched course page to the parser pool.
+        return parser_pool.submit(
+            Textbooks._parse_course_page, course_page, course_url)
 
-                        for textbook in textbooks:
-                            try:
-                                textbook_info = (
-                                    Textbooks._parse_textbook_data(textbook)
-                                )
+    @staticmethod
+    def _parse_course_page(course_page, course_url):
+        # Parse course data, textbook data, and image reference URLs of
+        # textbooks from a course page. Runs in the parser pool, where
+        # logging isn't set up, so tracebacks of textbooks that failed to
+        # parse are returned to be logged by the scraping process.
+        textbook_data = []
+        image_refs = []
+        errors = []
+
+        course_data = Textbooks._parse_course_data(course_page, course_url)
+
+        for textbook in course_page.find_all('div', 'textbookHolder'):
+            try:
+                textbook_data.append(Textbooks._parse_textbook_data(textbook))
+                image_refs.append(Textbooks._get_image_ref(textbook))
 
-                                textbook_data.append(textbook_info)
+            except Exception:
+                errors.append(traceback.format_exc())
 
-                                Textbooks.scraper.wait()
+        return course_data, textbook_data, image_refs, errors
 
-                            except Exception:
-                                Textbooks.scraper.handle_error()
+    @staticmethod
+    def _scrape_course(course_future, course_url, books, image_urls):
+        # Scrape course and textbook data of a parsed course page. Textbook
+        # ISBNs are submitted to Google Books, to be joined in later.
 
-                        if course_data or textbook_data:
-                            save_textbook_data(
-                                course_data,
-                                textbook_data,
-                                Textbooks.scraper,
-                                location,
-                            )
+        # Re-raise a failed request to log it.
+        if isinstance(course_future, Exception):
+            raise course_future
 
-                        Textbooks.logger.debug('Textbook data saved')
-                        Textbooks.scraper.wait()
+        course_data, textbook_data, image_refs, errors = (
+            course_future.result())
 
-                    except Exception:
-                        Textbooks.scraper.handle_error()
+        for error in errors:
+            Textbooks.logger.error('Scraper error\n%s', error.rstrip())
 
-            except Exception:
-                Textbooks.scraper.handle_error()
+        if not course_data:
+            Textbooks.logger.debug('No course data available')
+        else:
+            data = course_data[0]
+            term = ''
 
-        Textbooks.logger.info('Completed Textbooks scrape')
+            if len(course_data) == 1:
+                term = data['term']
+            else:
+                term = 'Multiple terms'
+
+            str_course = '{dep}{code} ({term} {year})'.format(
+                dep=data['department'],
+                code=data['course_code'],
+                term=term,
+                year=data['year']
+            )
+
+            Textbooks.logger.debug(str_course)
+
+        Textbooks.logger.debug('Course Link: %s', course_url)
+        Textbooks.logger.debug('%s textbook(s) found', len(textbook_data))
+
+        Textbooks._prefetch_image_urls(image_refs, image_urls)
+
+        for textbook_info, image_ref in zip(textbook_data, image_refs):
+            Textbooks.logger.debug(
+                'Textbook ISBN: %s', textbook_info['isbn_13'])
+
+            textbook_info['image'] = image_urls.get(image_ref)
+            books.submit(textbook_info['isbn_13'])
+
+        return course_data, textbook_data
 
     @staticmethod
     def _get_departments(relative_url):
@@ -188,14 +320,6 @@ class Textbooks:
 
         return course_rel_urls
 
-    @staticmethod
-    def _get_course_page(course_rel_url):
-        # Get HTML of course webpage given a course relative URL.
-        course_url = urljoin(Textbooks.host, course_rel_url)
-        soup = Textbooks.scraper.http_request(course_url)
-
-        return soup, course_url
-
     @staticmethod
     def _parse_course_data(course_page, course_url):
         # Parse course data from course page.
@@ -292,17 +416,50 @@ class Textbooks:
 
         return course_list
 
+    @staticmethod
+    def _prefetch_image_urls(textbook_image_refs, image_urls):
+        # Request the image URLs of every textbook on a course page
+        # concurrently, skipping images already resolved. Failed requests
+        # are logged, and their textbooks left without an image.
+        image_refs = []
+
+        for image_ref in textbook_image_refs:
+            if not image_ref or image_ref in image_urls:
+                continue
+
+            if image_ref not in image_refs:
+                image_refs.append(image_ref)
+
+        responses = Textbooks.async_scraper.request_many(
+            image_refs, parse=False)
+
+        for image_ref, response in zip(image_refs, responses):
+            try:
+                # Re-raise a failed request to log it.
+                if isinstance(response, Exception):
+                    raise response
+
+                image_urls[image_ref] = response.text
+
+            except Exception:
+                Textbooks.scraper.handle_error()
+
+    @staticmethod
+    def _get_image_ref(textbook):
+        # Get the URL that responds with the image URL of a textbook.
+        image = textbook.find('img', {'data-id': 'toLoad'})
+
+        if not image:
+            return None
+
+        return urljoin(Textbooks.host, image['data-url'])
+
     @staticmethod
     def _parse_textbook_data(textbook):
-        # Parse textbook data from course page.
+        # Parse textbook data from course page. The image URL is requested
+        # separately, and filled in afterwards.
 
         # ===================== Info retrieved internally =====================
-        image_ref = urljoin(
-            Textbooks.host,
-            textbook.find('img', {'data-id': 'toLoad'})['data-url']
-        )
-        image_url = Textbooks.scraper.http_request(image_ref, parse=False).text
-
         status_raw = textbook.find('dd', 'textbookStatus')
         status = status_raw.text.strip() if status_raw else None
 
@@ -311,8 +468,6 @@ class Textbooks:
             .next_sibling.next_sibling.text.strip()
         )
 
-        Textbooks.logger.debug('Textbook ISBN: %s', isbn_13)
-
         # May need both new and old prices, or just new prices (or none).
         prices = textbook.find_all('dd', 'textbookPrice')
         price_new = price_used = None
@@ -324,19 +479,17 @@ class Textbooks:
             if len(prices) > 1 and '$' in prices[1].text:
                 price_used = float(prices[1].text.strip().replace(',', '')[1:])
 
-        # ========== Info retrieved externally (via Google Books API) =========
-        google_books_info = get_google_books_info(isbn_13, Textbooks.scraper)
-
-        if google_books_info:
-            title = google_books_info['title']
-            authors = google_books_info['authors']
-            isbn_10 = google_books_info['isbn_10'][0]
-        else:
-            title_str = textbook.find(
-                'div', class_='textbookInfoHolder').find('h2').text.strip()
+        # Title and authors as listed by the bookstore. Replaced by Google
+        # Books information when it's available, so a textbook listed
+        # without them is kept.
+        info_holder = textbook.find('div', class_='textbookInfoHolder')
+        title_tag = info_holder.find('h2') if info_holder else None
+        title = None
+        authors = []
 
+        if title_tag:
             *title_raw, authors_raw = re.sub(
-                r'[ ]+by$', ' by ', title_str).split(' by ')
+                r'[ ]+by$', ' by ', title_tag.text.strip()).split(' by ')
 
             # Rebuild array name into title. For example, if the title is
             # "Writing by Choice by Eric Henderson", title_raw will
@@ -346,21 +499,31 @@ class Textbooks:
             # Remove whitespace between titles.
             title = re.sub(r'\s+', ' ', title_combined)
             authors = authors_raw.strip().replace('/', ', ').split(', ')
-            isbn_10 = None
-
-        # Normalize names, whether from Google Books or Textbooks scraper.
-        authors = normalize_string(authors) if authors else []
 
         data = {
             'id': isbn_13,
-            'isbn_10': isbn_10,
+            'isbn_10': None,
             'isbn_13': isbn_13,
             'title': title,
-            'authors': authors,
-            'image': image_url,
+            'authors': normalize_string(authors) if authors else [],
+            'image': None,
             'price_new': price_new,
             'price_used': price_used,
             'status': status
         }
 
         return data
+
+    @staticmethod
+    def _add_google_books_info(textbook_info, google_books_info):
+        # Fill in information retrieved externally (via Google Books API).
+        if not google_books_info:
+            return
+
+        authors = google_books_info['authors']
+
+        textbook_info.update({
+            'isbn_10': google_books_info['isbn_10'][0],
+            'title': google_books_info['title'],
+            'authors': normalize_string(authors) if authors else [],
+        })
@@ -5,55 +5,277 @@ quartzscrapers.scrapers.textbooks.textbooks_helpers
 This module contains auxiliary functions for the textbooks module.
 """
 
+import os
+import json
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
 from ..utils.config import GOOGLE_BOOKS_KEY
 
 
-def get_google_books_info(isbn_13, scraper):
+class GoogleBooksCache:
+    """Persistent cache of Google Books volume info, keyed by ISBN.
+
+    Entries are kept in a SQLite database and expire after `ttl` seconds.
+    ISBNs without results are cached as well, but expire after the shorter
+    `negative_ttl`, in case Google Books picks them up later.
+    """
+
+    def __init__(
+        self,
+        path='./cache/google_books.sqlite3',
+        ttl=30 * 24 * 60 * 60,
+        negative_ttl=7 * 24 * 60 * 60,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def get(self, isbn):
+        """Get cached volume info of an ISBN.
+
+        Args:
+            isbn: String ISBN.
+
+        Returns:
+            Tuple of a bool for a cache hit, and the dictionary of volume
+            info, which is None for ISBNs without results.
+        """
+        with self.lock:
+            row = self._connect().execute(
+                'SELECT volume_info, fetched_at FROM volumes WHERE isbn = ?',
+                (isbn,),
+            ).fetchone()
+
+        if not row:
+            return False, None
+
+        volume_info, fetched_at = row
+        ttl = self.ttl if volume_info else self.negative_ttl
+
+        if time.time() - fetched_at > ttl:
+            return False, None
+
+        return True, json.loads(volume_info) if volume_info else None
+
+    def set(self, isbn, volume_info):
+        """Cache volume info of an ISBN.
+
+        Args:
+            isbn: String ISBN.
+            volume_info: Dictionary of volume info, or None if the ISBN had
+                no results.
+        """
+        value = json.dumps(volume_info) if volume_info else None
+
+        with self.lock:
+            connection = self._connect()
+
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO volumes VALUES (?, ?, ?)',
+                    (isbn, value, time.time()),
+                )
+
+    def _connect(self):
+        # Open the database on first use, shared across threads under lock.
+        if not self.connection:
+            directory = os.path.dirname(self.path)
+
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+
+            self.connection = sqlite3.connect(
+                self.path, check_same_thread=False)
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS volumes ('
+                'isbn TEXT PRIMARY KEY, volume_info TEXT, fetched_at REAL)'
+            )
+
+        return self.connection
+
+
+class GoogleBooksResolver:
+    """Resolve ISBNs through Google Books in the background.
+
+    ISBNs are looked up concurrently, at most `max_workers` at a time, while
+    the caller carries on scraping. Each ISBN is looked up once per run.
+    Once Google Books reports an exceeded quota, remaining lookups resolve
+    to no data, so textbooks fall back to bookstore information.
+    """
+
+    QUOTA_CODES = (403, 429)
+
+    def __init__(self, scraper, cache=None, max_workers=4):
+        self.scraper = scraper
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.futures = {}
+        self.quota_exceeded = threading.Event()
+
+    def submit(self, isbn_13):
+        """Start looking up an ISBN, unless already looked up.
+
+        Args:
+            isbn_13: String ISBN-13 of textbook.
+        """
+        if isbn_13 not in self.futures:
+            self.futures[isbn_13] = self.executor.submit(self._lookup, isbn_13)
+
+    def result(self, isbn_13):
+        """Wait for the book data of a submitted ISBN.
+
+        Args:
+            isbn_13: String ISBN-13 of textbook.
+
+        Returns:
+            Dictionary of book data, empty if the lookup found nothing or
+            failed.
+        """
+        try:
+            return self.futures[isbn_13].result()
+        except Exception:
+            self.scraper.handle_error()
+            return {}
+
+    def close(self):
+        """Cancel pending lookups and shut down the workers."""
+        self.executor.shutdown(cancel_futures=True)
+
+    def _lookup(self, isbn_13):
+        if self.quota_exceeded.is_set():
+            return {}
+
+        try:
+            return get_google_books_info(isbn_13, self.scraper, self.cache)
+
+        except requests.HTTPError as ex:
+            if ex.response.status_code not in self.QUOTA_CODES:
+                raise
+
+            if not self.quota_exceeded.is_set():
+                self.quota_exceeded.set()
+                self.scraper.logger.warning(
+                    'Google Books quota exceeded (%s). Using bookstore data',
+                    ex.response.status_code,
+                )
+
+            return {}
+
+
+def get_google_books_info(isbn_13, scraper, cache=None):
     """Retrieve additional textbook information missing from host website.
 
-    This is retrieved via the Google Books API.
+    This is retrieved via the Google Books API, unless the ISBN is cached.
+
+    Args:
+        isbn_13: String ISBN-13 of textbook.
+        scraper: Base scraper object.
+        cache (optional): GoogleBooksCache to check first.
 
     Returns:
         Dictionary of book data.
+
+    Raises:
+        requests.HTTPError: Google Books responded with an error, such as an
+            exceeded quota.
     """
-    data = {}
-    params = {
-        'q': 'isbn:{}'.format(isbn_13),
-        'key': GOOGLE_BOOKS_KEY
-    }
+    hit, volume_info = cache.get(isbn_13) if cache else (False, None)
 
-    response = scraper.http_request(
-        parse=False,
-        url='https://www.googleapis.com/books/v1/volumes',
-        params=params
-    ).json()
-
-    if response.get('items'):
-        response = response['items'][0]['volumeInfo']
-
-        isbns = response.get('industryIdentifiers', '')
-        title = response.get('title', '').strip()
-        authors = response.get('authors', '')
-
-        # API shows both ISBN 10 and 13 in an array of any order.
-        # Sometimes it shows unrelated data, such as
-        # [{'type': 'OTHER', 'identifier': 'UOM:39015061016815'}].
-        isbn_10 = [isbn.get('identifier') for isbn in isbns
-                   if isbn['type'] == 'ISBN_10']
-
-        if response.get('subtitle'):
-            subtitle = response.get('subtitle')
-            title = '{title}: {sub}'.format(title=title, sub=subtitle)
-
-        data = {
-            'isbn_10': isbn_10 or [''],
-            'title': title,
-            'authors': authors,
+    if not hit:
+        params = {
+            'q': 'isbn:{}'.format(isbn_13),
+            'key': GOOGLE_BOOKS_KEY
         }
 
+        # An exceeded quota (429) won't reset within backoff's retries, so
+        # it is raised straight away rather than retried.
+        response = scraper.http_request(
+            parse=False,
+            url='https://www.googleapis.com/books/v1/volumes',
+            params=params,
+            retry_throttled=False,
+        )
+
+        # Errors, such as exceeded quotas, are not cached as missing ISBNs.
+        response.raise_for_status()
+
+        items = response.json().get('items')
+        volume_info = items[0]['volumeInfo'] if items else None
+
+        if cache:
+            cache.set(isbn_13, volume_info)
+
+    return parse_volume_info(volume_info) if volume_info else {}
+
+
+def parse_volume_info(volume_info):
+    """Parse textbook information out of Google Books volume info.
+
+    Args:
+        volume_info: Dictionary of volume info of a Google Books result.
+
+    Returns:
+        Dictionary of book data.
+    """
+    isbns = volume_info.get('industryIdentifiers', '')
+    title = volume_info.get('title', '').strip()
+    authors = volume_info.get('authors', '')
+
+    # API shows both ISBN 10 and 13 in an array of any order.
+    # Sometimes it shows unrelated data, such as
+    # [{'type': 'OTHER', 'identifier': 'UOM:39015061016815'}].
+    isbn_10 = [isbn.get('identifier') for isbn in isbns
+               if isbn['type'] == 'ISBN_10']
+
+    if volume_info.get('subtitle'):
+        subtitle = volume_info.get('subtitle')
+        title = '{title}: {sub}'.format(title=title, sub=subtitle)
+
+    data = {
+        'isbn_10': isbn_10 or [''],
+        'title': title,
+        'authors': authors,
+    }
+
     return data
 
 
+class CourseFrontier:
+    """Course URLs crawled during a run.
+
+    Overlapping department searches find the same courses, e.g. 'EG' also
+    finds ENGL courses. The frontier lets each course page be crawled once,
+    and counts the duplicates filtered out.
+    """
+
+    def __init__(self):
+        self.seen = set()
+        self.duplicates = 0
+
+    def add(self, course_url):
+        """Add a course URL to the frontier.
+
+        Args:
+            course_url: String URL of course page.
+
+        Returns:
+            True if the course wasn't crawled yet, else-wise False.
+        """
+        if course_url in self.seen:
+            self.duplicates += 1
+            return False
+
+        self.seen.add(course_url)
+        return True
+
+
 def normalize_string(names):
     """Format strings to be lowercase and capitalized, per word in string.
 
@@ -75,29 +297,66 @@ def normalize_string(names):
     return new_names
 
 
-def save_textbook_data(course_list, textbook_list, scraper, location):
-    """Preprocess and save textbook data to JSON.
+class TextbookIndex:
+    """Textbook records of a run, keyed by year and ISBN-13.
 
     Course information is related to textbooks. Because this is focused on
-    textbooks, it parsess through each textbook, and appends the course
-    data as the 'course' section, which is an array.
+    textbooks, each textbook record has the courses requiring it as the
+    'courses' section, which is an array.
 
-    If a textbook already exists in the database, course data is appended
-    to the existing record. Otherwise, a brand new textbook record is
-    created with the associated course information.
-
-    Args:
-        course_list: List of course data as dictionaries.
-        textbook_list: List of textbook data as dictionaries.
-        scraper: Base scraper object.
-        location: String location of output file.
+    Courses are merged into their textbook records in memory, without
+    duplicates, so each record is written once per flush instead of once
+    per course. If a textbook already exists in the database, its stored
+    courses are merged in when flushed. The index flushes itself once it
+    holds `max_records` records, and must be flushed at the end of a scrape.
     """
-    for course_data in course_list:
-        for textbook_data in textbook_list:
-            filename = '{year}_{isbn}'.format(
-                year=course_data['year'],
-                isbn=textbook_data['isbn_13'],
-            )
 
-            scraper.update_data(
-                textbook_data, course_data, 'courses', filename, location)
+    def __init__(self, scraper, location, max_records=10000):
+        self.scraper = scraper
+        self.location = location
+        self.max_records = max_records
+        self.records = {}
+
+    def add(self, course_list, textbook_list):
+        """Add the textbooks of a course page to the index.
+
+        Args:
+            course_list: List of course data as dictionaries.
+            textbook_list: List of textbook data as dictionaries.
+        """
+        for course_data in course_list:
+            for textbook_data in textbook_list:
+                key = (course_data['year'], textbook_data['isbn_13'])
+
+                if key not in self.records:
+                    self.records[key] = dict(textbook_data, courses=[])
+
+                courses = self.records[key]['courses']
+
+                if course_data not in courses:
+                    courses.append(course_data)
+
+        if len(self.records) >= self.max_records:
+            self.flush()
+
+    def flush(self):
+        """Write every textbook record in the index, and empty it."""
+        for (year, isbn), record in self.records.items():
+            filename = '{year}_{isbn}'.format(year=year, isbn=isbn)
+
+            # Both storage backends read a record without scanning or
+            # syncing the dataset, so this stays linear in the records.
+            record_old = self.scraper.storage.read(filename, self.location)
+
+            if record_old:
+                for course_data in record['courses']:
+                    if course_data not in record_old['courses']:
+                        record_old['courses'].append(course_data)
+
+                record = record_old
+
+            self.scraper.write_data(record, filename, self.location)
+
+        self.scraper.logger.debug(
+            '%s textbook record(s) written', len(self.records))
+        self.records = {}
@@ -5,4 +5,19 @@ quartzscrapers.scrapers.utils
 This module contains the initialization of the scraper module.
 """
 
-from .scraper import Scraper # noqa
+from .scraper import ( # noqa
+    Scraper,
+    AsyncScraper,
+    RateLimiter,
+    get_rate_limiter,
+)
+from .cache import HTTPCache # noqa
+from .storage import ( # noqa
+    JSONFileStorage,
+    JSONLinesStorage,
+    get_storage,
+    set_storage,
+)
+from .parsing import ParserPool, get_parser_pool, set_parser_pool # noqa
+from .checkpoint import CheckpointJournal # noqa
+from .metrics import Metrics, get_metrics # noqa
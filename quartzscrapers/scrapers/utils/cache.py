@@ -0,0 +1,194 @@
+"""
+quartzscrapers.scrapers.utils.cache
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the on-disk HTTP response cache used for conditional
+requests.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class HTTPCache:
+    """On-disk HTTP response cache revalidated with ETag/Last-Modified.
+
+    Each response is stored as a pair of files: `<key>.body` with the raw
+    content and `<key>.json` with its validators and headers. Entries are
+    evicted least-recently-used first once the cache exceeds `max_bytes`.
+    """
+
+    def __init__(self, name, location='./cache/http', max_bytes=512 * 2**20):
+        self.location = '{}/{}'.format(location, name)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        # Key -> size in bytes, ordered from least to most recently used.
+        self.entries = OrderedDict()
+        self.size = 0
+        self._load_entries()
+
+    @staticmethod
+    def make_key(url, params=None):
+        """Create cache key out of a URL and its querystring parameters.
+
+        Args:
+            url: URL to request.
+            params (optional): Dictionary to be sent in the HTTP querystring.
+
+        Returns:
+            String hex digest identifying the request.
+        """
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        return hashlib.sha1(full_url.encode('utf-8')).hexdigest()
+
+    def get_validators(self, key):
+        """Get conditional request headers for a cached response.
+
+        Args:
+            key: Cache key of the request.
+
+        Returns:
+            Dictionary of If-None-Match/If-Modified-Since headers, empty if
+            the response isn't cached.
+        """
+        meta = self._read_meta(key)
+
+        if not meta:
+            return {}
+
+        headers = {}
+        etag = meta['headers'].get('ETag')
+        last_modified = meta['headers'].get('Last-Modified')
+
+        if etag:
+            headers['If-None-Match'] = etag
+
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        return headers
+
+    def load(self, key):
+        """Rebuild a cached response after the server replied 304.
+
+        Args:
+            key: Cache key of the request.
+
+        Returns:
+            Requests response object flagged with `from_cache`, or None if
+            the entry has gone missing.
+        """
+        meta = self._read_meta(key)
+
+        try:
+            with open(self._path(key, 'body'), 'rb') as file:
+                content = file.read()
+        except OSError:
+            return None
+
+        if not meta:
+            return None
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = meta['url']
+        response.encoding = meta['encoding']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response._content = content
+        response.from_cache = True
+
+        # Touch the entry so LRU order survives into the next run.
+        os.utime(self._path(key, 'body'))
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+
+        return response
+
+    def store(self, key, response):
+        """Store a response if it can be revalidated later.
+
+        Args:
+            key: Cache key of the request.
+            response: Requests response object.
+        """
+        headers = {
+            name: response.headers[name]
+            for name in ('ETag', 'Last-Modified', 'Content-Type')
+            if name in response.headers
+        }
+
+        if response.status_code != 200:
+            return
+
+        if 'ETag' not in headers and 'Last-Modified' not in headers:
+            return
+
+        meta = {
+            'url': response.url,
+            'encoding': response.encoding,
+            'headers': headers,
+        }
+
+        if not os.path.exists(self.location):
+            os.makedirs(self.location)
+
+        with open(self._path(key, 'body'), 'wb') as file:
+            file.write(response.content)
+
+        with open(self._path(key, 'json'), 'w') as file:
+            file.write(json.dumps(meta))
+
+        with self.lock:
+            self.size -= self.entries.pop(key, 0)
+            self.entries[key] = len(response.content)
+            self.size += self.entries[key]
+
+            self._evict()
+
+    def _evict(self):
+        # Drop least recently used entries until under the size cap.
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            key, size = self.entries.popitem(last=False)
+            self.size -= size
+
+            for ext in ('body', 'json'):
+                try:
+                    os.remove(self._path(key, ext))
+                except OSError:
+                    pass
+
+    def _load_entries(self):
+        # Rebuild LRU order from file modification times of a previous run.
+        bodies = []
+
+        if not os.path.exists(self.location):
+            return
+
+        for filename in os.listdir(self.location):
+            if filename.endswith('.body'):
+                stat = os.stat('{}/{}'.format(self.location, filename))
+                bodies.append((stat.st_mtime, filename[:-5], stat.st_size))
+
+        for _, key, size in sorted(bodies):
+            self.entries[key] = size
+            self.size += size
+
+    def _read_meta(self, key):
+        # Read metadata of a cached response, if any.
+        try:
+            with open(self._path(key, 'json'), 'r') as file:
+                return json.loads(file.read())
+        except (OSError, ValueError):
+            return None
+
+    def _path(self, key, ext):
+        return '{}/{}.{}'.format(self.location, key, ext)
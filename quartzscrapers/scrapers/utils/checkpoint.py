@@ -0,0 +1,127 @@
+"""
+quartzscrapers.scrapers.utils.checkpoint
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the checkpoint journal, which records the units of work
+a scrape has finished so an interrupted scrape can resume where it stopped.
+"""
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+
+class CheckpointJournal:
+    """Append-only journal of the units of work a scrape has finished.
+
+    Units are strings naming a piece of work, such as 'department:CISC',
+    optionally recorded with JSON data needed to skip them later. Each unit
+    is appended as a line and fsynced as soon as it is finished, so a crash
+    loses at most the unit in progress. A line torn by a crash is ignored.
+
+    A scrape starts a new journal unless resumed, and removes it once
+    complete. E.g: './cache/checkpoints/courses.jsonl' for 'courses'.
+
+    If a storage backend is given, it is checkpointed before every unit is
+    recorded, so a unit is never journaled ahead of its records.
+    """
+
+    def __init__(self, name, resume=False, storage=None,
+                 location='./cache/checkpoints'):
+        self.logger = logging.getLogger(__name__)
+        self.path = '{}/{}.jsonl'.format(location, name)
+        self.storage = storage
+        self.lock = threading.Lock()
+        self.units = OrderedDict()
+
+        if not os.path.exists(location):
+            os.makedirs(location)
+
+        if resume and os.path.isfile(self.path):
+            with open(self.path, 'rb+') as file:
+                content = file.read()
+
+                # Drop a line torn by a crash, so units appended from here
+                # on start on a line of their own.
+                end = content.rfind(b'\n') + 1
+                file.truncate(end)
+
+            for line in content[:end].decode('utf-8').splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+
+                self.units[entry['unit']] = entry.get('data')
+
+            self.logger.info(
+                'Resuming %s, %s unit(s) already finished',
+                name, len(self.units))
+
+        self.file = open(
+            self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def is_done(self, unit):
+        """Check if a unit was finished.
+
+        Args:
+            unit: String name of unit.
+        """
+        with self.lock:
+            return unit in self.units
+
+    def get(self, unit):
+        """Get the data a finished unit was recorded with.
+
+        Args:
+            unit: String name of unit.
+
+        Returns:
+            Data of the unit, or None if it wasn't finished or has no data.
+        """
+        with self.lock:
+            return self.units.get(unit)
+
+    def finished(self, prefix=''):
+        """List finished units, in the order they were finished.
+
+        Args:
+            prefix (optional): String prefix of the units to list, such as
+                'course:'.
+
+        Returns:
+            List of tuples of string name of unit, and its data.
+        """
+        with self.lock:
+            return [
+                (unit, data) for unit, data in self.units.items()
+                if unit.startswith(prefix)
+            ]
+
+    def done(self, unit, data=None):
+        """Record a finished unit.
+
+        Args:
+            unit: String name of unit.
+            data (optional): JSON serializable data needed to skip the unit.
+        """
+        if self.storage:
+            self.storage.checkpoint()
+
+        line = json.dumps({'unit': unit, 'data': data}, ensure_ascii=False)
+
+        with self.lock:
+            self.units[unit] = data
+            self.file.write(line + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def complete(self):
+        """Remove the journal of a scrape that ran to completion."""
+        with self.lock:
+            self.file.close()
+
+            if os.path.isfile(self.path):
+                os.remove(self.path)
@@ -0,0 +1,302 @@
+"""
+quartzscrapers.scrapers.utils.metrics
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the metrics registry scrapers record request timings,
+sizes and outcomes to, and its exports as a JSON report or in Prometheus
+text format.
+"""
+
+import os
+import json
+import threading
+
+PREFIX = 'quartzscrapers_'
+
+# Upper bounds of histogram buckets, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Type and description of every metric.
+DEFINITIONS = {
+    'http_responses_total': (
+        'counter', 'HTTP responses received, by status code.'),
+    'http_errors_total': (
+        'counter', 'HTTP requests failed without a response, by error.'),
+    'http_response_bytes_total': (
+        'counter', 'Bytes of HTTP response bodies received.'),
+    'http_retries_total': (
+        'counter', 'HTTP requests retried by backoff.'),
+    'http_backoff_seconds_total': (
+        'counter', 'Seconds slept by backoff before retrying requests.'),
+    'rate_limit_wait_seconds_total': (
+        'counter', 'Seconds slept waiting on the per-host rate limiter.'),
+    'sleep_seconds_total': (
+        'counter', 'Seconds slept by Scraper.wait.'),
+    'http_response_seconds': (
+        'histogram', ('Seconds from sending a request to receiving the '
+                      'response headers, including DNS lookup and connect '
+                      'for new connections.')),
+    'http_transfer_seconds': (
+        'histogram', 'Seconds receiving response bodies after headers.'),
+    'parse_seconds': (
+        'histogram', 'Seconds parsing pages into BeautifulSoup objects.'),
+}
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms.
+
+    Every series is labelled by scraper and host, and optionally more
+    labels, such as the status code of a response. Registries of separate
+    processes are combined via `collect` and `merge`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def increment(self, name, value=1, **labels):
+        """Add to a counter.
+
+        Args:
+            name: String name of counter, such as 'http_retries_total'.
+            value (optional): Number to add.
+            **labels: String labels of the series, including scraper and
+                host.
+        """
+        key = (name, tuple(sorted(labels.items())))
+
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record a value in a histogram.
+
+        Args:
+            name: String name of histogram, such as 'parse_seconds'.
+            value: Number observed.
+            **labels: String labels of the series, including scraper and
+                host.
+        """
+        key = (name, tuple(sorted(labels.items())))
+
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = [[0] * len(BUCKETS), 0, 0]
+
+            buckets, _, _ = histogram = self.histograms[key]
+
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    buckets[index] += 1
+                    break
+
+            histogram[1] += value
+            histogram[2] += 1
+
+    def collect(self):
+        """Take the recorded series, and reset the registry.
+
+        Returns:
+            Picklable snapshot of the series, to be passed to `merge`.
+        """
+        with self.lock:
+            snapshot = (self.counters, self.histograms)
+            self.counters = {}
+            self.histograms = {}
+
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add the series of a snapshot, such as one of another process.
+
+        Args:
+            snapshot: Snapshot returned by `collect`.
+        """
+        counters, histograms = snapshot
+
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+            for key, (buckets, total, count) in histograms.items():
+                if key not in self.histograms:
+                    self.histograms[key] = [[0] * len(BUCKETS), 0, 0]
+
+                histogram = self.histograms[key]
+                histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+                histogram[1] += total
+                histogram[2] += count
+
+    def report(self):
+        """Build a report of every series, by scraper and host.
+
+        Counters with labels besides scraper and host, such as status
+        codes, are broken down by those labels. Histograms are summarized
+        by count, sum, mean and cumulative bucket counts.
+
+        Returns:
+            Dictionary of scraper to dictionary of host to metrics.
+        """
+        report = {}
+
+        counters, histograms = self._copy()
+
+        for (name, labels), value in sorted(counters.items()):
+            labels = dict(labels)
+            metrics = self._get_host_report(report, labels)
+            extra = [labels[label] for label in sorted(labels)]
+
+            if not extra:
+                metrics[name] = value
+                continue
+
+            breakdown = metrics.setdefault(name, {})
+            breakdown[','.join(extra)] = value
+
+        for (name, labels), (buckets, total, count) in sorted(
+                histograms.items()):
+            metrics = self._get_host_report(report, dict(labels))
+            metrics[name] = {
+                'count': count,
+                'sum': round(total, 6),
+                'mean': round(total / count, 6) if count else 0,
+                'buckets': dict(zip(
+                    [str(bound) for bound in BUCKETS] + ['+Inf'],
+                    self._cumulate(buckets, count),
+                )),
+            }
+
+        return report
+
+    def to_prometheus(self):
+        """Export every series in Prometheus text format.
+
+        Returns:
+            String of metrics, ending in a newline.
+        """
+        lines = []
+
+        counters, histograms = self._copy()
+
+        for name, (kind, description) in DEFINITIONS.items():
+            series = counters if kind == 'counter' else histograms
+            keys = sorted(key for key in series if key[0] == name)
+
+            if not keys:
+                continue
+
+            lines.append('# HELP {}{} {}'.format(PREFIX, name, description))
+            lines.append('# TYPE {}{} {}'.format(PREFIX, name, kind))
+
+            for key in keys:
+                labels = key[1]
+
+                if kind == 'counter':
+                    lines.append('{}{}{} {}'.format(
+                        PREFIX, name, format_labels(labels), series[key]))
+                    continue
+
+                buckets, total, count = series[key]
+                bounds = [str(bound) for bound in BUCKETS] + ['+Inf']
+
+                for bound, cumulative in zip(
+                        bounds, self._cumulate(buckets, count)):
+                    lines.append('{}{}_bucket{} {}'.format(
+                        PREFIX, name,
+                        format_labels(labels + (('le', bound),)),
+                        cumulative,
+                    ))
+
+                lines.append('{}{}_sum{} {}'.format(
+                    PREFIX, name, format_labels(labels), total))
+                lines.append('{}{}_count{} {}'.format(
+                    PREFIX, name, format_labels(labels), count))
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path, metrics_format='json'):
+        """Write every series to a file.
+
+        Args:
+            path: String location of file.
+            metrics_format (optional): 'json' for a report, or 'prometheus'
+                for Prometheus text format.
+        """
+        directory = os.path.dirname(path)
+
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        if metrics_format == 'prometheus':
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.report(), indent=2) + '\n'
+
+        with open(path + '.tmp', 'w') as file:
+            file.write(content)
+
+        os.replace(path + '.tmp', path)
+
+    def _copy(self):
+        # Copy the series, to export them without holding the lock.
+        with self.lock:
+            histograms = {
+                key: (list(buckets), total, count)
+                for key, (buckets, total, count) in self.histograms.items()
+            }
+
+            return dict(self.counters), histograms
+
+    @staticmethod
+    def _get_host_report(report, labels):
+        # Get (or create) the metrics of a series' scraper and host, leaving
+        # its other labels in `labels`.
+        scraper = labels.pop('scraper', '')
+        host = labels.pop('host', '')
+
+        return report.setdefault(scraper, {}).setdefault(host, {})
+
+    @staticmethod
+    def _cumulate(buckets, count):
+        # Turn per-bucket counts into cumulative counts, ending in +Inf.
+        cumulative = []
+        running = 0
+
+        for bucket in buckets:
+            running += bucket
+            cumulative.append(running)
+
+        return cumulative + [count]
+
+
+def format_labels(labels):
+    """Format labels of a series in Prometheus text format.
+
+    Args:
+        labels: Tuple of pairs of string label name and value.
+
+    Returns:
+        String such as '{host="www.queensu.ca",scraper="buildings"}'.
+    """
+    if not labels:
+        return ''
+
+    pairs = []
+
+    for name, value in labels:
+        value = (str(value).replace('\\', '\\\\').replace('"', '\\"')
+                 .replace('\n', '\\n'))
+        pairs.append('{}="{}"'.format(name, value))
+
+    return '{' + ','.join(pairs) + '}'
+
+
+# Shared by every scraper of a process.
+METRICS_REGISTRY = Metrics()
+
+
+def get_metrics():
+    """Get the metrics registry shared by scrapers."""
+    return METRICS_REGISTRY
@@ -0,0 +1,179 @@
+"""
+quartzscrapers.scrapers.utils.parsing
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the parser pool, which parses pages in worker processes
+rather than in the threads that fetched them.
+"""
+
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from .metrics import get_metrics
+
+
+class ParserPool:
+    """Pool of worker processes turning raw pages into plain data.
+
+    BeautifulSoup holds the GIL while it builds a tree, so threads fetching
+    pages serialize on parsing them. Fetching threads instead hand the raw
+    bytes of a page to the pool, along with a parse function that takes the
+    page's soup and returns picklable data, such as dictionaries.
+
+    At most `max_pending` pages are queued or being parsed at once. Further
+    submissions block until a page is parsed, so fetched pages can't pile up
+    in memory faster than they are parsed.
+
+    With `max_workers=0`, pages are parsed in the calling thread instead.
+
+    Parse times are recorded to the metrics registry of the submitting
+    process, under the scraper name 'parser_pool'.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, parser='lxml',
+                 metrics=None):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+
+        self.max_workers = max_workers
+        self.metrics = metrics or get_metrics()
+        self.max_pending = max_pending or max(max_workers, 1) * 4
+        self.parser = parser
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def submit(self, parse, response, *args):
+        """Queue a page to be parsed, blocking while the pool is full.
+
+        Args:
+            parse: Module-level function or static method, taking the
+                BeautifulSoup object of the page followed by `args`.
+            response: Requests response object of the page.
+            *args: Picklable arguments passed on to `parse`.
+
+        Returns:
+            Future of the data returned by `parse`.
+        """
+        job = (parse, response.content, response.encoding, self.parser, args)
+        host = urlparse(response.url or '').netloc
+        future = Future()
+
+        if not self.max_workers:
+            try:
+                self._resolve(future, host, parse_page(*job))
+            except Exception as ex:
+                future.set_exception(ex)
+
+            return future
+
+        self.slots.acquire()
+
+        try:
+            job_future = self._submit(job)
+        except Exception:
+            self.slots.release()
+            raise
+
+        job_future.add_done_callback(
+            lambda done: self._finish(done, future, host))
+
+        return future
+
+    def close(self):
+        """Wait for queued pages, and stop the worker processes.
+
+        Worker processes are started again if the pool is used afterwards.
+        """
+        with self.lock:
+            executor, self.executor = self.executor, None
+
+        if executor:
+            executor.shutdown()
+
+    def _submit(self, job):
+        # Submit a job, replacing the executor once if a worker died (e.g.
+        # killed for running out of memory), which breaks the whole pool.
+        try:
+            return self._get_executor().submit(parse_page, *job)
+        except BrokenProcessPool:
+            self.close()
+            return self._get_executor().submit(parse_page, *job)
+
+    def _get_executor(self):
+        # Start worker processes on first use.
+        with self.lock:
+            if not self.executor:
+                # Spawn rather than fork workers. Forking a process running
+                # fetch threads copies locks those threads may be holding.
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+
+            return self.executor
+
+    def _finish(self, job_future, future, host):
+        # Free the job's slot, and pass its outcome on to the caller.
+        self.slots.release()
+
+        try:
+            result = job_future.result()
+        except Exception as ex:
+            future.set_exception(ex)
+        else:
+            self._resolve(future, host, result)
+
+    def _resolve(self, future, host, result):
+        # Record the time the page took to parse, and return its data.
+        data, seconds = result
+
+        self.metrics.observe(
+            'parse_seconds', seconds, scraper='parser_pool', host=host)
+        future.set_result(data)
+
+
+def parse_page(parse, content, encoding, parser, args):
+    """Parse a raw page and extract its data. Runs in a worker process.
+
+    Args:
+        parse: Function taking the BeautifulSoup object followed by `args`.
+        content: Bytes of the page.
+        encoding: String encoding of the page, or None to detect it.
+        parser: Name of BeautifulSoup parser.
+        args: Tuple of arguments passed on to `parse`.
+
+    Returns:
+        Tuple of data returned by `parse`, and number of seconds spent
+        building the BeautifulSoup object.
+    """
+    start_time = time.perf_counter()
+    soup = BeautifulSoup(content, parser, from_encoding=encoding)
+    seconds = time.perf_counter() - start_time
+
+    return parse(soup, *args), seconds
+
+
+PARSER_POOL = {'default': ParserPool()}
+
+
+def get_parser_pool():
+    """Get the parser pool shared by scrapers."""
+    return PARSER_POOL['default']
+
+
+def set_parser_pool(parser_pool):
+    """Set the parser pool shared by scrapers.
+
+    Args:
+        parser_pool: Parser pool, such as ParserPool(max_workers=8).
+    """
+    PARSER_POOL['default'] = parser_pool
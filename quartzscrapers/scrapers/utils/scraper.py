@@ -6,22 +6,238 @@ This module contains the base Scraper class, which handle generalized
 functionality for all sup scrapers.
 """
 
-import os
-import json
 import time
+import asyncio
 import logging
+import functools
+import threading
+from weakref import WeakKeyDictionary
+from urllib.parse import urlparse
+from email.utils import parsedate_to_datetime
 
 import backoff
 import requests
 from bs4 import BeautifulSoup
 
+from .storage import get_storage
+from .metrics import get_metrics
+
+
+class TokenBucket:
+    """Token bucket limiting the request rate to a single host.
+
+    The bucket refills at `rate` tokens per second up to `burst` tokens, and
+    every request takes one token. Throttling responses halve the rate, and
+    successful responses gradually restore it.
+    """
+
+    # Floor for the adaptive rate, in requests per second.
+    MIN_RATE = 0.05
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available.
+
+        Returns:
+            Number of seconds slept.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            delay = max(self.blocked_until - now, 0)
+
+            if self.tokens < 1:
+                delay = max(delay, (1 - self.tokens) / self.rate)
+
+            # Reserve the token now so concurrent callers queue up behind.
+            self.tokens -= 1
+
+        if delay:
+            time.sleep(delay)
+
+        return delay
+
+    def throttle(self, retry_after=None):
+        """Slow down after the host signalled it is overloaded.
+
+        Args:
+            retry_after (optional): Seconds the host asked us to wait.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            self.rate = max(self.rate / 2, self.MIN_RATE)
+            self.tokens = min(self.tokens, 0)
+            self.blocked_until = max(
+                self.blocked_until, now + (retry_after or 1 / self.rate))
+
+    def recover(self):
+        """Additively restore the rate after a successful response."""
+        with self.lock:
+            self.rate = min(self.rate + self.max_rate / 10, self.max_rate)
+
+    def _refill(self, now):
+        # Add tokens accrued since the last update, capped at the burst size.
+        elapsed = now - self.updated
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+
+class RateLimiter:
+    """Per-host rate limiter backed by token buckets.
+
+    Hosts without an explicit limit share the default rate and burst size,
+    each in their own bucket. Limits can be given up front as a dictionary
+    of host to a tuple of rate and burst size, such as `HOST_RATES`.
+    """
+
+    THROTTLE_CODES = (429, 503)
+
+    def __init__(self, rate=1.0, burst=4, limits=None):
+        self.rate = rate
+        self.burst = burst
+        self.limits = dict(limits or {})
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def configure(self, host, rate, burst=1):
+        """Set the request rate and burst size of a host.
+
+        Args:
+            host: Hostname, such as 'www.queensu.ca'.
+            rate: Number of requests per second.
+            burst (optional): Number of requests allowed back-to-back.
+        """
+        with self.lock:
+            self.limits[host] = (rate, burst)
+            self.buckets.pop(host, None)
+
+    def acquire(self, host):
+        """Block until a request to the host is allowed.
+
+        Args:
+            host: Hostname of the request.
+
+        Returns:
+            Number of seconds slept.
+        """
+        return self._get_bucket(host).acquire()
+
+    def update(self, host, response):
+        """Adapt the host's rate to a response.
+
+        Args:
+            host: Hostname of the request.
+            response: Requests response object.
+
+        Returns:
+            True if the host signalled it is overloaded, else-wise False.
+        """
+        bucket = self._get_bucket(host)
+
+        if response.status_code not in self.THROTTLE_CODES:
+            bucket.recover()
+            return False
+
+        bucket.throttle(parse_retry_after(response.headers.get('Retry-After')))
+        return True
+
+    def _get_bucket(self, host):
+        # Get (or create) the token bucket of a host.
+        with self.lock:
+            if host not in self.buckets:
+                rate, burst = self.limits.get(host, (self.rate, self.burst))
+                self.buckets[host] = TokenBucket(rate, burst)
+
+            return self.buckets[host]
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header into seconds.
+
+    Args:
+        value: Header value, either delay-seconds or an HTTP-date.
+
+    Returns:
+        Number of seconds to wait, or None if missing or malformed.
+    """
+    if not value:
+        return None
+
+    if value.strip().isdigit():
+        return int(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(retry_at.timestamp() - time.time(), 0)
+
+
+# Request rates (per second) and burst sizes of the hosts we scrape. Bursts
+# match the requests AsyncScraper keeps in flight per host. Other hosts get
+# the default of 1 request/s. Override them with `run_scraper.py --rate`.
+HOST_RATES = {
+    'www.queensu.ca': (4, 4),
+    'smith.queensu.ca': (2, 4),
+    'www.queensjournal.ca': (2, 4),
+    'www.juris-diction.ca': (2, 4),
+    'www.campusbookstore.com': (2, 4),
+    'www.googleapis.com': (10, 10),
+}
+
+# Shared by every scraper, so sources on the same host share one budget.
+RATE_LIMITER = RateLimiter(limits=HOST_RATES)
+
+
+def get_rate_limiter():
+    """Get the rate limiter shared by scrapers not given their own."""
+    return RATE_LIMITER
+
+
+def record_backoff(details):
+    """Record a retry of `Scraper.http_request` scheduled by backoff.
+
+    Args:
+        details: Dictionary of details of the backoff event.
+    """
+    scraper, *args = details['args']
+    url = args[0] if args else details['kwargs']['url']
+    labels = {'scraper': scraper.name, 'host': urlparse(url).netloc}
+
+    scraper.metrics.increment('http_retries_total', **labels)
+    scraper.metrics.increment(
+        'http_backoff_seconds_total', details['wait'], **labels)
+
 
 class Scraper:
-    """Scraper base class. Handle common functions amongst all sub scrapers."""
+    """Scraper base class. Handle common functions amongst all sub scrapers.
 
-    def __init__(self):
+    Requests, parses and sleeps are recorded to a metrics registry, shared
+    by every scraper unless given one, labelled by the scraper's `name`.
+    """
+
+    def __init__(self, rate_limiter=None, cache=None, storage=None,
+                 parser='lxml', name='default', metrics=None):
         self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.metrics = metrics or get_metrics()
+        self.parser = parser
         self.session = requests.Session()
+        self.rate_limiter = rate_limiter or RATE_LIMITER
+        self.cache = cache
+        self._storage = storage
         self.headers = {
             'Accept': ('text/html,application/xhtml+xml,application/xml;q=0.9,'
                        'image/webp, */*;q=0.8'),
@@ -41,6 +257,7 @@ class Scraper:
         backoff.expo,
         requests.exceptions.RequestException,
         max_time=60,
+        on_backoff=record_backoff,
     )
     def http_request(
         self,
@@ -50,11 +267,20 @@ class Scraper:
         headers=None,
         timeout=60,
         parse=True,
+        skip_unchanged=False,
+        parse_only=None,
+        retry_throttled=True,
     ):
         """Handle HTTP request for a given URL.
 
         Request the given URL, and process as a BeautifulSoup object or as
-        a requests response, depending on the result.
+        a requests response, depending on the result. Requests are paced by
+        the per-host rate limiter. Throttling responses (429/503) raise an
+        HTTPError, so the request is retried once the host allows it, unless
+        `retry_throttled` is false.
+
+        If the scraper has an HTTP cache, cached responses are revalidated
+        with a conditional request and replayed when the server answers 304.
 
         Args:
             url: URL to request
@@ -63,39 +289,89 @@ class Scraper:
             headers (optional): Dictionary of HTTP headers.
             timeout (optional): Time limit for request to complete.
             parse (optional): Bool to determine a BeautifulSoup parse result.
+            skip_unchanged (optional): Bool to return None instead of the
+                cached result if the server reports it unchanged.
+            parse_only (optional): SoupStrainer to only parse matching
+                elements, when only part of the page is needed.
+            retry_throttled (optional): Bool to retry throttling responses.
+                If false, they are returned for the caller to handle, such
+                as an exceeded quota that won't reset within the retries.
 
         Returns:
             BeautifulSoup element tag object if `parse` is true, else-wise a
-            Requests response object.
+            Requests response object. None if `skip_unchanged` is true and
+            the response hasn't changed.
         """
 
-        response = self.session.get(
-            url,
-            params=params,
-            cookies=cookies,
-            headers=headers or self.headers,
-            timeout=timeout,
+        host = urlparse(url).netloc
+        headers = headers or self.headers
+        labels = {'scraper': self.name, 'host': host}
+        cache_key = None
+
+        if self.cache:
+            cache_key = self.cache.make_key(url, params)
+            headers = self._get_revalidation_headers(headers, cache_key)
+
+        self.metrics.increment(
+            'rate_limit_wait_seconds_total',
+            self.rate_limiter.acquire(host),
+            **labels,
         )
 
+        start_time = time.perf_counter()
+
+        try:
+            response = self.session.get(
+                url,
+                params=params,
+                cookies=cookies,
+                headers=headers,
+                timeout=timeout,
+            )
+        except requests.exceptions.RequestException as ex:
+            self.metrics.increment(
+                'http_errors_total', error=type(ex).__name__, **labels)
+            raise
+
+        self._record_response(response, start_time, labels)
+
+        if self.rate_limiter.update(host, response):
+            self.logger.debug(
+                'Throttled by %s (%s)', host, response.status_code)
+
+            if not retry_throttled:
+                return response
+
+            response.raise_for_status()
+
+        if self.cache:
+            response = self._revalidate(cache_key, response)
+
+            if skip_unchanged and getattr(response, 'from_cache', False):
+                return None
+
         # Parse the response via BeautifulSoup after detecting its markup.
         if parse:
-            return self._soupify(response)
+            return self._soupify(response, parse_only)
 
         return response
 
+    @property
+    def storage(self):
+        """Storage backend of this scraper, else-wise the shared default."""
+        return self._storage or get_storage()
+
     def write_data(self, data, filename, location='./dumps'):
-        """Take data object and write to JSON file.
+        """Take data object and write it to the storage backend.
+
+        With the default backend, this is a JSON file per record.
 
         Args:
             data: Dictionary of data.
             filename: String name of file.
             location (optional): String location of file.
         """
-        if not os.path.exists(location):
-            os.makedirs(location)
-
-        with open('{}/{}.json'.format(location, filename), 'w+') as file:
-            file.write(json.dumps(data, indent=2, ensure_ascii=False))
+        self.storage.write(data, filename, location)
 
     def update_data(self, data, subdata, key, filename, location='./dumps'):
         """Update info by appending in existing file. Create if non-existent.
@@ -107,16 +383,11 @@ class Scraper:
             filename: String name of file
             location (optional): String location of file
         """
-        filepath = '{}/{}.json'.format(location, filename)
+        data_old = self.storage.read(filename, location)
 
-        if os.path.isfile(filepath):
-            with open(filepath, 'r+t') as file:
-                data_old = json.loads(file.read())
-                data_old[key].append(subdata)
-
-                # Rewrite file from line 0.
-                file.seek(0)
-                file.write(json.dumps(data_old, indent=2, ensure_ascii=False))
+        if data_old:
+            data_old[key].append(subdata)
+            self.write_data(data_old, filename, location)
         else:
             data[key] = [subdata]
             self.write_data(data, filename, location)
@@ -129,19 +400,71 @@ class Scraper:
         """
         time.sleep(seconds)
 
+        self.metrics.increment(
+            'sleep_seconds_total', seconds, scraper=self.name, host='')
+
     def handle_error(self):
         """Handle error by logging error message."""
         self.logger.error('Scraper error', exc_info=True)
 
-    def _soupify(self, response):
+    def _record_response(self, response, start_time, labels):
+        # Requests measures the time to response headers. The rest of the
+        # request was spent receiving the body.
+        seconds = time.perf_counter() - start_time
+        response_seconds = response.elapsed.total_seconds()
+
+        self.metrics.observe(
+            'http_response_seconds', response_seconds, **labels)
+        self.metrics.observe(
+            'http_transfer_seconds',
+            max(seconds - response_seconds, 0.0),
+            **labels,
+        )
+        self.metrics.increment(
+            'http_responses_total', code=str(response.status_code), **labels)
+        self.metrics.increment(
+            'http_response_bytes_total', len(response.content), **labels)
+
+    def _get_revalidation_headers(self, headers, cache_key):
+        # Replace no-cache directives with validators of the cached response.
+        headers = {
+            name: value for name, value in headers.items()
+            if name not in ('Cache-Control', 'Pragma')
+        }
+        headers.update(self.cache.get_validators(cache_key))
+
+        return headers
+
+    def _revalidate(self, cache_key, response):
+        # Replay the cached response on a 304, else-wise cache the new one.
+        if response.status_code != 304:
+            self.cache.store(cache_key, response)
+            return response
+
+        cached_response = self.cache.load(cache_key)
+
+        # Entry evicted since the request was sent. Retrying via backoff
+        # sends a plain request instead.
+        if cached_response is None:
+            raise requests.exceptions.RequestException(
+                'Cache entry missing for 304 response', response=response)
+
+        self.logger.debug('Not modified: %s', response.url)
+
+        return cached_response
+
+    def _soupify(self, response, parse_only=None):
         """Detect response format and return respective BeautifulSoup parser.
 
 
         Detects if requests response format is HTML or XML, and returns a
-        BeautifulSoup parser respective to response format.
+        BeautifulSoup parser respective to response format. HTML is parsed
+        with the scraper's `parser`, lxml unless configured otherwise.
 
         Args:
             response: Requests response object.
+            parse_only (optional): SoupStrainer to only parse matching
+                elements.
 
         Returns:
             BeautifulSoup element tag object.
@@ -150,12 +473,142 @@ class Scraper:
         content_type = response.headers.get('content-type', 'unknown')
 
         def get_soup(parser):
-            """"Instantiate BeautifulSoup object"""
-            return BeautifulSoup(response.text, parser)
+            """"Instantiate BeautifulSoup object, and record parse time."""
+            start_time = time.perf_counter()
+            soup = BeautifulSoup(response.text, parser, parse_only=parse_only)
+
+            self.metrics.observe(
+                'parse_seconds',
+                time.perf_counter() - start_time,
+                scraper=self.name,
+                host=urlparse(response.url or '').netloc,
+            )
+
+            return soup
 
         # XML markup.
         if 'xml' in content_type:
             return get_soup('lxml')
 
         # HTML markup.
-        return get_soup('html.parser')
+        return get_soup(self.parser)
+
+
+class AsyncScraper:
+    """Asyncio fetch engine layered over a base Scraper.
+
+    Requests are issued through the wrapped scraper's `http_request`, so the
+    backoff semantics and BeautifulSoup return type are identical. Blocking
+    requests run in the event loop's default executor, with a bounded number
+    of requests in flight per host.
+
+    Every request still takes a token from the scraper's rate limiter, so
+    after the first burst, throughput to a host is capped by its rate rather
+    than by `max_per_host`. E.g. a host at the default rate of 1 request/s
+    gets 1 request/s, however many are in flight. See `HOST_RATES`.
+    """
+
+    def __init__(self, scraper=None, max_per_host=4):
+        self.scraper = scraper or Scraper()
+        self.logger = self.scraper.logger
+        self.max_per_host = max_per_host
+
+        # Semaphores are bound to the loop they were first used in, so keep
+        # one set of per-host semaphores per event loop.
+        self._semaphores = WeakKeyDictionary()
+
+    async def fetch(self, url, callback=None, **kwargs):
+        """Asynchronously handle HTTP request for a given URL.
+
+        Args:
+            url: URL to request.
+            callback: Optional function called with the result as soon as
+                it arrives, in the thread that made the request. Its return
+                value replaces the result.
+            **kwargs: Keyword arguments passed on to `Scraper.http_request`.
+
+        Returns:
+            BeautifulSoup element tag object if `parse` is true, else-wise a
+            Requests response object, or the value returned by `callback`.
+        """
+        loop = asyncio.get_running_loop()
+        request = functools.partial(self.scraper.http_request, url, **kwargs)
+
+        if callback:
+            request = functools.partial(_call_with_result, callback, request)
+
+        async with self._get_semaphore(loop, urlparse(url).netloc):
+            return await loop.run_in_executor(None, request)
+
+    async def fetch_many(self, urls, **kwargs):
+        """Asynchronously handle HTTP requests for several URLs.
+
+        A failed request does not cancel the others. Its exception is
+        returned in place of its result instead.
+
+        Args:
+            urls: List of URLs to request.
+            **kwargs: Keyword arguments passed on to `fetch`.
+
+        Returns:
+            List of results (or exceptions) in the same order as `urls`.
+        """
+        return await asyncio.gather(
+            *(self.fetch(url, **kwargs) for url in urls),
+            return_exceptions=True,
+        )
+
+    def request_many(self, urls, **kwargs):
+        """Handle HTTP requests for several URLs from synchronous code.
+
+        Args:
+            urls: List of URLs to request.
+            **kwargs: Keyword arguments passed on to `fetch`.
+
+        Returns:
+            List of results (or exceptions) in the same order as `urls`.
+        """
+        return asyncio.run(self.fetch_many(urls, **kwargs))
+
+    async def fetch_each(self, requests_kwargs):
+        """Asynchronously handle HTTP requests with their own arguments.
+
+        Args:
+            requests_kwargs: List of dictionaries of keyword arguments passed
+                on to `fetch`, including `url`.
+
+        Returns:
+            List of results (or exceptions) in the same order as
+            `requests_kwargs`.
+        """
+        return await asyncio.gather(
+            *(self.fetch(**kwargs) for kwargs in requests_kwargs),
+            return_exceptions=True,
+        )
+
+    def request_each(self, requests_kwargs):
+        """Handle HTTP requests with their own arguments from synchronous code.
+
+        Args:
+            requests_kwargs: List of dictionaries of keyword arguments passed
+                on to `fetch`, including `url`.
+
+        Returns:
+            List of results (or exceptions) in the same order as
+            `requests_kwargs`.
+        """
+        return asyncio.run(self.fetch_each(requests_kwargs))
+
+    def _get_semaphore(self, loop, host):
+        # Get (or create) the semaphore capping requests in flight for a host.
+        semaphores = self._semaphores.setdefault(loop, {})
+
+        if host not in semaphores:
+            semaphores[host] = asyncio.Semaphore(self.max_per_host)
+
+        return semaphores[host]
+
+
+def _call_with_result(callback, request):
+    # Make a request, and pass its result on to a callback.
+    return callback(request())
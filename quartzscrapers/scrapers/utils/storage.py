@@ -0,0 +1,435 @@
+"""
+quartzscrapers.scrapers.utils.storage
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the storage backends scrapers write their records to.
+"""
+
+import os
+import gzip
+import json
+import logging
+import threading
+
+# Optional dependency. Only needed for zstd compressed JSON Lines.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class JSONFileStorage:
+    """Storage backend writing one pretty-printed JSON file per record.
+
+    E.g: A record named 'coastal' in './dumps/buildings' is written to
+    './dumps/buildings/coastal.json'.
+    """
+
+    def write(self, data, filename, location):
+        """Write a record, replacing any previous one of the same name.
+
+        Args:
+            data: Dictionary of data.
+            filename: String name of record.
+            location: String location of dataset.
+        """
+        if not os.path.exists(location):
+            os.makedirs(location)
+
+        filepath = self._path(filename, location)
+
+        # Write to a temporary file and rename it over the old one, so
+        # readers never see a partially written file.
+        with open(filepath + '.tmp', 'w+') as file:
+            file.write(json.dumps(data, indent=2, ensure_ascii=False))
+
+        os.replace(filepath + '.tmp', filepath)
+
+    def read(self, filename, location):
+        """Read a record.
+
+        Args:
+            filename: String name of record.
+            location: String location of dataset.
+
+        Returns:
+            Dictionary of data, or None if no such record exists.
+        """
+        if not self.exists(filename, location):
+            return None
+
+        with open(self._path(filename, location), 'r') as file:
+            return json.loads(file.read())
+
+    def exists(self, filename, location):
+        """Check if a record exists.
+
+        Args:
+            filename: String name of record.
+            location: String location of dataset.
+        """
+        return os.path.isfile(self._path(filename, location))
+
+    def checkpoint(self):
+        """Make written records durable. Written immediately, so a no-op."""
+
+    def close(self):
+        """Finish writing. Records are written immediately, so a no-op.
+
+        Returns:
+            Empty list, as there are no dataset files to report.
+        """
+        return []
+
+    def _path(self, filename, location):
+        return '{}/{}.json'.format(location, filename)
+
+
+class JSONLinesStorage:
+    """Storage backend appending records to one JSON Lines sink per dataset.
+
+    A dataset at './dumps/news' is written to './dumps/news.jsonl', one
+    compact record per line, which is the format of a merged dataset. Record
+    names and where their lines are in the sink are indexed in a companion
+    './dumps/news.jsonl.keys' file, so sinks are appended to across runs and
+    a rewritten record supersedes older copies when the sink is closed.
+
+    Appends are buffered, and flushed and fsynced every `checkpoint_every`
+    records, and on `checkpoint` and `close`. Reads never flush.
+    """
+
+    EXTENSIONS = {None: '.jsonl', 'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+
+    def __init__(self, compression=None, checkpoint_every=1000):
+        if compression not in self.EXTENSIONS:
+            raise ValueError('Unknown compression: {}'.format(compression))
+
+        if compression == 'zstd' and not zstandard:
+            raise ValueError('zstd compression requires zstandard')
+
+        self.compression = compression
+        self.checkpoint_every = checkpoint_every
+        self.lock = threading.RLock()
+        self.sinks = {}
+
+    def write(self, data, filename, location):
+        """Append a record, superseding any previous one of the same name.
+
+        Args:
+            data: Dictionary of data.
+            filename: String name of record.
+            location: String location of dataset.
+        """
+        line = json.dumps(data, ensure_ascii=False) + '\n'
+
+        with self.lock:
+            sink = self._get_sink(location)
+            sink.append(filename, line)
+
+            if len(sink.buffer) >= self.checkpoint_every:
+                sink.flush()
+
+    def read(self, filename, location):
+        """Read the latest copy of a record.
+
+        Args:
+            filename: String name of record.
+            location: String location of dataset.
+
+        Returns:
+            Dictionary of data, or None if no such record exists.
+        """
+        with self.lock:
+            return self._get_sink(location).read(filename)
+
+    def exists(self, filename, location):
+        """Check if a record exists.
+
+        Args:
+            filename: String name of record.
+            location: String location of dataset.
+        """
+        with self.lock:
+            return self._get_sink(location).exists(filename)
+
+    def checkpoint(self):
+        """Flush and fsync every open sink."""
+        with self.lock:
+            for sink in self.sinks.values():
+                sink.flush()
+
+    def close(self):
+        """Flush every sink and drop superseded records.
+
+        Returns:
+            List of the dataset files written to.
+        """
+        with self.lock:
+            paths = []
+
+            for sink in self.sinks.values():
+                sink.flush()
+
+                if sink.superseded:
+                    sink.compact()
+
+                paths.append(sink.path)
+
+            self.sinks = {}
+
+        return paths
+
+    def _get_sink(self, location):
+        # Get (or open) the sink of a dataset.
+        location = location.rstrip('/')
+
+        if location not in self.sinks:
+            path = location + self.EXTENSIONS[self.compression]
+            self.sinks[location] = _Sink(
+                path, self.compression, self.checkpoint_every)
+
+        return self.sinks[location]
+
+
+class _Sink:
+    """A JSON Lines file and the index of its records. Not thread-safe on its
+    own.
+
+    Each flush appends one frame to the file: the records' lines as they
+    are, or as one gzip member or zstd frame. The index file holds a line
+    per record of its name, the byte range of its frame, and the offset of
+    its line within the decompressed frame, so a record is read by seeking
+    to its frame. Uncompressed lines are frames of their own.
+
+    The file is the source of truth. Frames are fsynced before they are
+    indexed, and on load, a torn index line is dropped and frames a crash
+    left unindexed are truncated. A compaction is committed by renaming its
+    new index into place, and finished or discarded on load.
+    """
+
+    def __init__(self, path, compression, frame_size):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.keys_path = path + '.keys'
+        self.compression = compression
+        self.frame_size = frame_size
+        self.buffer = []
+
+        # Record name -> line of its latest buffered copy.
+        self.pending = {}
+
+        # Record name -> tuple of start and end of the frame of its latest
+        # copy on disk, and the offset of its line within the frame.
+        self.index = {}
+        self.superseded = 0
+
+        # Start and decompressed content of the last frame read.
+        self.frame = (None, None)
+
+        directory = os.path.dirname(path)
+
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._recover()
+        self._load()
+
+    def append(self, filename, line):
+        """Buffer a record line."""
+        if self.exists(filename):
+            self.superseded += 1
+
+        self.buffer.append((filename, line))
+        self.pending[filename] = line
+
+    def exists(self, filename):
+        """Check if a record was appended."""
+        return filename in self.pending or filename in self.index
+
+    def read(self, filename):
+        """Read the latest copy of a record, or None if it wasn't appended."""
+        if filename in self.pending:
+            return json.loads(self.pending[filename])
+
+        if filename not in self.index:
+            return None
+
+        return json.loads(self._read_line(filename))
+
+    def flush(self):
+        """Append buffered records to disk and fsync them."""
+        if not self.buffer:
+            return
+
+        with open(self.path, 'ab') as file, \
+                open(self.keys_path, 'a', encoding='utf-8') as keys_file:
+            self.index.update(
+                self._write_frame(file, keys_file, self.buffer))
+
+        self.buffer = []
+        self.pending = {}
+
+    def compact(self):
+        """Rewrite the sink, keeping only the latest copy of each record."""
+        self.flush()
+
+        # Read the latest copies in file order, one frame at a time.
+        positions = sorted(
+            (position, name) for name, position in self.index.items())
+        records = []
+
+        with open(self.path + '.tmp', 'wb') as file, \
+                open(self.keys_path + '.tmp', 'w',
+                     encoding='utf-8') as keys_file:
+            for _, name in positions:
+                records.append((name, self._read_line(name)))
+
+                if len(records) >= self.frame_size:
+                    self._write_frame(file, keys_file, records)
+                    records = []
+
+            self._write_frame(file, keys_file, records)
+
+        # Commit the compaction, then swap the files in.
+        os.replace(self.keys_path + '.tmp', self.keys_path + '.new')
+        self._recover()
+        self._load()
+
+    def _read_line(self, filename):
+        # Read the bytes of a record's line, from its (cached) frame.
+        start, end, offset = self.index[filename]
+
+        if self.frame[0] != start:
+            with open(self.path, 'rb') as file:
+                file.seek(start)
+                self.frame = (start, self._decompress(file.read(end - start)))
+
+        content = self.frame[1]
+
+        return content[offset:content.index(b'\n', offset) + 1]
+
+    def _write_frame(self, file, keys_file, records):
+        # Append records as a frame and fsync it, then index and fsync them.
+        # Records are tuples of name and line, as string or bytes. Returns
+        # the positions of the records.
+        if not records:
+            return {}
+
+        start = file.seek(0, os.SEEK_END)
+        lines = [
+            line.encode('utf-8') if isinstance(line, str) else line
+            for _, line in records
+        ]
+        frame = self._compress(b''.join(lines))
+
+        file.write(frame)
+        file.flush()
+        os.fsync(file.fileno())
+
+        entries = []
+        offset = 0
+
+        for (name, _), line in zip(records, lines):
+            if self.compression:
+                position = (start, start + len(frame), offset)
+            else:
+                position = (start + offset, start + offset + len(line), 0)
+
+            entries.append((name, position))
+            offset += len(line)
+
+        keys_file.write(''.join(
+            json.dumps([name, *position], ensure_ascii=False) + '\n'
+            for name, position in entries
+        ))
+        keys_file.flush()
+        os.fsync(keys_file.fileno())
+
+        return dict(entries)
+
+    def _recover(self):
+        # Finish a compaction whose new index was committed, or discard one
+        # that was interrupted before.
+        if os.path.isfile(self.keys_path + '.new'):
+            if os.path.isfile(self.path + '.tmp'):
+                os.replace(self.path + '.tmp', self.path)
+
+            os.replace(self.keys_path + '.new', self.keys_path)
+
+        for path in (self.path + '.tmp', self.keys_path + '.tmp'):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def _load(self):
+        # Index the records of the file, dropping what a crash left behind.
+        self.index = {}
+        self.superseded = 0
+        self.frame = (None, None)
+
+        size = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+        indexed = 0
+        valid = 0
+
+        if os.path.isfile(self.keys_path):
+            with open(self.keys_path, 'rb') as file:
+                for line in file:
+                    try:
+                        name, start, end, offset = json.loads(line)
+                    except ValueError:
+                        break
+
+                    if not line.endswith(b'\n') or end > size:
+                        break
+
+                    if name in self.index:
+                        self.superseded += 1
+
+                    self.index[name] = (start, end, offset)
+                    indexed = max(indexed, end)
+                    valid += len(line)
+
+            if valid < os.path.getsize(self.keys_path):
+                with open(self.keys_path, 'rb+') as file:
+                    file.truncate(valid)
+
+        if size > indexed:
+            self.logger.warning(
+                'Dropping %s unindexed bytes of %s', size - indexed, self.path)
+
+            with open(self.path, 'rb+') as file:
+                file.truncate(indexed)
+
+    def _compress(self, data):
+        if self.compression == 'gzip':
+            return gzip.compress(data)
+
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor().compress(data)
+
+        return data
+
+    def _decompress(self, frame):
+        if self.compression == 'gzip':
+            return gzip.decompress(frame)
+
+        if self.compression == 'zstd':
+            return zstandard.ZstdDecompressor().decompress(frame)
+
+        return frame
+
+
+STORAGE = {'default': JSONFileStorage()}
+
+
+def get_storage():
+    """Get the storage backend used by scrapers without one of their own."""
+    return STORAGE['default']
+
+
+def set_storage(storage):
+    """Set the storage backend used by scrapers without one of their own.
+
+    Args:
+        storage: Storage backend, such as JSONLinesStorage().
+    """
+    STORAGE['default'] = storage
@@ -8,14 +8,45 @@ Positional command line arguments:
     argv[1:]: list of modules (indentified by scraper_key) to scrape
 """
 import argparse
+import base64
+import hashlib
+import json
 import os
+import sys
 import time
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import github
 
 import quartzscrapers as qs
+from quartzscrapers.scrapers.utils import get_storage, set_storage
+from quartzscrapers.scrapers.utils import JSONLinesStorage
+from quartzscrapers.scrapers.utils import ParserPool, set_parser_pool
+from quartzscrapers.scrapers.utils import get_metrics, get_rate_limiter
 from quartzscrapers.scrapers.utils.config import GITHUB_TOKEN
 
+
+def parse_rate(value):
+    """Parse a host's request rate given on the command line.
+
+    Args:
+        value: String of the form 'HOST=RATE' or 'HOST=RATE:BURST', such as
+            'www.queensu.ca=2:4'.
+
+    Returns:
+        Tuple of hostname, requests per second and burst size.
+    """
+    try:
+        host, limit = value.split('=')
+        rate, _, burst = limit.partition(':')
+
+        return host, float(rate), int(burst or 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'expected HOST=RATE[:BURST], got {!r}'.format(value))
+
+
 parser = argparse.ArgumentParser(description='Initialize scraper jobs.')
 
 parser.add_argument(
@@ -48,14 +79,65 @@ parser.add_argument(
     help='Scrapes all News scrapers from all time. For News scrapers only.',
 )
 
-args = parser.parse_args()
+parser.add_argument(
+    '--storage',
+    choices=['json', 'jsonl'],
+    default='json',
+    help=('Storage for scraped records. JSON Lines datasets are written '
+          'directly and need no merge before upload.'),
+)
+
+parser.add_argument(
+    '--compression',
+    choices=['gzip', 'zstd'],
+    help='Compression of JSON Lines datasets. For jsonl storage only.',
+)
+
+parser.add_argument(
+    '--parallel',
+    action='store_true',
+    help='Run each scraper in its own process, concurrently.',
+)
+
+parser.add_argument(
+    '--resume',
+    action='store_true',
+    help=('Resume an interrupted scrape, skipping the units it finished. '
+          'For Courses, Textbooks and News scrapers only.'),
+)
+
+parser.add_argument(
+    '--parse-workers',
+    type=int,
+    help=('Number of processes parsing pages, per scraper. Defaults to the '
+          'number of CPUs. 0 parses pages in the fetching threads.'),
+)
+
+parser.add_argument(
+    '--rate',
+    action='append',
+    type=parse_rate,
+    default=[],
+    metavar='HOST=RATE[:BURST]',
+    help=('Requests per second, and optionally burst size, for a host. '
+          'Repeat for several hosts. Overrides the built-in rates.'),
+)
+
+parser.add_argument(
+    '--metrics',
+    metavar='PATH',
+    help=('Write request, parse and wait metrics of every scraper, by '
+          'host, to a file at the end of the session.'),
+)
+
+parser.add_argument(
+    '--metrics-format',
+    choices=['json', 'prometheus'],
+    default='json',
+    help='Format of the metrics file, a JSON report or Prometheus text.',
+)
 
 ORG = 'queens-qmulus'
-REPO = args.repo
-TO_SCRAPE = args.scrapers
-LOCATION = args.location
-SHOULD_DEEP_SCRAPE = args.deep
-SHOULD_UPLOAD = args.upload
 SCRAPERS = [
     qs.TestScraper,
     qs.Buildings,
@@ -65,58 +147,150 @@ SCRAPERS = [
 ]
 
 
-def push_to_github(scraper_name, gh_repo):
-    """Aggregate files into one compiled file and automate a push to GitHub.
+def push_to_github(files, gh_repo, repo=None,
+                   manifest_path='./cache/manifest.json'):
+    """Automate a push of compiled dataset files to GitHub.
+
+    Local files are hashed as git blobs and compared with a single listing
+    of the remote tree, so unchanged datasets are never transferred. Changed
+    files are pushed together in one commit through the Git Data API.
 
     Args:
-        scraper_name: Name of the passed scraper class.
+        files: List of locations of compiled dataset files.
+        gh_repo: Name of the repository to deposit datasets to.
+        repo (optional): Repository object to push to, instead of looking
+            up `gh_repo` on GitHub.
+        manifest_path (optional): Location of the blob SHA manifest.
     """
-    repo = github.Github(GITHUB_TOKEN).get_organization(ORG).get_repo(gh_repo)
-    files = merge_files(scraper_name)
+    if repo is None:
+        repo = (github.Github(GITHUB_TOKEN)
+                .get_organization(ORG).get_repo(gh_repo))
+
+    manifest = BlobManifest(manifest_path)
+
+    ref = repo.get_git_ref('heads/{}'.format(repo.default_branch))
+    base_commit = repo.get_git_commit(ref.object.sha)
+    base_tree = repo.get_git_tree(base_commit.tree.sha)
+    remote_shas = {
+        element.path: element.sha
+        for element in base_tree.tree if element.type == 'blob'
+    }
+
+    elements = []
+    datasets = []
 
     for filename in files:
-        output = '/{}'.format(filename.split('/')[-1])
-        message = 'Export dataset: {}'.format(filename.split('/')[-1][:-5])
+        # JSON Lines datasets keep the established '<dataset>.json' names.
+        output = filename.split('/')[-1].replace('.jsonl', '.json')
 
-        with open(filename, 'r') as file:
-            try:
-                file_repo = repo.get_contents(output)
-                file_disk = file.read()
-
-                # Only commit if there are changes to push.
-                if file_repo.decoded_content.decode("utf-8") != file_disk:
-                    print('Updating existing file')
-                    repo.update_file(
-                        output.strip('/'),
-                        message,
-                        file_disk,
-                        file_repo.sha,
-                    )
-
-            # File doesn't exist, meaning it's a new file to commit.
-            except github.UnknownObjectException:
-                print('New file detected. Creating for commit...')
-                repo.create_file(output.strip('/'), message, file.read())
-
-
-def merge_files(filename, filepath='./dumps'):
+        # Only commit if there are changes to push.
+        if manifest.get_sha(filename) == remote_shas.get(output):
+            continue
+
+        print('Changes detected in {}. Creating blob...'.format(output))
+
+        with open(filename, 'rb') as file:
+            content = base64.b64encode(file.read()).decode('ascii')
+
+        blob = repo.create_git_blob(content, 'base64')
+        elements.append(github.InputGitTreeElement(
+            output, '100644', 'blob', sha=blob.sha))
+        datasets.append(output.split('.')[0])
+
+    manifest.save()
+
+    if not elements:
+        print('No changes to push')
+        return
+
+    message = 'Export datasets: {}'.format(', '.join(datasets))
+    tree = repo.create_git_tree(elements, base_tree)
+    commit = repo.create_git_commit(message, tree, [base_commit])
+    ref.edit(commit.sha)
+
+
+class BlobManifest:
+    """Local manifest of the git blob SHA-1 of each dataset file.
+
+    A file is only re-hashed when its size or modification time changed
+    since the SHA was recorded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        try:
+            with open(path, 'r') as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get_sha(self, filepath):
+        """Get the git blob SHA-1 of a file.
+
+        Args:
+            filepath: Location of the file.
+
+        Returns:
+            String hex digest, as computed by `git hash-object`.
+        """
+        stat = os.stat(filepath)
+        entry = self.entries.get(filepath)
+
+        if (entry and entry['size'] == stat.st_size
+                and entry['mtime'] == stat.st_mtime_ns):
+            return entry['sha']
+
+        sha = hashlib.sha1('blob {}\0'.format(stat.st_size).encode())
+
+        with open(filepath, 'rb') as file:
+            for chunk in iter(lambda: file.read(2**20), b''):
+                sha.update(chunk)
+
+        self.entries[filepath] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'sha': sha.hexdigest(),
+        }
+
+        return self.entries[filepath]['sha']
+
+    def save(self):
+        """Write the manifest to disk."""
+        directory = os.path.dirname(self.path)
+
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(self.path + '.tmp', 'w') as file:
+            file.write(json.dumps(self.entries, indent=2))
+
+        os.replace(self.path + '.tmp', self.path)
+
+
+def merge_files(filename, filepath='./dumps', workers=None):
     """Compile multiple files from an executed scrape into one compiled file.
 
     Access the resulting directory of a scraper's JSON files and consolidate
-    into one compiled JSON file. Sub-directories will be shallowly accessed
-    to create compiled files of the sub-directory.
+    into one compiled JSON Lines file. Sub-directories will be shallowly
+    accessed to create compiled files of the sub-directory.
 
     E.g: For courses, courses/sections, courses/departments, courses/courses
     result in sections.json, departments.json and courses.json.
 
+    Binary indexes written alongside the scraper's files are compiled too,
+    see `compile_indexes`.
+
     Args:
         filename: String of the directory in question.
         filepath (optional): Location of the directory in question.
+        workers (optional): Number of processes parsing files. Defaults to
+            the number of CPUs.
 
     Returns:
         A list of the locations of the resulting compiled files.
     """
-    filepaths = []
+    filepaths = compile_indexes(filename, filepath)
     file_dir = './data'
     filepath = '{}/{}'.format(filepath, filename)
 
@@ -126,52 +300,300 @@ def merge_files(filename, filepath='./dumps'):
     # Check if the filepath has any subdirectories or files.
     _, directories, files = next(os.walk(filepath))
 
-    if directories:
-        for directory in directories:
-            path_in = '{}/{}'.format(filepath, directory)
-            path_out = '{}/{}.json'.format(file_dir, directory)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if directories:
+            for directory in sorted(directories):
+                path_in = '{}/{}'.format(filepath, directory)
+                path_out = '{}/{}.json'.format(file_dir, directory)
+                filepaths.append(path_out)
+
+                _, _, files = next(os.walk(path_in))
+                write_files(path_in, path_out, files, executor)
+        else:
+            path_out = '{}/{}.json'.format(file_dir, filename)
+
             filepaths.append(path_out)
+            write_files(filepath, path_out, files, executor)
 
-            _, _, files = next(os.walk(path_in))
-            write_files(path_in, path_out, files)
-    else:
-        path_out = '{}/{}.json'.format(file_dir, filename)
+    return filepaths
+
+
+def compile_indexes(filename, filepath='./dumps'):
+    """Copy binary indexes of an executed scrape into compiled files.
+
+    Indexes are written to a directory next to the scraper's files, and
+    compiled as they are. E.g: For buildings, buildings_index/main.bin
+    results in buildings_index_main.bin.
+
+    Args:
+        filename: String of the scraper's directory.
+        filepath (optional): Location of the scraper's directory.
+
+    Returns:
+        A list of the locations of the compiled index files.
+    """
+    filepaths = []
+    file_dir = './data'
+    index_dir = '{}/{}_index'.format(filepath, filename)
+
+    if not os.path.isdir(index_dir):
+        return filepaths
+
+    if not os.path.exists(file_dir):
+        os.makedirs(file_dir)
+
+    for index_file in sorted(os.listdir(index_dir)):
+        if not index_file.endswith('.bin'):
+            continue
+
+        path_out = '{}/{}_index_{}'.format(file_dir, filename, index_file)
 
+        shutil.copyfile(
+            '{}/{}'.format(index_dir, index_file), path_out + '.tmp')
+        os.replace(path_out + '.tmp', path_out)
         filepaths.append(path_out)
-        write_files(filepath, path_out, files)
 
     return filepaths
 
 
-def write_files(path_in, path_out, files):
-    """Compiles multiple files into one file.
+def write_files(path_in, path_out, files, executor=None, batch_size=1024):
+    """Compiles multiple files into one JSON Lines file.
+
+    Files are parsed and re-serialized compactly, one record per line, in
+    batches of `batch_size` so only one batch is held in memory at a time.
 
     Args:
         path_in: Input location of directory of files.
         path_out: Output location to write the compiled file.
         files: List of filenames to repeat this process for.
+        executor (optional): Executor to parse files with, in parallel.
+        batch_size (optional): Number of files parsed per batch.
     """
-    with open(path_out, 'w') as merged_file:
-        for filename in files:
-            with open('{}/{}'.format(path_in, filename), 'r') as file:
-                # Flatten nested, raw JSON files
-                merged_file.write(
-                    file.read().replace('\n', '').replace('  ', '') + '\n')
+    # Sort files so merged datasets are stable between runs, and skip
+    # partial files left behind by an interrupted write.
+    filepaths = [
+        '{}/{}'.format(path_in, filename)
+        for filename in sorted(files) if filename.endswith('.json')
+    ]
+    start_time = time.time()
+
+    with open(path_out + '.tmp', 'w', encoding='utf-8') as merged_file:
+        for index in range(0, len(filepaths), batch_size):
+            batch = filepaths[index:index + batch_size]
+
+            if executor:
+                lines = executor.map(compact_file, batch, chunksize=64)
+            else:
+                lines = map(compact_file, batch)
+
+            merged_file.writelines(lines)
+
+    os.replace(path_out + '.tmp', path_out)
 
+    seconds = time.time() - start_time
+    print('Merged {} records into {} in {:.2f} seconds ({:.0f} records/s)'
+          .format(len(filepaths), path_out, seconds,
+                  len(filepaths) / seconds if seconds else 0))
 
-for module in SCRAPERS:
-    if module.scraper_key not in TO_SCRAPE:
-        continue
+
+def compact_file(filepath):
+    """Parse a JSON file and re-serialize it as one compact line.
+
+    Args:
+        filepath: Location of JSON file.
+
+    Returns:
+        String of JSON, ending in a newline.
+    """
+    with open(filepath, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def scrape_module(scraper_key, location, deep, storage, compression,
+                  parse_workers=None, resume=False, rates=()):
+    """Run one scraper module, possibly in a separate process.
+
+    Args:
+        scraper_key: Key of the scraper module to run.
+        location: Filepath for local data dumps.
+        deep: Bool for a deep scrape. For News scrapers only.
+        storage: Name of the storage backend, 'json' or 'jsonl'.
+        compression: Compression of JSON Lines datasets, if any.
+        parse_workers (optional): Number of processes parsing pages.
+        resume (optional): Bool to resume an interrupted scrape.
+        rates (optional): List of tuples of hostname, requests per second
+            and burst size.
+
+    Returns:
+        Tuple of the dataset files written directly by the storage backend,
+        the duration of the scrape in seconds, and a snapshot of the metrics
+        recorded by the scrape.
+    """
+    module = next(m for m in SCRAPERS if m.scraper_key == scraper_key)
+
+    if storage == 'jsonl':
+        set_storage(JSONLinesStorage(compression=compression))
+
+    # Configured here, as each process of a parallel session has its own
+    # rate limiter.
+    for host, rate, burst in rates:
+        get_rate_limiter().configure(host, rate, burst)
+
+    parser_pool = ParserPool(max_workers=parse_workers)
+    set_parser_pool(parser_pool)
 
     module_start_time = int(time.time())
-    print('Starting {} scrape'.format(module.scraper_key))
+    print('Starting {} scrape'.format(scraper_key))
 
-    module.scrape(location=LOCATION, deep=SHOULD_DEEP_SCRAPE)
+    try:
+        module.scrape(location=location, deep=deep, resume=resume)
+    finally:
+        parser_pool.close()
+
+    # JSON Lines sinks are the datasets themselves.
+    dataset_files = get_storage().close()
 
     module_finish_time = int(time.time())
     print('Finished {} scrape in {} seconds'.format(
-        module.scraper_key, module_finish_time - module_start_time))
+        scraper_key, module_finish_time - module_start_time))
+
+    return (dataset_files, module_finish_time - module_start_time,
+            get_metrics().collect())
+
+
+def upload_module(scraper_key, dataset_files, args):
+    """Upload combined dataset to storage, if desired.
+
+    Args:
+        scraper_key: Key of the scraper module that was run.
+        dataset_files: List of dataset files written by the storage backend.
+        args: Parsed command line arguments.
+    """
+    if not args.upload:
+        return
+
+    # JSON files are merged into datasets first, along with any indexes.
+    if args.storage == 'json':
+        dataset_files = merge_files(scraper_key)
+    else:
+        dataset_files = dataset_files + compile_indexes(scraper_key)
+
+    push_to_github(dataset_files, args.repo)
+
+
+def print_report(results):
+    """Print combined timing and exit status of every module.
+
+    Args:
+        results: Dictionary of scraper key to a tuple of status and seconds.
+    """
+    print('Scrape summary:')
+
+    for scraper_key, (status, seconds) in results.items():
+        print('  {:<14}{:<8}{} seconds'.format(scraper_key, status, seconds))
+
+
+def print_metrics(report):
+    """Print request, parse and wait totals of every scraper.
+
+    Args:
+        report: Metrics report, as returned by `Metrics.report`.
+    """
+    print('Metrics summary:')
+    print('  {:<20}{:>10}{:>10}{:>12}{:>12}{:>10}{:>10}'.format(
+        'Scraper', 'Requests', 'MB', 'Response s', 'Transfer s',
+        'Parse s', 'Waited s'))
+
+    for name, hosts in sorted(report.items()):
+        totals = {}
+
+        for metrics in hosts.values():
+            for metric, value in metrics.items():
+                if isinstance(value, dict) and 'buckets' in value:
+                    value = value['sum']
+                elif isinstance(value, dict):
+                    # Counters broken down by label.
+                    value = sum(value.values())
+
+                totals[metric] = totals.get(metric, 0) + value
+
+        waited = sum(totals.get(metric, 0) for metric in (
+            'rate_limit_wait_seconds_total',
+            'http_backoff_seconds_total',
+            'sleep_seconds_total',
+        ))
+
+        print('  {:<20}{:>10}{:>10.1f}{:>12.1f}{:>12.1f}{:>10.1f}{:>10.1f}'
+              .format(
+                  name,
+                  totals.get('http_responses_total', 0),
+                  totals.get('http_response_bytes_total', 0) / 2**20,
+                  totals.get('http_response_seconds', 0),
+                  totals.get('http_transfer_seconds', 0),
+                  totals.get('parse_seconds', 0),
+                  waited,
+              ))
+
+
+def main():
+    """Start a scrape session from the command line."""
+    args = parser.parse_args()
+    keys = [m.scraper_key for m in SCRAPERS if m.scraper_key in args.scrapers]
+    job_args = (args.location, args.deep, args.storage, args.compression,
+                args.parse_workers, args.resume, args.rate)
+    results = {}
+
+    if args.parallel:
+        # Each module hits unrelated hosts, so run them side by side and
+        # upload each as soon as it finishes.
+        with ProcessPoolExecutor(max_workers=len(keys) or 1) as executor:
+            start_times = {}
+            futures = {}
+
+            for key in keys:
+                start_times[key] = int(time.time())
+                futures[executor.submit(scrape_module, key, *job_args)] = key
+
+            for future in as_completed(futures):
+                key = futures[future]
+
+                try:
+                    dataset_files, seconds, snapshot = future.result()
+                    get_metrics().merge(snapshot)
+                    upload_module(key, dataset_files, args)
+                    results[key] = ('ok', seconds)
+
+                except Exception as ex:
+                    print('{} failed: {!r}'.format(key, ex))
+                    results[key] = (
+                        'failed', int(time.time()) - start_times[key])
+    else:
+        for key in keys:
+            start_time = int(time.time())
+
+            try:
+                dataset_files, seconds, snapshot = scrape_module(
+                    key, *job_args)
+                get_metrics().merge(snapshot)
+                upload_module(key, dataset_files, args)
+                results[key] = ('ok', seconds)
+
+            except Exception as ex:
+                print('{} failed: {!r}'.format(key, ex))
+                results[key] = ('failed', int(time.time()) - start_time)
+
+    print_report({key: results[key] for key in keys})
+
+    if args.metrics:
+        print_metrics(get_metrics().report())
+        get_metrics().write(args.metrics, args.metrics_format)
+        print('Wrote metrics to {}'.format(args.metrics))
+
+    if any(status != 'ok' for status, _ in results.values()):
+        sys.exit(1)
+
 
-    # Upload combined dataset to storage, if desired.
-    if SHOULD_UPLOAD:
-        push_to_github(module.scraper_key, REPO)
+if __name__ == '__main__':
+    main()
@@ -6,10 +6,71 @@ Integration tests for qmulus scrapers.
 """
 
 import os
+import time
+import gzip
 import json
+import base64
+import random
+import datetime
+import tempfile
 import unittest
+import threading
+import subprocess
+from types import SimpleNamespace
+from unittest import mock
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urljoin
+from email.utils import formatdate
 
+import requests
+
+from bs4 import BeautifulSoup
+
+import run_scraper
 import quartzscrapers.scrapers.test_scraper as ts
+from quartzscrapers.scrapers.buildings.buildings_helpers import (
+    GeocodeCache,
+    geocode_addresses,
+)
+from quartzscrapers.scrapers.buildings.spatial_index import (
+    SpatialIndex,
+    write_spatial_index,
+)
+from quartzscrapers.scrapers.news.gazette import Gazette
+from quartzscrapers.scrapers.courses.courses_helpers import (
+    SectionAggregator,
+    is_login_markup,
+    is_login_page,
+    load_cookies,
+    save_cookies,
+)
+from quartzscrapers.scrapers.courses.courses_parsers import (
+    parse_course_data,
+    parse_course_section_data,
+)
+from quartzscrapers.scrapers.textbooks.textbooks import Textbooks
+from quartzscrapers.scrapers.textbooks.textbooks_helpers import (
+    GoogleBooksCache,
+    GoogleBooksResolver,
+    TextbookIndex,
+    get_google_books_info,
+)
+from quartzscrapers.scrapers.utils.scraper import (
+    TokenBucket,
+    parse_retry_after,
+)
+from quartzscrapers.scrapers.utils import (
+    AsyncScraper,
+    CheckpointJournal,
+    HTTPCache,
+    JSONFileStorage,
+    JSONLinesStorage,
+    Metrics,
+    ParserPool,
+    RateLimiter,
+    Scraper,
+)
 
 
 class TestScraper(unittest.TestCase):
@@ -38,5 +99,1425 @@ class TestScraper(unittest.TestCase):
             self.fail('No JSON file written')
 
 
+class LocalGitRepo:
+    """Stand-in for a PyGithub repository, backed by a local git repository.
+
+    Implements the Git Data API calls used by `run_scraper.push_to_github`
+    with git plumbing commands, and counts the blobs uploaded to it.
+    """
+
+    default_branch = 'master'
+
+    def __init__(self, path):
+        self.path = path
+        self.blobs_created = 0
+
+        os.makedirs(path)
+        self._git('init', '-q', '-b', self.default_branch)
+        tree_sha = self._git('mktree', stdin=b'')
+        commit_sha = self._git('commit-tree', tree_sha, '-m', 'Initial')
+        self._git('update-ref', self._ref_name(), commit_sha)
+
+    def get_git_ref(self, ref):
+        sha = self._git('rev-parse', 'refs/{}'.format(ref))
+
+        def edit(new_sha):
+            self._git('update-ref', 'refs/{}'.format(ref), new_sha)
+
+        return SimpleNamespace(object=SimpleNamespace(sha=sha), edit=edit)
+
+    def get_git_commit(self, sha):
+        tree_sha = self._git('rev-parse', '{}^{{tree}}'.format(sha))
+        return SimpleNamespace(sha=sha, tree=SimpleNamespace(sha=tree_sha))
+
+    def get_git_tree(self, sha):
+        elements = []
+
+        for line in self._git('ls-tree', sha).splitlines():
+            info, path = line.split('\t')
+            mode, type_, blob_sha = info.split()
+            elements.append(SimpleNamespace(
+                path=path, mode=mode, type=type_, sha=blob_sha))
+
+        return SimpleNamespace(sha=sha, tree=elements)
+
+    def create_git_blob(self, content, encoding):
+        self.blobs_created += 1
+        data = (base64.b64decode(content) if encoding == 'base64'
+                else content.encode('utf-8'))
+        return SimpleNamespace(sha=self._git('hash-object', '-w', '--stdin',
+                                             stdin=data))
+
+    def create_git_tree(self, elements, base_tree):
+        entries = {
+            element.path: (element.mode, element.type, element.sha)
+            for element in base_tree.tree
+        }
+
+        for element in elements:
+            identity = element._identity
+            entries[identity['path']] = (
+                identity['mode'], identity['type'], identity['sha'])
+
+        listing = ''.join(
+            '{} {} {}\t{}\n'.format(mode, type_, sha, path)
+            for path, (mode, type_, sha) in sorted(entries.items())
+        )
+
+        return SimpleNamespace(
+            sha=self._git('mktree', stdin=listing.encode('utf-8')))
+
+    def create_git_commit(self, message, tree, parents):
+        parent_args = []
+
+        for parent in parents:
+            parent_args += ['-p', parent.sha]
+
+        return SimpleNamespace(sha=self._git(
+            'commit-tree', tree.sha, *parent_args, '-m', message))
+
+    def log(self):
+        return self._git('log', '--format=%s', self._ref_name()).splitlines()
+
+    def _ref_name(self):
+        return 'refs/heads/{}'.format(self.default_branch)
+
+    def _git(self, *args, stdin=None):
+        env = dict(
+            os.environ,
+            GIT_AUTHOR_NAME='test',
+            GIT_AUTHOR_EMAIL='test@example.com',
+            GIT_COMMITTER_NAME='test',
+            GIT_COMMITTER_EMAIL='test@example.com',
+        )
+        result = subprocess.run(
+            ['git', '-C', self.path] + list(args),
+            input=stdin, stdout=subprocess.PIPE, env=env, check=True)
+
+        return result.stdout.decode('utf-8').strip()
+
+
+class TestAsyncScraper(unittest.TestCase):
+    """Verifies concurrent requests are bounded per host and kept in order."""
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.max_in_flight = {}
+
+        self.scraper = mock.Mock()
+        self.scraper.http_request.side_effect = self._http_request
+        self.async_scraper = AsyncScraper(self.scraper, max_per_host=2)
+
+    def test_request_many(self):
+        """Verifies at most `max_per_host` requests per host are in flight."""
+        urls = ['http://a.ca/{}'.format(number) for number in range(6)]
+        urls += ['http://b.ca/{}'.format(number) for number in range(3)]
+        urls.append('http://a.ca/fail')
+
+        results = self.async_scraper.request_many(urls, parse=False)
+
+        # Later requests finish first, but results are in request order.
+        self.assertEqual(results[:-1], [url.upper() for url in urls[:-1]])
+        self.assertIsInstance(results[-1], ValueError)
+        self.assertEqual(self.max_in_flight, {'a.ca': 2, 'b.ca': 2})
+
+        self.scraper.http_request.assert_any_call('http://b.ca/0', parse=False)
+
+    def test_request_each(self):
+        """Verifies requests take their own arguments and callbacks."""
+        results = self.async_scraper.request_each([
+            {'url': 'http://a.ca/0', 'callback': len},
+            {'url': 'http://a.ca/1', 'parse': False},
+            {'url': 'http://a.ca/fail', 'callback': len},
+        ])
+
+        self.assertEqual(results[:2], [len('HTTP://A.CA/0'), 'HTTP://A.CA/1'])
+        self.assertIsInstance(results[2], ValueError)
+
+    def _http_request(self, url, **kwargs):
+        host = url.split('/')[2]
+
+        with self.lock:
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+            self.max_in_flight[host] = max(
+                self.max_in_flight.get(host, 0), self.in_flight[host])
+
+        # Later URLs of a host respond sooner.
+        number = url.split('/')[-1]
+        time.sleep(0.01 if number == 'fail' else 0.05 - int(number) / 200)
+
+        with self.lock:
+            self.in_flight[host] -= 1
+
+        if number == 'fail':
+            raise ValueError('Request failed')
+
+        return url.upper()
+
+
+class TestParserPool(unittest.TestCase):
+    """Verifies pages are parsed in the pool, without piling up."""
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.response = requests.models.Response()
+        self.response.url = 'https://www.queensu.ca/gazette'
+        self.response.encoding = 'utf-8'
+        self.response._content = b'<html><title>Gazette</title></html>'
+
+    def test_inline(self):
+        """Verifies pages are parsed in the calling thread without workers."""
+        parser_pool = ParserPool(max_workers=0, metrics=self.metrics)
+
+        future = parser_pool.submit(get_title, self.response, '!')
+        self.assertEqual(future.result(), 'Gazette!')
+
+        future = parser_pool.submit(get_title, self.response, None)
+        self.assertIsInstance(future.exception(), TypeError)
+
+        report = self.metrics.report()['parser_pool']['www.queensu.ca']
+        self.assertEqual(report['parse_seconds']['count'], 1)
+        self.assertIsNone(parser_pool.executor)
+
+    def test_back_pressure(self):
+        """Verifies submissions block while `max_pending` pages are queued."""
+        parser_pool = ParserPool(
+            max_workers=1, max_pending=2, metrics=self.metrics)
+        job_futures = [Future() for _ in range(3)]
+        submitted = []
+
+        def submit():
+            submitted.append(parser_pool.submit(get_title, self.response))
+
+        with mock.patch.object(
+                parser_pool, '_submit', side_effect=job_futures):
+            submit()
+            submit()
+
+            thread = threading.Thread(target=submit)
+            thread.start()
+            thread.join(0.2)
+
+            # The third page waits for a slot.
+            self.assertTrue(thread.is_alive())
+            self.assertEqual(len(submitted), 2)
+
+            job_futures[0].set_result(('Gazette', 0.01))
+            thread.join(1)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(submitted[0].result(), 'Gazette')
+        self.assertEqual(len(submitted), 3)
+
+    def test_broken_pool(self):
+        """Verifies a broken pool is replaced, and the page resubmitted."""
+        parser_pool = ParserPool(max_workers=1, metrics=self.metrics)
+        job_future = Future()
+        job_future.set_result(('Gazette', 0.01))
+
+        broken = mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool()
+        working = mock.Mock()
+        working.submit.return_value = job_future
+
+        with mock.patch(
+                'quartzscrapers.scrapers.utils.parsing.ProcessPoolExecutor',
+                side_effect=[broken, working]):
+            future = parser_pool.submit(get_title, self.response)
+
+        self.assertEqual(future.result(), 'Gazette')
+        broken.shutdown.assert_called_once_with()
+        self.assertIs(parser_pool.executor, working)
+
+
+def get_title(soup, suffix=''):
+    """Parse function of TestParserPool, picklable at module level."""
+    return soup.title.text + suffix
+
+
+class TestHTTPCache(unittest.TestCase):
+    """Verifies responses are revalidated, and the cache stays bounded."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.url = 'https://www.queensu.ca/gazette/stories'
+        self.cache = HTTPCache('news', location=self.tmp.name)
+        self.scraper = Scraper(
+            rate_limiter=RateLimiter(rate=1000, burst=10),
+            cache=self.cache,
+            metrics=Metrics(),
+        )
+
+    def test_revalidate(self):
+        """Verifies a 304 replays the response cached by ETag or date."""
+        validators = [
+            ({'ETag': '"v1"'}, {'If-None-Match': '"v1"'}),
+            (
+                {'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'},
+                {'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'},
+            ),
+        ]
+
+        for number, (headers, request_headers) in enumerate(validators):
+            url = '{}?page={}'.format(self.url, number)
+            responses = [
+                self._response(200, headers, url),
+                self._response(304, url=url),
+                self._response(304, url=url),
+            ]
+
+            with mock.patch.object(
+                    self.scraper.session, 'get', side_effect=responses) as get:
+                self.scraper.http_request(url, parse=False)
+                response = self.scraper.http_request(url, parse=False)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, b'<html>Gazette</html>')
+                self.assertTrue(response.from_cache)
+                self.assertIsNone(self.scraper.http_request(
+                    url, parse=False, skip_unchanged=True))
+
+            sent_headers = get.call_args.kwargs['headers']
+
+            self.assertEqual(
+                {name: sent_headers[name] for name in request_headers},
+                request_headers,
+            )
+            self.assertNotIn('Cache-Control', sent_headers)
+
+    def test_not_stored(self):
+        """Verifies responses without validators or a 200 aren't cached."""
+        key = self.cache.make_key(self.url)
+
+        self.cache.store(key, self._response(200))
+        self.cache.store(key, self._response(404, {'ETag': '"v1"'}))
+
+        self.assertEqual(self.cache.get_validators(key), {})
+        self.assertIsNone(self.cache.load(key))
+        self.assertEqual(self.cache.size, 0)
+
+    def test_lru_eviction(self):
+        """Verifies LRU order is rebuilt from modification times."""
+        size = len(self._response(200).content)
+        keys = ['a', 'b', 'c']
+
+        for key in keys:
+            self.cache.store(key, self._response(200, {'ETag': key}))
+
+        # Entries were last used in order c, a, b, by a previous run.
+        for mtime, key in enumerate(['c', 'a', 'b']):
+            os.utime(
+                self.cache._path(key, 'body'), (1000 + mtime, 1000 + mtime))
+
+        cache = HTTPCache('news', location=self.tmp.name, max_bytes=3 * size)
+
+        self.assertEqual(list(cache.entries), ['c', 'a', 'b'])
+        self.assertEqual(cache.size, 3 * size)
+
+        # Loading an entry makes it the most recently used.
+        cache.load('c')
+        cache.store('d', self._response(200, {'ETag': 'd'}))
+
+        self.assertEqual(list(cache.entries), ['b', 'c', 'd'])
+        self.assertIsNone(cache.load('a'))
+        self.assertFalse(os.path.exists(cache._path('a', 'json')))
+
+    def _response(self, status_code, headers=None, url=None):
+        response = requests.models.Response()
+        response.status_code = status_code
+        response.url = url or self.url
+        response.encoding = 'utf-8'
+        response.headers.update(headers or {})
+        response.elapsed = datetime.timedelta(seconds=0.05)
+        response._content = (
+            b'<html>Gazette</html>' if status_code == 200 else b'')
+
+        return response
+
+
+class TestMergeFiles(unittest.TestCase):
+    """Verifies merged datasets match the records of the dumped files."""
+
+    RECORDS = {
+        'anat100': {
+            'course_code': '100',
+            'department': 'ANAT',
+            'units': 3.0,
+            'description': 'Line one.\nLine two.',
+            'course_sections': [{'class_number': 1001, 'dates': []}],
+        },
+        'econ110': {
+            'course_code': '110',
+            'department': 'ECON',
+            'title': 'Économie',
+            'requirements': None,
+            'extras': {'campus': 'Main', 'tags': ['a', 'b']},
+        },
+        'cisc124': {'course_code': '124', 'department': 'CISC'},
+    }
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        # Merged files are written relative to the working directory.
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+        storage = JSONFileStorage()
+
+        for name, record in self.RECORDS.items():
+            storage.write(record, name, './dumps/courses/courses')
+            storage.write(record, name, './dumps/textbooks')
+
+        # Partial files of an interrupted write are left out.
+        with open('./dumps/textbooks/partial.json.tmp', 'w') as file:
+            file.write('{"course_code":')
+
+    def test_matches_flattening(self):
+        """Verifies merged files hold the records the old flattening did."""
+        filepaths = (
+            run_scraper.merge_files('courses', workers=2)
+            + run_scraper.merge_files('textbooks', workers=2)
+        )
+
+        self.assertEqual(
+            filepaths, ['./data/courses.json', './data/textbooks.json'])
+
+        for filepath, path_in in zip(filepaths, [
+                './dumps/courses/courses', './dumps/textbooks']):
+            with open(filepath, 'r', encoding='utf-8') as file:
+                lines = file.read().splitlines()
+
+            self.assertEqual(
+                [json.loads(line) for line in lines],
+                [json.loads(line) for line in self._flatten(path_in)],
+            )
+
+    def test_keeps_whitespace(self):
+        """Verifies whitespace within values survives the merge."""
+        JSONFileStorage().write(
+            {'title': 'Two  spaces'}, 'spaces', './dumps/textbooks')
+        run_scraper.merge_files('textbooks', workers=2)
+
+        with open('./data/textbooks.json', 'r', encoding='utf-8') as file:
+            titles = [json.loads(line).get('title') for line in file]
+
+        self.assertIn('Two  spaces', titles)
+
+    @staticmethod
+    def _flatten(path_in):
+        # Merge files the way merge_files did before it parsed them.
+        lines = []
+
+        for filename in sorted(os.listdir(path_in)):
+            if filename.endswith('.json'):
+                with open('{}/{}'.format(path_in, filename), 'r') as file:
+                    lines.append(
+                        file.read().replace('\n', '').replace('  ', ''))
+
+        return lines
+
+
+class TestPushToGithub(unittest.TestCase):
+    """Verifies that only changed datasets are uploaded, in one commit."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.repo = LocalGitRepo('{}/remote'.format(self.tmp.name))
+        self.manifest_path = '{}/manifest.json'.format(self.tmp.name)
+        self.files = []
+
+        for name in ('buildings', 'courses'):
+            filepath = '{}/{}.jsonl'.format(self.tmp.name, name)
+            self.files.append(filepath)
+            self._write(filepath, {'name': name})
+
+    def test_push_changed_files(self):
+        """Verifies blob SHAs match git and unchanged files are skipped."""
+        self._push()
+        self.assertEqual(self.repo.blobs_created, 2)
+        self.assertEqual(len(self.repo.log()), 2)
+
+        tree = self.repo.get_git_tree(self.repo.get_git_commit(
+            self.repo.get_git_ref('heads/master').object.sha).tree.sha)
+        remote_shas = {element.path: element.sha for element in tree.tree}
+        local_sha = self.repo._git('hash-object', self.files[0])
+        self.assertEqual(remote_shas['buildings.json'], local_sha)
+
+        # Nothing changed, so nothing is uploaded or committed.
+        self._push()
+        self.assertEqual(self.repo.blobs_created, 2)
+        self.assertEqual(len(self.repo.log()), 2)
+
+        # Only the changed dataset is uploaded.
+        self._write(self.files[1], {'name': 'courses', 'updated': True})
+        self._push()
+        self.assertEqual(self.repo.blobs_created, 3)
+        self.assertEqual(self.repo.log()[0], 'Export datasets: courses')
+
+    def _push(self):
+        run_scraper.push_to_github(
+            self.files, None, self.repo, self.manifest_path)
+
+    @staticmethod
+    def _write(filepath, data):
+        with open(filepath, 'w') as file:
+            file.write(json.dumps(data) + '\n')
+
+
+class StubMapsClient:
+    """Stand-in for a googlemaps client, counting geocode calls."""
+
+    def __init__(self):
+        self.addresses = []
+
+    def geocode(self, address):
+        self.addresses.append(address)
+        location = {'lat': 44.0, 'lng': -76.0 - len(self.addresses)}
+        return [{'geometry': {'location': location}}]
+
+
+class TestGeocodeAddresses(unittest.TestCase):
+    """Verifies that building addresses are only geocoded once."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.path = '{}/geocodes.json'.format(self.tmp.name)
+        self.client = StubMapsClient()
+
+    def test_cached_addresses(self):
+        """Verifies cached addresses need no API calls, even across runs."""
+        addresses = ['99 University Ave', '99 University  Ave', '1 Bader Ln']
+        coords = geocode_addresses(
+            addresses, GeocodeCache(self.path), self.client)
+
+        self.assertEqual(len(self.client.addresses), 2)
+        self.assertEqual(coords['99 University Ave'], coords[addresses[1]])
+
+        coords_cached = geocode_addresses(
+            addresses, GeocodeCache(self.path), self.client)
+
+        self.assertEqual(len(self.client.addresses), 2)
+        self.assertEqual(coords, coords_cached)
+
+    def test_expired_addresses(self):
+        """Verifies expired coordinates are looked up again."""
+        geocode_addresses(['1 Bader Ln'], GeocodeCache(self.path), self.client)
+        coords = geocode_addresses(
+            ['1 Bader Ln'], GeocodeCache(self.path, max_age=-1), self.client)
+
+        self.assertEqual(len(self.client.addresses), 2)
+        self.assertEqual(coords['1 Bader Ln'], (44.0, -78.0))
+
+    def test_offline(self):
+        """Verifies offline mode never calls the API."""
+        coords = geocode_addresses(
+            ['1 Bader Ln'], GeocodeCache(self.path), self.client, offline=True)
+
+        self.assertEqual(self.client.addresses, [])
+        self.assertEqual(coords['1 Bader Ln'], (0, 0))
+
+
+class TestJSONLinesStorage(unittest.TestCase):
+    """Verifies JSON Lines sinks across rewrites, compaction and crashes."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.location = '{}/news'.format(self.tmp.name)
+
+    def test_rewrite_and_reopen(self):
+        """Verifies rewrites supersede older copies, also after reopening."""
+        for compression in (None, 'gzip'):
+            storage = JSONLinesStorage(compression, checkpoint_every=2)
+
+            storage.write({'title': 'a'}, 'a', self.location)
+            storage.write({'title': 'b'}, 'b', self.location)
+            storage.write({'title': 'a2'}, 'a', self.location)
+
+            # Buffered and flushed records are both readable.
+            self.assertEqual(storage.read('a', self.location), {'title': 'a2'})
+            self.assertEqual(storage.read('b', self.location), {'title': 'b'})
+            self.assertIsNone(storage.read('c', self.location))
+
+            storage.checkpoint()
+            reopened = JSONLinesStorage(compression)
+
+            self.assertEqual(
+                reopened.read('a', self.location), {'title': 'a2'})
+            self.assertTrue(reopened.exists('b', self.location))
+
+            # Closing drops the superseded copy.
+            path, = reopened.close()
+            self.assertEqual(
+                self._read_lines(path, compression),
+                [{'title': 'b'}, {'title': 'a2'}],
+            )
+            self.assertEqual(
+                JSONLinesStorage(compression).read('a', self.location),
+                {'title': 'a2'},
+            )
+
+            os.remove(path)
+            os.remove(path + '.keys')
+
+    def test_unindexed_records(self):
+        """Verifies records a crash left out of the index are dropped."""
+        storage = JSONLinesStorage()
+        storage.write({'title': 'a'}, 'a', self.location)
+        path, = storage.close()
+
+        # A record appended without its index line, and a torn index line.
+        with open(path, 'a') as file:
+            file.write('{"title": "b"}\n')
+
+        with open(path + '.keys', 'a') as file:
+            file.write('["b", 15')
+
+        storage = JSONLinesStorage()
+        self.assertFalse(storage.exists('b', self.location))
+
+        storage.write({'title': 'c'}, 'c', self.location)
+        storage.close()
+
+        self.assertEqual(
+            self._read_lines(path), [{'title': 'a'}, {'title': 'c'}])
+        self.assertEqual(
+            JSONLinesStorage().read('c', self.location), {'title': 'c'})
+
+    def test_interrupted_compaction(self):
+        """Verifies an uncommitted compaction leaves the sink as it was."""
+        storage = JSONLinesStorage()
+        storage.write({'title': 'a'}, 'a', self.location)
+        path, = storage.close()
+
+        with open(path + '.tmp', 'w') as file:
+            file.write('{"title": "partial"}\n')
+
+        storage = JSONLinesStorage()
+
+        self.assertEqual(storage.read('a', self.location), {'title': 'a'})
+        self.assertFalse(os.path.exists(path + '.tmp'))
+
+    @staticmethod
+    def _read_lines(path, compression=None):
+        opener = gzip.open if compression == 'gzip' else open
+
+        with opener(path, 'rt', encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+
+class TestCourseFrontier(unittest.TestCase):
+    """Verifies course pages found by several searches are crawled once."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        # Checkpoint journals are written relative to the working directory.
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def test_crawled_once(self):
+        """Verifies an ENGL course found searching 'EG' isn't crawled again."""
+        course_rel_urls = {
+            'ENGL': ['/courses/engl100', '/courses/engl200'],
+            'EG': ['/courses/eg101', '/courses/engl100'],
+        }
+        crawled = []
+
+        def parse_course_pages(course_urls):
+            crawled.append(course_urls)
+            return []
+
+        with mock.patch.object(
+                Textbooks, '_get_departments', return_value=['ENGL', 'EG']), \
+                mock.patch.object(
+                    Textbooks, '_get_course_rel_urls',
+                    side_effect=lambda url, code: course_rel_urls[code]), \
+                mock.patch.object(
+                    Textbooks, '_parse_course_pages',
+                    side_effect=parse_course_pages), \
+                self.assertLogs(Textbooks.logger, 'INFO') as logs:
+            Textbooks.scrape(location='{}/textbooks'.format(self.tmp.name))
+
+        host = Textbooks.host
+        self.assertEqual(crawled, [
+            [host + '/courses/engl100', host + '/courses/engl200'],
+            [host + '/courses/eg101'],
+        ])
+        self.assertIn(
+            'Crawled 3 course(s), filtered 1 duplicate(s)',
+            '\n'.join(logs.output),
+        )
+
+
+class TestTextbookIndex(unittest.TestCase):
+    """Verifies textbook records are merged with those of earlier runs."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.location = '{}/textbooks'.format(self.tmp.name)
+        self.textbooks = [
+            {'isbn_13': '978{:010}'.format(number)} for number in range(50)
+        ]
+
+    def test_rerun(self):
+        """Verifies a rerun merges courses into stored records, without
+        syncing the sink per record.
+        """
+        self._run({'year': '2020', 'code': 'CISC101'})
+
+        with mock.patch('os.fsync') as fsync:
+            storage = self._run({'year': '2020', 'code': 'CISC102'}, False)
+            self.assertEqual(fsync.call_count, 0)
+
+        storage.close()
+
+        record = JSONLinesStorage().read(
+            '2020_{}'.format(self.textbooks[0]['isbn_13']), self.location)
+        self.assertEqual(
+            [course['code'] for course in record['courses']],
+            ['CISC101', 'CISC102'],
+        )
+
+    def _run(self, course_data, close=True):
+        storage = JSONLinesStorage()
+        index = TextbookIndex(Scraper(storage=storage), self.location)
+
+        index.add([course_data], self.textbooks)
+        index.flush()
+
+        if close:
+            storage.close()
+
+        return storage
+
+
+class TestTextbookParsers(unittest.TestCase):
+    """Verifies textbooks are parsed from the bookstore's course pages."""
+
+    TEXTBOOK = (
+        '<div class="textbookHolder">'
+        '<dl><dt>ISBN</dt>\n<dd>9781234567897</dd></dl>'
+        '<dd class="textbookPrice">$1,010.50</dd>{}'
+        '</div>'
+    )
+
+    def test_title_and_authors(self):
+        """Verifies the bookstore title is split into title and authors."""
+        data = self._parse(
+            '<div class="textbookInfoHolder">'
+            '<h2>Writing by Choice by Eric Henderson</h2></div>')
+
+        self.assertEqual(data['title'], 'Writing by Choice')
+        self.assertEqual(data['authors'], ['Eric Henderson'])
+        self.assertEqual(data['price_new'], 1010.5)
+
+    def test_missing_title(self):
+        """Verifies a textbook without a bookstore title is kept."""
+        data = self._parse('')
+
+        self.assertEqual(data['isbn_13'], '9781234567897')
+        self.assertIsNone(data['title'])
+        self.assertEqual(data['authors'], [])
+
+    def test_textbook_errors(self):
+        """Verifies textbook parse errors are logged by the parent process."""
+        soup = BeautifulSoup(
+            self.TEXTBOOK.format('') + '<div class="textbookHolder"></div>',
+            'lxml',
+        )
+
+        with mock.patch.object(
+                Textbooks, '_parse_course_data', return_value=[]):
+            result = Textbooks._parse_course_page(soup, 'course')
+
+        _, textbook_data, _, errors = result
+
+        self.assertEqual(len(textbook_data), 1)
+        self.assertEqual(len(errors), 1)
+        self.assertIn('AttributeError', errors[0])
+
+        course_future = Future()
+        course_future.set_result(result)
+
+        with self.assertLogs(Textbooks.logger, 'ERROR') as logs:
+            Textbooks._scrape_course(
+                course_future, 'course', mock.Mock(), {})
+
+        self.assertIn('AttributeError', logs.output[0])
+
+    def _parse(self, info_holder):
+        soup = BeautifulSoup(self.TEXTBOOK.format(info_holder), 'lxml')
+        return Textbooks._parse_textbook_data(soup.find('div'))
+
+
+class TestHighWaterMark(unittest.TestCase):
+    """Verifies news crawls stop at stored articles and retry failed ones."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        # Checkpoint journals are written relative to the working directory.
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+        self.location = '{}/news'.format(self.tmp.name)
+        self.pages = [['/gazette/a1'], ['/gazette/a2', '/gazette/a3']]
+        self.requested = []
+
+    def test_failed_article(self):
+        """Verifies a failed article is retried and stored ones skipped."""
+        self._scrape(fail='/gazette/a2')
+
+        with open('{}_state/gazette.json'.format(self.location)) as file:
+            state = json.load(file)
+
+        self.assertEqual(state['seen_urls'], [
+            'http://www.queensu.ca/gazette/a1',
+            'http://www.queensu.ca/gazette/a3',
+        ])
+        self.assertEqual(
+            state['failed_urls'], {'http://www.queensu.ca/gazette/a2': 1})
+
+        # The crawl goes past the first stored article to retry the failed
+        # one, then stops.
+        self.requested = []
+        self._scrape(num_pages=3)
+
+        self.assertEqual(self.requested, ['/gazette/a2'])
+
+        with open('{}_state/gazette.json'.format(self.location)) as file:
+            state = json.load(file)
+
+        self.assertEqual(len(state['seen_urls']), 3)
+        self.assertEqual(state['failed_urls'], {})
+
+    def test_failed_page_not_checkpointed(self):
+        """Verifies only pages with every article stored are journaled."""
+        with mock.patch.object(CheckpointJournal, 'complete'):
+            self._scrape(fail='/gazette/a2')
+
+        journal = CheckpointJournal(
+            'news_gazette', resume=True, location='./cache/checkpoints')
+
+        self.assertTrue(journal.is_done('page:0'))
+        self.assertFalse(journal.is_done('page:1'))
+        self.assertTrue(journal.is_done(
+            'article:http://www.queensu.ca/gazette/a3'))
+        self.assertFalse(journal.is_done(
+            'article:http://www.queensu.ca/gazette/a2'))
+
+    def _scrape(self, fail=None, num_pages=2):
+        def get_article_data(async_scraper, host_url, logger,
+                             article_rel_urls, *args):
+            self.requested.extend(article_rel_urls)
+
+            return [
+                (
+                    ValueError('Unparsable article') if url == fail
+                    else {'url': url},
+                    urljoin(host_url, url),
+                )
+                for url in article_rel_urls
+            ]
+
+        def get_article_rel_urls(relative_url, page_index):
+            # The third page is never reached, as it is already stored.
+            rel_urls = self.pages[page_index]
+            return rel_urls, [None] * len(rel_urls)
+
+        with mock.patch.object(
+                Gazette, '_get_num_pages', return_value=num_pages), \
+                mock.patch.object(
+                    Gazette, '_get_article_rel_urls',
+                    side_effect=get_article_rel_urls), \
+                mock.patch(
+                    'quartzscrapers.scrapers.news.gazette.get_article_data',
+                    side_effect=get_article_data), \
+                mock.patch(
+                    'quartzscrapers.scrapers.news.gazette.save_article'):
+            Gazette.scrape(location=self.location)
+
+
+class TestGoogleBooksCache(unittest.TestCase):
+    """Verifies Google Books lookups are cached until they expire."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.now = 1000
+        patch = mock.patch('time.time', side_effect=lambda: self.now)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.cache = GoogleBooksCache(
+            '{}/google_books.sqlite3'.format(self.tmp.name),
+            ttl=100,
+            negative_ttl=10,
+        )
+        self.scraper = mock.Mock()
+
+    def test_expired_hit(self):
+        """Verifies a hit is served until its TTL, then fetched again."""
+        volume = {'title': 'Writing by Choice', 'authors': ['Eric Henderson']}
+        self.scraper.http_request.return_value.json.return_value = {
+            'items': [{'volumeInfo': volume}],
+        }
+
+        for now in (1000, 1100, 1101):
+            self.now = now
+            data = get_google_books_info('9781', self.scraper, self.cache)
+            self.assertEqual(data['title'], 'Writing by Choice')
+
+        # Fetched on the first lookup, and again once the entry expired.
+        self.assertEqual(self.scraper.http_request.call_count, 2)
+        self.assertEqual(self.cache.get('9781'), (True, volume))
+
+    def test_cached_miss(self):
+        """Verifies an ISBN without results isn't refetched within its TTL."""
+        self.scraper.http_request.return_value.json.return_value = {}
+
+        for now in (1000, 1005, 1010):
+            self.now = now
+            self.assertEqual(
+                get_google_books_info('9782', self.scraper, self.cache), {})
+
+        self.assertEqual(self.scraper.http_request.call_count, 1)
+        self.assertEqual(self.cache.get('9782'), (True, None))
+
+        # Misses expire sooner than hits.
+        self.now = 1011
+        self.assertEqual(self.cache.get('9782'), (False, None))
+
+
+class TestGoogleBooksResolver(unittest.TestCase):
+    """Verifies an exceeded Google Books quota is detected without retries."""
+
+    def test_quota_exceeded(self):
+        """Verifies a 429 resolves to no data after a single request."""
+        scraper = Scraper(
+            rate_limiter=RateLimiter(rate=1000, burst=10), metrics=Metrics())
+        resolver = GoogleBooksResolver(scraper, max_workers=1)
+        self.addCleanup(resolver.close)
+
+        response = requests.models.Response()
+        response.status_code = 429
+        response.url = 'https://www.googleapis.com/books/v1/volumes'
+        response.elapsed = datetime.timedelta(seconds=0.05)
+        response._content = b'{}'
+
+        with mock.patch.object(
+                scraper.session, 'get', return_value=response) as get, \
+                mock.patch('time.sleep'):
+            resolver.submit('9780000000001')
+            resolver.submit('9780000000002')
+
+            self.assertEqual(resolver.result('9780000000001'), {})
+            self.assertEqual(resolver.result('9780000000002'), {})
+
+        self.assertEqual(get.call_count, 1)
+        self.assertTrue(resolver.quota_exceeded.is_set())
+
+
+class TestCheckpointJournal(unittest.TestCase):
+    """Verifies scrapes resume from the units journaled before a crash."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.location = '{}/checkpoints'.format(self.tmp.name)
+
+    def test_resume(self):
+        """Verifies finished units survive a crash, and a torn line doesn't."""
+        storage = mock.Mock()
+        journal = CheckpointJournal(
+            'courses', storage=storage, location=self.location)
+        journal.done('letter:A', [[3, 'A', 'ANAT']])
+        journal.done('department:ANAT')
+
+        # Records are made durable before their unit is journaled.
+        self.assertEqual(storage.checkpoint.call_count, 2)
+
+        # A crash tears the line of the unit in progress.
+        with open(journal.path, 'a') as file:
+            file.write('{"unit": "course:ANAT:')
+
+        journal = CheckpointJournal(
+            'courses', resume=True, location=self.location)
+
+        self.assertEqual(journal.get('letter:A'), [[3, 'A', 'ANAT']])
+        self.assertTrue(journal.is_done('department:ANAT'))
+        self.assertEqual(
+            journal.finished('department:'), [('department:ANAT', None)])
+
+        journal.done('course:ANAT:Anatomy')
+        journal = CheckpointJournal(
+            'courses', resume=True, location=self.location)
+
+        self.assertTrue(journal.is_done('course:ANAT:Anatomy'))
+        self.assertEqual(len(journal.finished()), 3)
+
+        # Once complete, the next scrape starts from scratch.
+        journal.complete()
+        journal = CheckpointJournal(
+            'courses', resume=True, location=self.location)
+
+        self.assertEqual(journal.finished(), [])
+
+    def test_no_resume(self):
+        """Verifies a scrape that isn't resumed ignores an old journal."""
+        journal = CheckpointJournal('courses', location=self.location)
+        journal.done('department:ANAT')
+
+        journal = CheckpointJournal('courses', location=self.location)
+
+        self.assertFalse(journal.is_done('department:ANAT'))
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Verifies requests are paced per host, and slowed when throttled."""
+
+    def setUp(self):
+        self.now = 0
+        self.slept = []
+
+        patches = [
+            mock.patch('time.monotonic', side_effect=lambda: self.now),
+            mock.patch('time.sleep', side_effect=self.slept.append),
+        ]
+
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_token_bucket(self):
+        """Verifies a burst passes, then requests wait for tokens to refill."""
+        bucket = TokenBucket(rate=2, burst=3)
+
+        self.assertEqual([bucket.acquire() for _ in range(5)], [
+            0, 0, 0, 0.5, 1.0,
+        ])
+
+        # Tokens refill up to the burst size, and no further.
+        self.now = 10
+        self.assertEqual([bucket.acquire() for _ in range(4)], [
+            0, 0, 0, 0.5,
+        ])
+        self.assertEqual(self.slept, [0.5, 1.0, 0.5])
+
+    def test_throttle_and_recover(self):
+        """Verifies 429/503 halve the rate, and successes restore it."""
+        limiter = RateLimiter(rate=4, burst=4)
+        host = 'www.queensu.ca'
+
+        self.assertFalse(limiter.update(host, self._response(200)))
+        self.assertTrue(limiter.update(
+            host, self._response(429, {'Retry-After': '5'})))
+
+        bucket = limiter.buckets[host]
+        self.assertEqual(bucket.rate, 2)
+
+        # Requests wait out the Retry-After delay.
+        self.assertEqual(limiter.acquire(host), 5)
+
+        # Without a Retry-After, requests wait for a token at the new rate.
+        self.now = 10
+        self.assertTrue(limiter.update(host, self._response(503)))
+        self.assertEqual(bucket.rate, 1)
+        self.assertEqual(limiter.acquire(host), 1)
+
+        # Each success restores a tenth of the rate, up to the configured rate.
+        for _ in range(7):
+            limiter.update(host, self._response(200))
+
+        self.assertAlmostEqual(bucket.rate, 3.8)
+
+        limiter.update(host, self._response(200))
+        self.assertEqual(bucket.rate, 4)
+
+    def test_host_rates(self):
+        """Verifies configured hosts get their rate, others the default."""
+        limiter = RateLimiter(
+            rate=1, burst=4, limits={'www.queensu.ca': (4, 8)})
+        limiter.configure('www.campusbookstore.com', 0.5)
+
+        self.assertEqual(limiter.buckets, {})
+        self.assertEqual(limiter._get_bucket('www.queensu.ca').rate, 4)
+        self.assertEqual(limiter._get_bucket('www.queensu.ca').burst, 8)
+        self.assertEqual(
+            limiter._get_bucket('www.campusbookstore.com').rate, 0.5)
+        self.assertEqual(limiter._get_bucket('example.com').rate, 1)
+
+    def test_parse_retry_after(self):
+        """Verifies delay-seconds, HTTP-dates and malformed values."""
+        self.assertEqual(parse_retry_after('120'), 120)
+        self.assertEqual(parse_retry_after(' 7 '), 7)
+        self.assertEqual(
+            parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+        self.assertAlmostEqual(
+            parse_retry_after(formatdate(time.time() + 30, usegmt=True)),
+            30,
+            delta=2,
+        )
+
+        for value in (None, '', '-5', 'soon', 'Wed, 99 Foo 2015'):
+            self.assertIsNone(parse_retry_after(value))
+
+    @staticmethod
+    def _response(status_code, headers=None):
+        response = requests.models.Response()
+        response.status_code = status_code
+        response.headers.update(headers or {})
+
+        return response
+
+
+class TestMetrics(unittest.TestCase):
+    """Verifies requests are recorded by scraper and host, and exported."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.metrics = Metrics()
+        self.scraper = Scraper(
+            name='news/gazette',
+            rate_limiter=RateLimiter(rate=1000, burst=10),
+            metrics=self.metrics,
+        )
+
+    def test_request_metrics(self):
+        """Verifies responses, errors, retries and parses are recorded."""
+        error = requests.exceptions.ConnectionError()
+        responses = [self._response(), error, self._response()]
+
+        with mock.patch.object(
+                self.scraper.session, 'get', side_effect=responses), \
+                mock.patch('time.sleep'):
+            self.scraper.http_request('https://www.queensu.ca/gazette')
+            self.scraper.http_request('https://www.queensu.ca/gazette')
+            self.scraper.wait(2)
+
+        report = self.metrics.report()['news/gazette']
+        host = report['www.queensu.ca']
+
+        self.assertEqual(host['http_responses_total'], {'200': 2})
+        self.assertEqual(host['http_errors_total'], {'ConnectionError': 1})
+        self.assertEqual(host['http_retries_total'], 1)
+        self.assertEqual(
+            host['http_response_bytes_total'],
+            2 * len(self._response().content),
+        )
+        self.assertEqual(host['http_response_seconds']['count'], 2)
+        self.assertAlmostEqual(host['http_response_seconds']['sum'], 0.1)
+        self.assertEqual(host['parse_seconds']['count'], 2)
+        self.assertEqual(report['']['sleep_seconds_total'], 2)
+
+    def test_export(self):
+        """Verifies snapshots merge, and export as JSON and Prometheus."""
+        labels = {'scraper': 'buildings', 'host': 'www.queensu.ca'}
+        self.metrics.increment('http_responses_total', code='200', **labels)
+        self.metrics.observe('parse_seconds', 0.2, **labels)
+
+        other = Metrics()
+        other.merge(self.metrics.collect())
+        other.merge(other.collect())
+
+        self.assertEqual(self.metrics.report(), {})
+
+        json_path = '{}/metrics/metrics.json'.format(self.tmp.name)
+        other.write(json_path)
+
+        with open(json_path, 'r') as file:
+            parse_seconds = json.load(
+                file)['buildings']['www.queensu.ca']['parse_seconds']
+
+        self.assertEqual(parse_seconds['count'], 1)
+        self.assertEqual(parse_seconds['buckets']['0.1'], 0)
+        self.assertEqual(parse_seconds['buckets']['0.25'], 1)
+
+        lines = other.to_prometheus().splitlines()
+        series = '{host="www.queensu.ca",scraper="buildings"}'
+
+        self.assertIn('# TYPE quartzscrapers_parse_seconds histogram', lines)
+        self.assertIn(
+            'quartzscrapers_http_responses_total{code="200",'
+            'host="www.queensu.ca",scraper="buildings"} 1',
+            lines,
+        )
+        self.assertIn(
+            'quartzscrapers_parse_seconds_bucket{host="www.queensu.ca",'
+            'scraper="buildings",le="+Inf"} 1',
+            lines,
+        )
+        self.assertIn('quartzscrapers_parse_seconds_count{} 1'.format(
+            series), lines)
+
+    @staticmethod
+    def _response():
+        response = requests.models.Response()
+        response.status_code = 200
+        response.url = 'https://www.queensu.ca/gazette'
+        response.headers['content-type'] = 'text/html'
+        response.elapsed = datetime.timedelta(seconds=0.05)
+        response._content = b'<html><head><title>Gazette</title></head></html>'
+
+        return response
+
+
+class TestSpatialIndex(unittest.TestCase):
+    """Verifies spatial index queries against a brute-force search."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.path = '{}/buildings_index/main.bin'.format(self.tmp.name)
+
+    def test_queries(self):
+        """Verifies find and nearest match testing every polygon."""
+        rand = random.Random(0)
+        polygons = {}
+
+        for number in range(60):
+            x_coord, y_coord = rand.randrange(1000), rand.randrange(800)
+            width, height = rand.randrange(5, 60), rand.randrange(5, 60)
+            polygons['building{}'.format(number)] = [
+                [x_coord, y_coord],
+                [x_coord + width, y_coord],
+                [x_coord + width // 2, y_coord + height],
+            ]
+
+        write_spatial_index(polygons, self.path)
+
+        with SpatialIndex(self.path) as index:
+            every_polygon = range(len(index.building_ids))
+
+            for number in range(500):
+                x_coord = rand.uniform(-100, 1100)
+                y_coord = rand.uniform(-100, 900)
+
+                # Half of the points are near a building's centroid.
+                if number % 2:
+                    polygon = rand.choice(list(polygons.values()))
+                    x_coord = sum(x for x, _ in polygon) / 3 + rand.uniform(
+                        -10, 10)
+                    y_coord = sum(y for _, y in polygon) / 3 + rand.uniform(
+                        -10, 10)
+
+                containing = [
+                    index.building_ids[polygon] for polygon in every_polygon
+                    if index._contains(polygon, x_coord, y_coord)
+                ]
+                nearest = min(
+                    index._distance(polygon, x_coord, y_coord)
+                    for polygon in every_polygon
+                )
+
+                building_id = index.find(x_coord, y_coord)
+
+                if containing:
+                    self.assertIn(building_id, containing)
+                else:
+                    self.assertIsNone(building_id)
+
+                building_id, distance = index.nearest(x_coord, y_coord)
+
+                self.assertAlmostEqual(distance, nearest)
+                self.assertAlmostEqual(
+                    index._distance(
+                        index.building_ids.index(building_id),
+                        x_coord,
+                        y_coord,
+                    ),
+                    nearest,
+                )
+
+    def test_empty_index(self):
+        """Verifies an index of a campus without buildings finds nothing."""
+        write_spatial_index({}, self.path)
+
+        with SpatialIndex(self.path) as index:
+            self.assertEqual(index.building_ids, [])
+            self.assertIsNone(index.find(10, 10))
+            self.assertIsNone(index.nearest(10, 10))
+
+
+class TestSolusLogin(unittest.TestCase):
+    """Verifies SOLUS login pages are told apart from content pages."""
+
+    LOGIN_PAGES = [
+        b'<form><input type="password" name="pass"></form>',
+        b"<form><INPUT Type='PASSWORD' name=pass></form>",
+        b'<form><input id="pwd" name="pwd"/></form>',
+        b'<form><input name="pass" id=password></form>',
+    ]
+    CONTENT_PAGES = [
+        b'<form><input type="text" id="DERIVED_CLSRCH_SSR_CLASSNAME"></form>',
+        b'<form><input id="passwordHint" type="text"></form>',
+        b'<p>Forgot your password?</p>',
+    ]
+
+    def test_login_pages(self):
+        """Verifies raw and parsed pages with password inputs are detected."""
+        for page in self.LOGIN_PAGES:
+            self.assertTrue(is_login_markup(page), page)
+            self.assertTrue(is_login_page(BeautifulSoup(page, 'lxml')), page)
+
+        for page in self.CONTENT_PAGES:
+            self.assertFalse(is_login_markup(page), page)
+            self.assertFalse(is_login_page(BeautifulSoup(page, 'lxml')), page)
+
+
+class TestSolusCookies(unittest.TestCase):
+    """Verifies SOLUS login cookies persist across runs, privately."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.path = '{}/solus/cookies.json'.format(self.tmp.name)
+        self.cookies = {'PS_TOKEN': 'token', 'SignOnDefault': 'user'}
+
+    def test_round_trip(self):
+        """Verifies saved cookies load until they expire."""
+        self.assertIsNone(load_cookies(self.path))
+
+        save_cookies(self.cookies, None, self.path)
+        self.assertEqual(load_cookies(self.path), self.cookies)
+
+        save_cookies(self.cookies, time.time() + 60, self.path)
+        self.assertEqual(load_cookies(self.path), self.cookies)
+
+        save_cookies(self.cookies, time.time() - 1, self.path)
+        self.assertIsNone(load_cookies(self.path))
+
+    def test_permissions(self):
+        """Verifies the cookie file is only accessible by its owner."""
+        save_cookies(self.cookies, None, self.path)
+
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        self.assertEqual(
+            os.stat(os.path.dirname(self.path)).st_mode & 0o777, 0o700)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+
+class TestSectionAggregator(unittest.TestCase):
+    """Verifies course sections are merged into one record per course."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.storage = JSONFileStorage()
+        self.scraper = Scraper(storage=self.storage, metrics=Metrics())
+        self.aggregator = SectionAggregator(self.scraper, self.tmp.name)
+
+    def test_merge_sections(self):
+        """Verifies sections from several pages are written once, merged."""
+        filenames = {
+            self.aggregator.add(self._course(), {'class_number': number})
+            for number in (1001, 1002, 1003)
+        }
+
+        with mock.patch.object(
+                self.storage, 'write', wraps=self.storage.write) as write:
+            self.aggregator.flush(filenames)
+
+        self.assertEqual(len(filenames), 1)
+        self.assertEqual(write.call_count, 1)
+
+        filename = filenames.pop()
+        data = self.storage.read(filename, self.aggregator.location)
+
+        self.assertEqual(data['course_code'], '124')
+        self.assertEqual(
+            [section['class_number'] for section in data['course_sections']],
+            [1001, 1002, 1003],
+        )
+
+        # A course revisited in the same run keeps the sections written.
+        self.aggregator.add(self._course(), {'class_number': 1004})
+        self.aggregator.flush([filename])
+
+        data = self.storage.read(filename, self.aggregator.location)
+        self.assertEqual(len(data['course_sections']), 4)
+
+    @staticmethod
+    def _course():
+        # Each section page is parsed into its own copy of the course data.
+        return {
+            'year': '2019',
+            'term': 'Fall',
+            'academic_level': 'Undergraduate',
+            'campus': 'Main',
+            'department': 'CISC',
+            'course_code': '124',
+        }
+
+
+class TestSolusParsers(unittest.TestCase):
+    """Verifies SOLUS pages parse into the data of saved fixtures."""
+
+    fixtures = './fixtures/solus'
+
+    def test_course_page(self):
+        """Verifies a course page parses into its course data."""
+        expected = self._load_json('course.json')
+
+        for parser in ('lxml', 'html.parser'):
+            course_data = parse_course_data(
+                self._load_soup('course.html', parser))
+
+            self.assertEqual(json.loads(json.dumps(course_data)), expected)
+
+    def test_section_page(self):
+        """Verifies a section page parses into its course and section data."""
+        course_data = self._load_json('course.json')
+        expected = self._load_json('section.json')
+
+        for parser in ('lxml', 'html.parser'):
+            section_course_data, section_data = parse_course_section_data(
+                self._load_soup('section.html', parser),
+                course_data,
+                'LEC-001',
+            )
+
+            self.assertIsNotNone(section_data.pop('last_updated'))
+            self.assertEqual(
+                json.loads(json.dumps(section_course_data)),
+                expected['course'],
+            )
+            self.assertEqual(
+                json.loads(json.dumps(section_data)), expected['section'])
+
+    def _load_json(self, filename):
+        with open('{}/{}'.format(self.fixtures, filename), 'r') as file:
+            return json.load(file)
+
+    def _load_soup(self, filename, parser):
+        with open('{}/{}'.format(self.fixtures, filename), 'r') as file:
+            return BeautifulSoup(file.read(), parser)
+
+
 if __name__ == '__main__':
     unittest.main()